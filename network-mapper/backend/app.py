@@ -1,28 +1,57 @@
+import hashlib
 import os
-import platform
-import re
 import shutil
-import subprocess
-from pathlib import Path
-from urllib.parse import urlparse
-from flask import Flask, request, jsonify, send_from_directory
+import threading
+from flask import Flask, g, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from sqlalchemy import create_engine
+from sqlalchemy import or_
 from sqlalchemy.orm import sessionmaker
 try:
-    from models import Base, Building, Floorplan, Device, Audit
+    from models import Base, Building, Floorplan, Device, Audit, StatusHistory, ImportJob, normalize_mac, normalized_mac
 except Exception:
     # support running as module (gunicorn backend.app:app)
-    from backend.models import Base, Building, Floorplan, Device, Audit
+    from backend.models import Base, Building, Floorplan, Device, Audit, StatusHistory, ImportJob, normalize_mac, normalized_mac
+try:
+    import probe
+    import poller
+    import migrate
+    import importer
+    import jobs
+    import versions
+    import tiles
+    import storage
+    import assets
+    import icon_catalog
+    import database
+    import serializers
+    import fastjson
+    import live
+    import probepool
+    import servicecheck
+except Exception:
+    from backend import probe
+    from backend import poller
+    from backend import migrate
+    from backend import importer
+    from backend import jobs
+    from backend import versions
+    from backend import tiles
+    from backend import storage
+    from backend import assets
+    from backend import icon_catalog
+    from backend import database
+    from backend import serializers
+    from backend import fastjson
+    from backend import live
+    from backend import probepool
+    from backend import servicecheck
 from dotenv import load_dotenv
-import csv
-import io
 import json
 from datetime import datetime, timedelta
 
 load_dotenv()
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
+UPLOAD_FOLDER = storage.UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # audit log for device restore actions (JSON-lines)
@@ -31,195 +60,626 @@ AUDIT_LOG = os.path.join(os.path.dirname(__file__), 'restore_audit.log')
 # set static folder to the top-level frontend directory so static files are found
 STATIC_FOLDER = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
 app = Flask(__name__, static_folder=STATIC_FOLDER, static_url_path='')
+# jsonify/get_json through orjson when installed (see fastjson.py)
+app.json = fastjson.FastJSONProvider(app)
 CORS(app)
+ICONS_FOLDER = os.path.join(STATIC_FOLDER, 'icons')
+
+# frontend files get strong ETags, ?v= pinning and precompressed variants (see assets.py)
+def static_asset(filename):
+    return assets.send_asset(STATIC_FOLDER, filename)
+
+app.view_functions['static'] = static_asset
 
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db')
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+# pooled engine with the SQLite pragmas / Postgres pool settings from database.py
+engine = database.make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
-# Create tables but tolerate race conditions or existing tables when multiple workers boot
+# bump table_versions on every write so list endpoints can serve ETags
+versions.track(SessionLocal)
+# Create tables (and add indexes/columns missing from older DB files). Under gunicorn the
+# master has done this before forking (gunicorn.conf.py); otherwise the schema lock makes
+# concurrent processes take turns.
+if not database.schema_ready(DATABASE_URL):
+    database.prepare_schema(engine)
+
+# --- Request-scoped session ---
+# Handlers call db() instead of SessionLocal(): the session is opened on first
+# use and closed after the request whatever happened (early returns, errors,
+# the end of a streamed response), which returns its connection to the pool
+# and rolls back anything left uncommitted.
+def db():
+    session = g.get('db_session')
+    if session is None:
+        session = g.db_session = SessionLocal()
+    return session
+
+@app.teardown_appcontext
+def close_db(exc):
+    session = g.pop('db_session', None)
+    if session is not None:
+        session.close()
 from sqlalchemy.exc import OperationalError
+
+# Pick up import jobs left unfinished by a previous (or crashed) worker
 try:
-    Base.metadata.create_all(engine)
+    jobs.resume_jobs(SessionLocal)
 except OperationalError as e:
-    # On some environments multiple workers may attempt DDL simultaneously; ignore if tables already exist.
-    print('Warning: create_all raised OperationalError:', e)
-# --- Reused ping helpers (adapted) ---
+    print('Warning: could not resume import jobs:', e)
 
-def resolve_ping_binary():
-    ping_path = shutil.which("ping")
-    if ping_path:
-        return ping_path
-    for candidate in ("/sbin/ping", "/bin/ping", "/usr/bin/ping"):
-        if Path(candidate).exists():
-            return candidate
-    return None
+# build the icon search index off the request path; searches rebuild it if the library changed since
+threading.Thread(target=icon_catalog.get_catalog, name='icon-catalog', daemon=True).start()
 
-PING_BINARY = resolve_ping_binary()
+# Probes run in the probe pool (its own process under gunicorn), not on request threads:
+# bounded queue and concurrency, per-subnet rate limits, shared result cache (see probepool.py)
+probe_pool = probepool.connect()
 
+def pooled_probe(target, engine=None, check=None):
+    """Blocking probe (or service check) through the pool for sweeps, live status and the poller."""
+    return probepool.pooled_probe(probe_pool, target, engine, check)
 
-def normalize_target(target):
-    if not target:
-        return None
-    cleaned = target.strip()
-    if not cleaned:
-        return None
-    if cleaned.startswith(("http://", "https://")):
-        parsed = urlparse(cleaned)
-        return parsed.hostname
-    if '/' in cleaned:
-        cleaned = cleaned.split('/', 1)[0]
-    if ':' in cleaned and cleaned.count(':') == 1:
-        cleaned = cleaned.split(':', 1)[0]
-    return cleaned
+# Background reachability poller (one worker wins the lock file and polls through the pool)
+if os.environ.get('POLLER_ENABLED', '').lower() in ('1', 'true', 'yes'):
+    poller.start_singleton(SessionLocal, probe_fn=pooled_probe)
+
+# shared per-floorplan/building probe loops behind /api/status/stream (see live.py)
+live_hub = live.Hub(SessionLocal, probe_fn=pooled_probe)
+# --- Reused ping helpers (see probe.py) ---
+PING_BINARY = probe.PING_BINARY
+normalize_target = probe.normalize_target
 
 # --- Health endpoints ---
 @app.route('/api/health')
 def health():
-    return jsonify({"status": "ok", "pingBinary": bool(PING_BINARY)})
+    return jsonify({"status": "ok", "pingBinary": bool(probe.PING_BINARY), "probeEngine": probe.resolve_engine(),
+                    "probePool": {"mode": probe_pool.name, **probe_pool.stats()}, "json": app.json.name})
 
 # Serve frontend
 @app.route('/')
 def index():
-    return app.send_static_file('index.html')
+    return static_asset('index.html')
 
-# Ping endpoint
+# Ping endpoint: the probe runs in the pool; the request waits at most `wait` seconds.
+# Concurrent pings of one target share a probe and results are reused for
+# PING_CACHE_TTL seconds across workers (see pingcache.py), which is also where a
+# queued probe's result is found when the client retries.
 @app.route('/api/ping')
 def ping():
     raw_target = request.args.get('ip', '')
     target = normalize_target(raw_target)
     if not target:
         return jsonify({"success": False, "error": "invalid-target"}), 400
-    if not PING_BINARY:
+    # service check instead of a ping: check=tcp|http|https with port, path and expected status
+    try:
+        check = servicecheck.from_fields(request.args.get('check'), request.args.get('port'),
+                                         request.args.get('path'), request.args.get('status'))
+    except ValueError:
+        return jsonify({"success": False, "error": "invalid-check"}), 400
+    engine = request.args.get('engine')
+    if check is None and not probe.engine_available(engine):
         return jsonify({"success": False, "error": "ping-not-found"}), 500
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    cmd = [PING_BINARY, param, "1", target]
+    # multi-packet mode: count echo requests, interval seconds apart, with loss and min/avg/max/mdev
+    count = min(max(request.args.get('count', 1, type=int), 1), probe.PROBE_MAX_COUNT)
+    interval = None
+    if count > 1:
+        interval = min(max(request.args.get('interval', probe.PROBE_INTERVAL, type=float), probe.PROBE_MIN_INTERVAL),
+                       probe.PROBE_MAX_INTERVAL)
+    max_wait = probepool.PROBE_MAX_WAIT + (count - 1) * (interval or 0)
+    wait = min(max(request.args.get('wait', probepool.PROBE_WAIT, type=float), 0.0), max_wait)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3)
-        success = result.returncode == 0
-        time_ms = None
-        error = None
-        if success:
-            match = re.search(r'time[=<]([0-9]+)ms', result.stdout)
-            if match:
-                time_ms = match.group(1)
-        else:
-            error = "no-response"
-        return jsonify({"success": success, "time": time_ms, "error": error})
-    except Exception:
-        return jsonify({"success": False, "error": "exception"})
+        res = probe_pool.probe(target, engine, wait=wait, count=count, interval=interval, check=check)
+    except probepool.Busy:
+        resp = jsonify({"success": False, "time": None, "error": "busy"})
+        resp.status_code = 429
+        resp.headers['Retry-After'] = '1'
+        return resp
+    if res is None:
+        resp = jsonify({"success": None, "time": None, "error": None, "status": "queued"})
+        resp.status_code = 202
+        resp.headers['Retry-After'] = '1'
+        return resp
+    return jsonify(res)
+
+# Sweep endpoint: ping many devices concurrently and stream results as NDJSON
+@app.route('/api/ping/sweep', methods=['POST'])
+def ping_sweep():
+    data = request.get_json(silent=True) or {}
+    device_ids = data.get('device_ids')
+    floorplan_id = data.get('floorplan_id')
+    building_id = data.get('building_id')
+    if not device_ids and floorplan_id is None and building_id is None:
+        return jsonify({"error": "device_ids, floorplan_id or building_id required"}), 400
+    try:
+        concurrency = int(data['concurrency']) if data.get('concurrency') is not None else None
+        deadline = float(data['deadline']) if data.get('deadline') is not None else None
+        if device_ids is not None:
+            device_ids = [int(i) for i in device_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid-parameters"}), 400
+    engine = data.get('engine')
+    if not probe.engine_available(engine):
+        return jsonify({"success": False, "error": "ping-not-found"}), 500
+
+    session = db()
+    q = session.query(Device.id, Device.name, Device.ip, Device.check_type, Device.check_port,
+                      Device.check_path, Device.check_status)
+    if device_ids:
+        q = q.filter(Device.id.in_(device_ids))
+    if floorplan_id is not None:
+        q = q.filter(Device.floorplan_id == floorplan_id)
+    if building_id is not None:
+        q = q.filter(Device.building_id == building_id)
+    rows = q.order_by(Device.id).all()
+    # release the connection now rather than after the (long) streamed sweep
+    session.close()
+    meta = {r.id: r for r in rows}
+
+    def generate():
+        up = 0
+        history = []
+        # devices with a service check (check_type tcp/http/https) get it instead of a ping
+        targets = ((r.id, r.ip, servicecheck.from_device(r)) for r in rows)
+        for device_id, res in probe.sweep(targets, concurrency=concurrency, deadline=deadline,
+                                          probe=lambda target, check=None: pooled_probe(target, engine, check)):
+            if res["success"]:
+                up += 1
+            if res["error"] not in probe.NOT_PROBED:
+                history.append(poller.status_row(device_id, res))
+            d = meta[device_id]
+            yield json.dumps({"id": d.id, "name": d.name, "ip": d.ip, **res}) + "\n"
+        yield json.dumps({"done": True, "total": len(rows), "up": up, "down": len(rows) - up}) + "\n"
+        # on-demand sweeps also refresh last-known status
+        poller.record_status(SessionLocal, history)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# --- Last-known reachability (written by the poller and by sweeps) ---
+serialize_status = serializers.status_dict
+
+@app.route('/api/status')
+def device_status():
+    session = db()
+    device_ids = None
+    # ids=1,2,3: just these devices (e.g. the page of the device list on screen)
+    if request.args.get('ids') is not None:
+        try:
+            device_ids = [int(i) for i in request.args['ids'].split(',') if i.strip()]
+        except ValueError:
+            return jsonify({"error": "invalid-ids"}), 400
+    floorplan_id = request.args.get('floorplan_id', type=int)
+    building_id = request.args.get('building_id', type=int)
+    if floorplan_id is not None or building_id is not None:
+        q = session.query(Device.id)
+        if floorplan_id is not None:
+            q = q.filter(Device.floorplan_id == floorplan_id)
+        if building_id is not None:
+            q = q.filter(Device.building_id == building_id)
+        scoped = [r.id for r in q]
+        device_ids = scoped if device_ids is None else sorted(set(scoped) & set(device_ids))
+    if device_ids is None:
+        latest = poller.latest_status(session)
+    else:
+        latest = {}
+        # chunks stay under SQLite's bound-parameter limit
+        for i in range(0, len(device_ids), 500):
+            latest.update(poller.latest_status(session, device_ids[i:i + 500]))
+    return jsonify([serialize_status(s) for s in latest.values()])
+
+@app.route('/api/devices/<int:device_id>/status-history')
+def device_status_history(device_id):
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    rows = db().query(StatusHistory).filter(StatusHistory.device_id == device_id).order_by(StatusHistory.id.desc()).limit(limit).all()
+    return jsonify([serialize_status(s) for s in rows])
+
+@app.route('/api/status/stream')
+def device_status_stream():
+    """Server-sent events: a `snapshot` of last-known status, then a `status` event per up/down change."""
+    floorplan_id = request.args.get('floorplan_id', type=int)
+    building_id = request.args.get('building_id', type=int)
+    if (floorplan_id is None) == (building_id is None):
+        return jsonify({"error": "floorplan_id or building_id required"}), 400
+    scope = ('floorplan', floorplan_id) if floorplan_id is not None else ('building', building_id)
+    try:
+        sub = live_hub.subscribe(*scope)
+    except live.TooManyStreams:
+        # the building editor falls back to /api/status and retries later
+        resp = jsonify({"error": "too-many-streams"})
+        resp.headers['Retry-After'] = '30'
+        return resp, 503
+
+    def generate():
+        try:
+            yield from live.events(sub)
+        finally:
+            # runs when the client disconnects too (the server closes the iterator)
+            live_hub.unsubscribe(sub)
+
+    resp = Response(generate(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    # nginx and similar proxies would otherwise buffer the stream
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+# --- Conditional GET helpers ---
+# List endpoints send a strong ETag built from table_versions counters (see
+# versions.py) plus `Cache-Control: no-cache`, so browsers revalidate every
+# time and a matching `If-None-Match` is answered with 304 after reading only
+# the counters.
+def not_modified(tag):
+    if tag is None or not request.if_none_match.contains(tag):
+        return None
+    return with_etag(Response(status=304), tag)
+
+
+def with_etag(resp, tag):
+    if tag is not None:
+        resp.set_etag(tag)
+        resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
+# `?format=columns` on list endpoints: parallel arrays instead of one object per row
+# (see serializers.columns); the ETag stays the same since caches key by full URL
+def wants_columns():
+    return request.args.get('format') == 'columns'
 
 # --- Buildings endpoints (for master map) ---
 @app.route('/api/buildings', methods=['GET', 'POST'])
 def buildings():
-    session = SessionLocal()
+    session = db()
     if request.method == 'GET':
-        bs = session.query(Building).all()
-        out = [{"id": b.id, "name": b.name, "lat": b.lat, "lon": b.lon} for b in bs]
-        session.close()
-        return jsonify(out)
+        tag = versions.etag(session, 'buildings')
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        rows = serializers.fetch(session, serializers.select_buildings().order_by(Building.id))
+        if wants_columns():
+            return with_etag(jsonify(serializers.columns(rows, serializers.BUILDING_FIELDS)), tag)
+        return with_etag(jsonify([serializers.building_dict(r) for r in rows]), tag)
     data = request.json
     if not data or not data.get('name'):
         return jsonify({"error": "name required"}), 400
     b = Building(name=data['name'], lat=data.get('lat'), lon=data.get('lon'))
     session.add(b)
     session.commit()
-    b_id = b.id
-    session.close()
-    return jsonify({"id": b_id})
+    return jsonify({"id": b.id})
 
 # --- File upload for floorplans ---
 @app.route('/api/floorplans', methods=['GET', 'POST'])
 def floorplans():
-    session = SessionLocal()
+    session = db()
     if request.method == 'GET':
-        fps = session.query(Floorplan).all()
-        out = [
-            {"id": f.id, "building_id": f.building_id, "filename": f.filename, "created": f.created.isoformat()} for f in fps
-        ]
-        session.close()
-        return jsonify(out)
+        tag = versions.etag(session, 'floorplans')
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        out = serializers.floorplan_rows(session, serializers.select_floorplans().order_by(Floorplan.id))
+        if wants_columns():
+            return with_etag(jsonify(serializers.columns(out, serializers.FLOORPLAN_FIELDS)), tag)
+        return with_etag(jsonify(out), tag)
 
     file = request.files.get('file')
     building = request.form.get('building')
     if not file or not building:
         return jsonify({"error": "file and building required"}), 400
-    filename = file.filename
-    save_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(save_path)
+    # the client's name is only a label; the file is stored under its content hash
+    filename = os.path.basename(file.filename or '') or 'floorplan'
+    stored = storage.store_upload(file.stream, filename)
     # ensure building exists or create
     b = session.query(Building).filter_by(name=building).one_or_none()
     if not b:
         b = Building(name=building)
         session.add(b)
         session.commit()
-    fp = Floorplan(building_id=b.id, filename=filename)
-    session.add(fp)
-    session.commit()
-    fp_id = fp.id
-    session.close()
-    return jsonify({"id": fp_id, "filename": filename})
-
+    # the same plan uploaded again for the same building is the same floorplan
+    fp = session.query(Floorplan).filter_by(building_id=b.id, content_hash=stored['hash']).order_by(Floorplan.id).first()
+    duplicate = fp is not None
+    if not duplicate:
+        size = storage.image_size(stored['path'])
+        fp = Floorplan(building_id=b.id, filename=filename, content_hash=stored['hash'], stored_name=stored['name'],
+                       width=size[0] if size else None, height=size[1] if size else None)
+        session.add(fp)
+        session.commit()
+        # cut the image into a tile pyramid + preview; untiled plans still work
+        try:
+            if tiles.tile_floorplan(fp, stored['path']):
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            print('Warning: tiling floorplan failed:', e)
+    out = {"id": fp.id, "filename": fp.filename, "url": storage.floorplan_url(fp), "hash": fp.content_hash,
+           "width": fp.width, "height": fp.height, "duplicate": duplicate}
+    return jsonify(out)
+
+# Content-addressed uploads, their tiles and previews never change behind a
+# URL (different bytes get a different hash), so browsers may cache them for good.
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    # legacy plans stored under the client's name may be overwritten, so they are only revalidated
+    return assets.send_asset(UPLOAD_FOLDER, filename, immutable=storage.is_content_addressed(filename))
+
+def send_tile_file(key, relpath):
+    try:
+        folder = tiles.tile_dir(key)
+    except ValueError:
+        return jsonify({"error": "not-found"}), 404
+    return assets.send_asset(folder, relpath, immutable=True)
+
+@app.route('/api/tiles/<key>/<int:z>/<int:x>/<int:y>.png')
+def floorplan_tile(key, z, x, y):
+    return send_tile_file(key, f'{z}/{x}_{y}.png')
+
+@app.route('/api/tiles/<key>/preview.png')
+def floorplan_preview(key):
+    return send_tile_file(key, 'preview.png')
 
 # --- Devices CRUD ---
+DEVICE_FIELDS = serializers.DEVICE_FIELDS
+DEVICE_EDITABLE = DEVICE_FIELDS[1:]
+# the prior state returned for undo (same shape as GET /api/devices/<id>)
+device_snapshot = serializers.device_dict
+DEVICES_MAX_LIMIT = int(os.environ.get('DEVICES_MAX_LIMIT', '5000'))
+
+def check_is_valid(d):
+    """Whether `d`'s `check_*` fields describe a usable service check (or none)."""
+    try:
+        servicecheck.from_fields(d.check_type, d.check_port, d.check_path, d.check_status)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def poll_interval_is_valid(d):
+    """Whether `d.poll_interval` is unset or a number of seconds the poller accepts."""
+    v = d.poll_interval
+    return v is None or (isinstance(v, (int, float)) and not isinstance(v, bool) and v >= poller.POLL_MIN_INTERVAL)
+
+def filter_devices(q, args):
+    """Apply the `GET /api/devices` filters (floorplan_id, building_id, device_type, ip prefix, mac, q text)."""
+    floorplan_id = args.get('floorplan_id', type=int)
+    building_id = args.get('building_id', type=int)
+    device_type = args.get('device_type')
+    ip_prefix = args.get('ip')
+    mac = normalize_mac(args.get('mac'))
+    text = (args.get('q') or '').strip()
+    if floorplan_id is not None:
+        q = q.filter(Device.floorplan_id == floorplan_id)
+    if building_id is not None:
+        q = q.filter(Device.building_id == building_id)
+    if device_type:
+        q = q.filter(Device.device_type == device_type)
+    if ip_prefix:
+        # half-open range instead of LIKE so the ip index is used
+        q = q.filter(Device.ip >= ip_prefix, Device.ip < ip_prefix[:-1] + chr(ord(ip_prefix[-1]) + 1))
+    if mac:
+        q = q.filter(normalized_mac(Device.mac) == mac)
+    if text:
+        like = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        q = q.filter(or_(*(col.ilike(like, escape='\\') for col in (Device.name, Device.ip, Device.mac, Device.room, Device.note))))
+    return q
+
 @app.route('/api/devices', methods=['GET', 'POST'])
 def devices():
-    session = SessionLocal()
+    session = db()
     if request.method == 'GET':
-        devices = session.query(Device).all()
-        out = [
-            {"id": d.id, "name": d.name, "ip": d.ip, "device_type": d.device_type, "building_id": d.building_id, "floorplan_id": d.floorplan_id, "x": d.x, "y": d.y, "note": d.note, "mac": d.mac, "room": d.room} for d in devices
-        ]
-        session.close()
-        return jsonify(out)
+        # the ETag covers every filter/page of the list; caches key it by full URL
+        tag = versions.etag(session, 'devices')
+        cached = not_modified(tag)
+        if cached is not None:
+            return cached
+        # keyset pagination: rows come back in id order; pass the last id as `after_id`
+        after_id = request.args.get('after_id', type=int)
+        limit = request.args.get('limit', type=int)
+        q = filter_devices(serializers.select_devices(), request.args)
+        if after_id is not None:
+            q = q.filter(Device.id > after_id)
+        q = q.order_by(Device.id)
+        if limit is not None:
+            limit = max(1, min(limit, DEVICES_MAX_LIMIT))
+            q = q.limit(limit + 1)
+        rows = serializers.fetch(session, q)
+        next_after_id = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_after_id = rows[-1].id
+        if wants_columns():
+            resp = jsonify(serializers.columns(rows, DEVICE_FIELDS))
+        else:
+            resp = jsonify(serializers.device_dicts(rows))
+        if next_after_id is not None:
+            resp.headers['X-Next-After-Id'] = str(next_after_id)
+        return with_etag(resp, tag)
     data = request.json
-    d = Device(name=data.get('name'), ip=data.get('ip'), device_type=data.get('device_type'), building_id=data.get('building_id'), floorplan_id=data.get('floorplan_id'), x=data.get('x'), y=data.get('y'), note=data.get('note'), mac=data.get('mac'), room=data.get('room'))
+    d = Device(name=data.get('name'), ip=data.get('ip'), device_type=data.get('device_type'), building_id=data.get('building_id'), floorplan_id=data.get('floorplan_id'), x=data.get('x'), y=data.get('y'), note=data.get('note'), mac=data.get('mac'), room=data.get('room'),
+               check_type=data.get('check_type'), check_port=data.get('check_port'), check_path=data.get('check_path'), check_status=data.get('check_status'),
+               poll_interval=data.get('poll_interval'))
+    if not check_is_valid(d):
+        return jsonify({"error": "invalid-check"}), 400
+    if not poll_interval_is_valid(d):
+        return jsonify({"error": "invalid-poll-interval"}), 400
     session.add(d)
     session.commit()
-    d_id = d.id
-    session.close()
-    return jsonify({"id": d_id})
+    return jsonify({"id": d.id})
 
 @app.route('/api/devices/<int:device_id>', methods=['GET','PUT', 'DELETE'])
 def device_modify(device_id):
-    session = SessionLocal()
+    session = db()
     d = session.get(Device, device_id)
     if not d:
-        session.close()
         return jsonify({"error": "not-found"}), 404
     if request.method == 'DELETE':
         # snapshot before delete
-        snapshot = {"id": d.id, "name": d.name, "ip": d.ip, "device_type": d.device_type, "building_id": d.building_id, "floorplan_id": d.floorplan_id, "x": d.x, "y": d.y, "note": d.note, "mac": d.mac, "room": d.room}
+        snapshot = device_snapshot(d)
         session.delete(d)
         session.commit()
-        session.close()
         return jsonify({"status": "deleted", "snapshot": snapshot})
     if request.method == 'GET':
-        out = {"id": d.id, "name": d.name, "ip": d.ip, "device_type": d.device_type, "building_id": d.building_id, "floorplan_id": d.floorplan_id, "x": d.x, "y": d.y, "note": d.note, "mac": d.mac, "room": d.room}
-        session.close()
-        return jsonify(out)
+        return jsonify(serializers.device_dict(d))
     data = request.json
     # store previous state for snapshot
-    prev = {"id": d.id, "name": d.name, "ip": d.ip, "device_type": d.device_type, "building_id": d.building_id, "floorplan_id": d.floorplan_id, "x": d.x, "y": d.y, "note": d.note}
-    for k in ('name', 'ip', 'device_type', 'building_id', 'floorplan_id', 'x', 'y', 'note', 'mac', 'room'):
+    prev = device_snapshot(d)
+    for k in DEVICE_EDITABLE:
         if k in data:
             setattr(d, k, data[k])
-    session.add(d)
+    if not check_is_valid(d):
+        session.rollback()
+        return jsonify({"error": "invalid-check"}), 400
+    if not poll_interval_is_valid(d):
+        session.rollback()
+        return jsonify({"error": "invalid-poll-interval"}), 400
     session.commit()
-    session.close()
     return jsonify({"status": "updated", "prev": prev})
 
+# --- Bulk device endpoints ---
+# Multi-select edits in the building editor (group move, retype, delete) and
+# their undo/redo go through these so a group action is one request and one
+# commit. Each applies all items or none and returns the prior state per item.
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '5000'))
+
+
+def load_devices_by_id(session, ids):
+    """`{id: Device}` for `ids`, fetched in chunks that stay under SQLite's bound-parameter limit."""
+    found = {}
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        for d in session.query(Device).filter(Device.id.in_(ids[i:i + 500])):
+            found[d.id] = d
+    return found
+
+
+def bulk_items(data, key):
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items or len(items) > BULK_MAX_ITEMS:
+        return None
+    return items
+
+
+@app.route('/api/devices/bulk', methods=['PATCH', 'DELETE'])
+def devices_bulk():
+    data = request.get_json(silent=True) or {}
+    if request.method == 'DELETE':
+        ids = bulk_items(data, 'ids')
+        if ids is None or not all(isinstance(i, int) for i in ids):
+            return jsonify({"error": "ids-required"}), 400
+        changes = [{'id': i} for i in ids]
+    else:
+        changes = bulk_items(data, 'changes')
+        if changes is None or not all(isinstance(c, dict) and isinstance(c.get('id'), int) for c in changes):
+            return jsonify({"error": "changes-required"}), 400
+    session = db()
+    found = load_devices_by_id(session, {c['id'] for c in changes})
+    missing = sorted({c['id'] for c in changes} - found.keys())
+    if missing:
+        return jsonify({"error": "not-found", "ids": missing}), 404
+    if request.method == 'DELETE':
+        snapshots = []
+        for c in changes:
+            d = found.pop(c['id'], None)
+            if d is not None:  # ignore repeated ids
+                snapshots.append(device_snapshot(d))
+                session.delete(d)
+        session.commit()
+        return jsonify({"status": "deleted", "count": len(snapshots), "snapshots": snapshots})
+    prev = []
+    for c in changes:
+        d = found[c['id']]
+        prev.append(device_snapshot(d))
+        for k in DEVICE_EDITABLE:
+            if k in c:
+                setattr(d, k, c[k])
+        if not check_is_valid(d):
+            session.rollback()
+            return jsonify({"error": "invalid-check", "id": d.id}), 400
+        if not poll_interval_is_valid(d):
+            session.rollback()
+            return jsonify({"error": "invalid-poll-interval", "id": d.id}), 400
+    session.commit()
+    return jsonify({"status": "updated", "count": len(prev), "prev": prev})
+
+
+@app.route('/api/devices/bulk/restore', methods=['POST'])
+def devices_bulk_restore():
+    """Restore many snapshots (e.g. undo of a group delete) in one transaction.
+
+    Same id rules as `/api/devices/restore`: a snapshot's id is reused when it
+    is free, otherwise the device gets a new id.
+    """
+    data = request.get_json(silent=True) or {}
+    snaps = bulk_items(data, 'snapshots')
+    if snaps is None or not all(isinstance(s, dict) for s in snaps):
+        return jsonify({"error": "snapshots-required"}), 400
+    session = db()
+    try:
+        wanted = {s['id'] for s in snaps if isinstance(s.get('id'), int)}
+        taken = set(load_devices_by_id(session, wanted))
+        created = []
+        for s in snaps:
+            payload = {k: s.get(k) for k in DEVICE_EDITABLE if k in s}
+            payload['device_type'] = payload.get('device_type') or 'unknown'
+            payload['name'] = payload.get('name') or ''
+            desired_id = s.get('id') if isinstance(s.get('id'), int) else None
+            preserve = desired_id is not None and desired_id not in taken
+            if preserve:
+                payload['id'] = desired_id
+                taken.add(desired_id)
+            d = Device(**payload)
+            session.add(d)
+            created.append((desired_id, d, preserve))
+        session.flush()
+        for desired_id, d, preserve in created:
+            session.add(Audit(action='restore', requested_id=desired_id, restored_id=d.id, preserved_id=preserve))
+        session.commit()
+        restored = [{"requestedId": desired_id, "id": d.id, "preservedId": preserve} for desired_id, d, preserve in created]
+        return jsonify({"restored": restored})
+    except Exception as e:
+        session.rollback()
+        return jsonify({"error": "restore-failed", "detail": str(e)}), 500
+
 # --- Icons management endpoints ---
+ASSET_MANIFEST_MAX_PATHS = 200
+
+@app.route('/api/assets/manifest')
+def assets_manifest():
+    """`?v=` versions of the top-level icons plus any `path=icons/...` asked for (mapped standard icons)."""
+    paths = ['icons/' + f for f in sorted(os.listdir(ICONS_FOLDER)) if os.path.isfile(os.path.join(ICONS_FOLDER, f))]
+    paths += request.args.getlist('path')[:ASSET_MANIFEST_MAX_PATHS]
+    files = assets.manifest(STATIC_FOLDER, paths)
+    tag = 'assets.' + hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+    return with_etag(jsonify({"files": files}), tag)
+
 @app.route('/api/icons/list')
 def icons_list():
     icons_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'icons', 'standard')
     icons_dir = os.path.normpath(icons_dir)
     if not os.path.isdir(icons_dir):
         return jsonify([])
-    files = sorted([f for f in os.listdir(icons_dir) if os.path.isfile(os.path.join(icons_dir, f))])
-    return jsonify(files)
+    # adding/removing/renaming an icon changes the directory mtime
+    tag = f'icons.{os.stat(icons_dir).st_mtime_ns}'
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+    # scandir's d_type answers is_file() without a stat per icon
+    with os.scandir(icons_dir) as entries:
+        files = sorted(e.name for e in entries if e.is_file())
+    return with_etag(jsonify(files), tag)
+
+ICON_SEARCH_MAX_LIMIT = 500
+
+@app.route('/api/icons/search')
+def icons_search():
+    catalog = icon_catalog.get_catalog()
+    # results only change with the library, which the catalog version tracks
+    tag = f'icon-catalog.{catalog.version}'
+    cached = not_modified(tag)
+    if cached is not None:
+        return cached
+    q = request.args.get('q', '')
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 50, type=int)), ICON_SEARCH_MAX_LIMIT)
+    total, items = catalog.search(q, offset, limit)
+    return with_etag(jsonify({"query": q, "total": total, "offset": offset, "limit": limit, "items": items}), tag)
 
 @app.route('/api/icons/apply', methods=['POST'])
 def icons_apply():
@@ -255,35 +715,41 @@ def icons_apply():
         return jsonify({"error":"copy-failed", "detail": str(e)}), 500
 
 # --- CSV import endpoint ---
+# Runs as a background job; poll GET /api/jobs/<id> for progress.
+# `wait=1` runs it inside the request instead (scripts, tests).
 @app.route('/api/devices/import', methods=['POST'])
 def import_devices():
-    session = SessionLocal()
     f = request.files.get('file')
     if not f:
         return jsonify({"error": "file required"}), 400
-    stream = io.StringIO(f.stream.read().decode('utf-8'))
-    reader = csv.DictReader(stream)
-    created = 0
-    for row in reader:
-        name = row.get('name') or row.get('hostname') or row.get('device')
-        # ensure `name` is never None because Device.name is NOT NULL
-        name = name or ''
-        ip = row.get('ip') or row.get('address')
-        dtype = row.get('type') or row.get('device_type') or 'unknown'
-        building_name = row.get('building')
-        building = None
-        if building_name:
-            building = session.query(Building).filter_by(name=building_name).one_or_none()
-            if not building:
-                building = Building(name=building_name)
-                session.add(building)
-                session.commit()
-        d = Device(name=name, ip=ip, device_type=dtype, building_id=building.id if building else None)
-        session.add(d)
-        created += 1
-    session.commit()
-    session.close()
-    return jsonify({"created": created})
+    try:
+        job_id = jobs.create_job(SessionLocal, f.stream, filename=f.filename,
+                                 mode=request.values.get('mode', 'insert'),
+                                 key=request.values.get('key', 'mac'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.values.get('wait', '').lower() in ('1', 'true', 'yes'):
+        jobs.run_job(SessionLocal, job_id)
+        out = jobs.serialize_job(db().get(ImportJob, job_id))
+        if out['status'] == 'failed':
+            return jsonify({"error": out['error'], "jobId": job_id}), 400
+        return jsonify(out)
+    jobs.submit(SessionLocal, job_id)
+    resp = jsonify({"jobId": job_id, "status": "queued"})
+    resp.status_code = 202
+    resp.headers['Location'] = f'/api/jobs/{job_id}'
+    return resp
+
+
+@app.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    job = db().get(ImportJob, job_id)
+    if job is None:
+        return jsonify({"error": "not-found"}), 404
+    if jobs.is_abandoned(job):
+        # the worker that owned it is gone; run it here (claim() prevents doubles)
+        jobs.submit(SessionLocal, job_id)
+    return jsonify(jobs.serialize_job(job))
 
 # --- Admin helper: cleanup test artifacts ---
 @app.route('/api/admin/cleanup-tests', methods=['POST'])
@@ -292,19 +758,23 @@ def admin_cleanup_tests():
     provided = request.headers.get('X-Admin-Token') or request.args.get('token')
     if not token or provided != token:
         return jsonify({"error": "unauthorized"}), 403
-    session = SessionLocal()
+    session = db()
     # find buildings whose name starts with or contains E2E
     targets = session.query(Building).filter(Building.name.like('E2E%')).all()
     removed = 0
     for b in targets:
         fps = session.query(Floorplan).filter_by(building_id=b.id).all()
         for fp in fps:
-            # attempt to remove uploaded file
-            path = os.path.join(UPLOAD_FOLDER, fp.filename)
-            try:
-                if os.path.exists(path): os.remove(path)
-            except Exception as e:
-                print('failed to remove', path, e)
+            # attempt to remove uploaded file, unless another floorplan shares its content
+            shared = fp.content_hash and session.query(Floorplan).filter(
+                Floorplan.content_hash == fp.content_hash, Floorplan.id != fp.id).count()
+            if not shared:
+                path = storage.stored_path(fp)
+                try:
+                    if os.path.exists(path): os.remove(path)
+                except Exception as e:
+                    print('failed to remove', path, e)
+                tiles.remove_tiles(tiles.tile_key(fp))
             # remove devices for this floorplan
             session.query(Device).filter_by(floorplan_id=fp.id).delete()
             session.delete(fp)
@@ -313,7 +783,6 @@ def admin_cleanup_tests():
         session.delete(b)
         removed += 1
     session.commit()
-    session.close()
     return jsonify({"removed_buildings": removed})
 
 # --- Admin helper: audit log for restore actions ---------------------------
@@ -325,8 +794,7 @@ def admin_audit():
         return jsonify({"error": "unauthorized"}), 403
     # Prefer database-backed audit if available
     try:
-        session = SessionLocal()
-        audits = session.query(Audit).order_by(Audit.id.desc()).limit(200).all()
+        audits = db().query(Audit).order_by(Audit.id.desc()).limit(200).all()
         out = []
         for a in audits:
             out.append({
@@ -338,7 +806,6 @@ def admin_audit():
                 'preservedId': bool(a.preserved_id),
                 'detail': a.detail,
             })
-        session.close()
         return jsonify(out)
     except Exception:
         # fallback to file-based audit for older deployments
@@ -373,8 +840,8 @@ def admin_audit_cleanup():
     before_param = request.args.get('before') or payload.get('before')
     days_param = request.args.get('days') or payload.get('days')
 
+    session = db()
     try:
-        session = SessionLocal()
         if before_param:
             # support 'Z' suffix
             if before_param.endswith('Z'):
@@ -390,11 +857,9 @@ def admin_audit_cleanup():
 
         removed = session.query(Audit).filter(Audit.timestamp < cutoff).delete(synchronize_session=False)
         session.commit()
-        session.close()
         return jsonify({"removed": removed})
     except Exception as e:
         session.rollback()
-        session.close()
         return jsonify({"error": "cleanup-failed", "detail": str(e)}), 500
 
 # NOTE: duplicate CSV-import handler (previously present here) was removed because it
@@ -407,15 +872,14 @@ def admin_audit_cleanup():
 # return the new id (preservedId=false).
 @app.route('/api/devices/restore', methods=['POST'])
 def devices_restore():
-    session = SessionLocal()
+    session = db()
     data = request.json or {}
     # accept either { "snapshot": {...} } or a bare snapshot object
     snap = data.get('snapshot') if isinstance(data.get('snapshot'), dict) else (data if isinstance(data, dict) else None)
     if not snap:
         return jsonify({"error": "snapshot-required"}), 400
 
-    allowed_keys = ('id','name','ip','device_type','building_id','floorplan_id','x','y','note','mac','room')
-    payload = {k: snap.get(k) for k in allowed_keys if k in snap}
+    payload = {k: snap.get(k) for k in DEVICE_FIELDS if k in snap}
     desired_id = payload.get('id')
 
     try:
@@ -452,7 +916,6 @@ def devices_restore():
                             af.write(json.dumps(entry) + "\n")
                     except Exception:
                         pass
-                session.close()
                 return jsonify({"restored": True, "id": new_id, "preservedId": True})
         # fallback — create normally (autoincrement id)
         d = Device(
@@ -465,7 +928,12 @@ def devices_restore():
             y=payload.get('y'),
             note=payload.get('note'),
             mac=payload.get('mac'),
-            room=payload.get('room')
+            room=payload.get('room'),
+            check_type=payload.get('check_type'),
+            check_port=payload.get('check_port'),
+            check_path=payload.get('check_path'),
+            check_status=payload.get('check_status'),
+            poll_interval=payload.get('poll_interval')
         )
         session.add(d)
         session.commit()
@@ -493,11 +961,9 @@ def devices_restore():
                     af.write(json.dumps(entry) + "\n")
             except Exception:
                 pass
-        session.close()
         return jsonify({"restored": True, "id": new_id, "preservedId": False})
     except Exception as e:
         session.rollback()
-        session.close()
         return jsonify({"error": "restore-failed", "detail": str(e)}), 500
 
 if __name__ == '__main__':
@@ -0,0 +1,194 @@
+"""Static asset serving: strong ETags, versioned URLs and precompressed variants.
+
+The frontend (JS, CSS, HTML, `/icons`) and `/uploads` are served through
+`send_asset`:
+
+- The ETag is the file's SHA-256 (computed once per mtime/size and cached),
+  so it is the same in every worker and after restarts, and a revalidation
+  is answered with 304.
+- A request whose `?v=` matches the file's current version (`version()`, a
+  prefix of the hash) gets `Cache-Control: public, max-age=31536000,
+  immutable`; anything else gets `no-cache` and is revalidated. HTML pages are
+  rewritten to load their JS/CSS with `?v=`, and `/api/assets/manifest` gives
+  the frontend the versions of icon files.
+- When the client accepts it and an up-to-date `<file>.br` or `<file>.gz` sits
+  next to the file (written by `python backend/assets.py`), that is sent with
+  `Content-Encoding` instead.
+- `send_file(conditional=True)` answers `Range` requests and passes the file
+  to the server's `wsgi.file_wrapper` (sendfile under gunicorn).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import make_response, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # only .gz variants are built
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 31536000
+IMMUTABLE_CACHE_CONTROL = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+VERSION_LENGTH = 16
+# text formats worth precompressing; images are already compressed
+COMPRESSIBLE = ('.svg', '.js', '.css', '.json', '.csv')
+# Content-Encoding -> suffix of the precompressed file, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MIN_COMPRESS_SIZE = 256
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path, st=None):
+    """SHA-256 of a file, cached until its mtime or size changes."""
+    st = st or os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _digests.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    with _digests_lock:
+        _digests[path] = (key, digest)
+    return digest
+
+
+def version(path):
+    """The `?v=` value that pins the current content of `path`."""
+    return file_digest(path)[:VERSION_LENGTH]
+
+
+def _encoded_variant(path, st):
+    if not path.endswith(COMPRESSIBLE):
+        return None, path
+    for encoding, suffix in ENCODINGS:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            variant_st = os.stat(path + suffix)
+        except OSError:
+            continue
+        # a variant older than its source is stale (e.g. an icon replaced by /api/icons/apply)
+        if variant_st.st_mtime_ns >= st.st_mtime_ns:
+            return encoding, path + suffix
+    return None, path
+
+
+def send_asset(folder, filename, immutable=False):
+    """Serve `folder/filename` with the caching described in the module docstring.
+
+    `immutable=True` is for URLs that are content-addressed already
+    (`/uploads/<sha256>.<ext>`) and need no `?v=`.
+    """
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    if path.endswith('.html'):
+        return send_page(folder, path)
+    st = os.stat(path)
+    digest = file_digest(path, st)
+    pinned = immutable or request.args.get('v') == digest[:VERSION_LENGTH]
+    encoding, send_path = _encoded_variant(path, st)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    resp = send_file(send_path, mimetype=mimetype, conditional=True,
+                     etag=digest[:32] + (f'-{encoding}' if encoding else ''), last_modified=st.st_mtime)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    if path.endswith(COMPRESSIBLE):
+        resp.vary.add('Accept-Encoding')
+    resp.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if pinned else 'no-cache'
+    return resp
+
+
+_ASSET_REF = re.compile(r'''((?:src|href)=["'])(/[^"'?#:]+\.(?:js|css))(["'])''')
+
+
+def versioned_html(folder, html):
+    """Append `?v=<version>` to the page's local script and stylesheet references."""
+    def add_version(m):
+        path = safe_join(folder, m.group(2).lstrip('/'))
+        if path is None or not os.path.isfile(path):
+            return m.group(0)
+        return f'{m.group(1)}{m.group(2)}?v={version(path)}{m.group(3)}'
+    return _ASSET_REF.sub(add_version, html)
+
+
+def send_page(folder, path):
+    """HTML is revalidated every time; the JS/CSS it references are pinned by version."""
+    with open(path, encoding='utf-8') as fh:
+        body = versioned_html(folder, fh.read())
+    resp = make_response(body)
+    resp.mimetype = 'text/html'
+    resp.set_etag(hashlib.sha256(body.encode('utf-8')).hexdigest()[:32])
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+
+def manifest(folder, paths):
+    """`{relative path: version}` for the given paths under `folder` that exist."""
+    out = {}
+    for rel in paths:
+        path = safe_join(folder, rel)
+        if path is not None and os.path.isfile(path):
+            out[rel] = version(path)
+    return out
+
+
+def compress_tree(root, force=False):
+    """Write `.gz` (and `.br` when `brotli` is installed) next to every compressible file under `root`.
+
+    Returns the number of variants written. Up-to-date variants are skipped
+    unless `force`.
+    """
+    written = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            if st.st_size < MIN_COMPRESS_SIZE:
+                continue
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                if not force and os.path.exists(target) and os.stat(target).st_mtime_ns >= st.st_mtime_ns:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as fh:
+                        data = fh.read()
+                packed = brotli.compress(data) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+                if len(packed) >= len(data):
+                    continue
+                tmp = target + '.tmp'
+                with open(tmp, 'wb') as out:
+                    out.write(packed)
+                os.replace(tmp, target)
+                written += 1
+    return written
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='precompress frontend assets (.gz, and .br with the brotli package)')
+    parser.add_argument('root', nargs='?', default=os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'frontend')))
+    parser.add_argument('--force', action='store_true', help='rewrite variants that are up to date')
+    args = parser.parse_args()
+    written = compress_tree(args.root, force=args.force)
+    print(f'wrote {written} compressed variants under {args.root}' + ('' if brotli else ' (brotli not installed: gzip only)'))
+
+
+if __name__ == '__main__':
+    main()
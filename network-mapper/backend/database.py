@@ -0,0 +1,133 @@
+"""Engine construction and schema setup shared by the app, the CLI tools and gunicorn.
+
+`make_engine()` builds the engine for `DATABASE_URL` with one pool profile:
+
+- SQLite files get a `QueuePool` and, on every new connection, the pragmas
+  below. WAL lets readers run alongside the single writer. `busy_timeout` makes
+  a writer wait for the lock instead of failing with "database is locked".
+  `synchronous=NORMAL` is safe under WAL and avoids an fsync per commit. The
+  mmap and page cache keep hot pages out of the read() path.
+- Postgres (`postgresql://...`, or the `postgres://` form many hosts hand out)
+  gets the same pool settings plus `pool_pre_ping` and `pool_recycle`, so
+  connections dropped by the server or a proxy are replaced transparently.
+
+`prepare_schema()` runs `migrate.upgrade` under a cross-process file lock.
+`gunicorn.conf.py` calls it once in the master before the workers fork and
+sets `SCHEMA_READY_ENV`, so workers don't race the DDL.
+"""
+import os
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, the DDL is idempotent anyway
+    fcntl = None
+
+try:
+    import migrate
+except Exception:
+    from backend import migrate
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db')
+
+# pool (all backends); per process, so the total is workers x (size + overflow)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+DB_ECHO = os.environ.get('DB_ECHO', '').lower() in ('1', 'true', 'yes')
+
+# SQLite connection pragmas
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '15000'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+# negative = KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', '-65536'))
+
+SCHEMA_LOCK = os.environ.get('SCHEMA_LOCK', os.path.join(tempfile.gettempdir(), 'network-mapper-schema.lock'))
+# set (to the database URL) once the schema is known to be current, e.g. by gunicorn's master
+SCHEMA_READY_ENV = 'NM_SCHEMA_READY'
+
+
+def normalize_url(url):
+    """`postgres://` -> `postgresql://` (SQLAlchemy 1.4+ dropped the alias)."""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def sqlite_pragmas():
+    """Pragmas run on every new SQLite connection, in order."""
+    return [
+        f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}',
+        f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}',
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+        f'PRAGMA cache_size={SQLITE_CACHE_SIZE}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def _is_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(url):
+    """`create_engine` keyword arguments for `url` (a `URL`)."""
+    options = {'echo': DB_ECHO, 'future': True}
+    if _is_memory(url):
+        # one shared connection; a pool would give each checkout its own empty database
+        return options
+    options.update(poolclass=QueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                   pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=True)
+    if url.get_backend_name() == 'sqlite':
+        # connections move between request threads, job workers and the poller
+        options['connect_args'] = {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+        # a local file is never dropped under us
+        options.update(pool_pre_ping=False, pool_recycle=-1)
+    return options
+
+
+def make_engine(url=None, **kwargs):
+    """Engine for `url` (default `DATABASE_URL`) with the pool and connection profile above."""
+    url = make_url(normalize_url(url or DATABASE_URL))
+    options = engine_options(url)
+    options.update(kwargs)
+    engine = create_engine(url, **options)
+    if url.get_backend_name() == 'sqlite' and not _is_memory(url):
+        pragmas = sqlite_pragmas()
+
+        @event.listens_for(engine, 'connect')
+        def _configure(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+    return engine
+
+
+def prepare_schema(engine, lock_path=None):
+    """Create/upgrade the schema; concurrent callers in other processes wait for the first."""
+    fh = open(lock_path or SCHEMA_LOCK, 'a')
+    try:
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        return migrate.upgrade(engine)
+    finally:
+        fh.close()
+
+
+def schema_ready(url=None):
+    return os.environ.get(SCHEMA_READY_ENV) == normalize_url(url or DATABASE_URL)
+
+
+def mark_schema_ready(url=None):
+    """Tell processes forked from this one that the schema is current."""
+    os.environ[SCHEMA_READY_ENV] = normalize_url(url or DATABASE_URL)
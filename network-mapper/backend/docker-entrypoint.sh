@@ -0,0 +1,8 @@
+#!/bin/sh
+# Build the icon atlas and the precompressed frontend variants before the server starts.
+# docker-compose.yml bind-mounts ./frontend over the copy baked into the image, which hides
+# the ones the Dockerfile built; both scripts skip files that are already up to date.
+set -e
+python scripts/build_icon_atlas.py
+python backend/assets.py
+exec "$@"
@@ -0,0 +1,209 @@
+"""In-process ICMP echo engine.
+
+One ICMP socket and one asyncio event loop (on a daemon thread) multiplex
+every outstanding echo request, so a probe costs a `sendto` instead of a
+fork/exec of `ping`. Unprivileged datagram sockets (`SOCK_DGRAM` +
+`IPPROTO_ICMP`, allowed by `net.ipv4.ping_group_range` on Linux and by
+default on macOS) are preferred; raw sockets are used when running as root.
+When neither can be opened `available()` is False and callers fall back to
+the subprocess path in `probe.py`.
+
+Results use the same `{success, time, error}` shape as `probe.ping_once`,
+with `time` as float milliseconds measured with `perf_counter`. `ping_many`
+sends several requests and summarizes them with `pingstats`, like the
+subprocess engine does with ping's output.
+"""
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+
+try:
+    import pingstats
+except Exception:
+    from backend import pingstats
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+# upper bound on echo requests waiting for a reply (sequence numbers are 16-bit)
+ICMP_MAX_INFLIGHT = int(os.environ.get('ICMP_MAX_INFLIGHT', '4096'))
+PAYLOAD = b'network-mapper'.ljust(32, b'\0')
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def build_echo(ident, seq, payload=PAYLOAD):
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def parse_reply(packet):
+    """Return `(type, ident, seq)` from an ICMP packet, skipping an IPv4 header if present.
+
+    Raw sockets (and datagram sockets on macOS) hand back the IP header; Linux
+    datagram sockets return the bare ICMP message.
+    """
+    if packet and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0f) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _code, _csum, ident, seq = struct.unpack('!BBHHH', packet[:8])
+    return icmp_type, ident, seq
+
+
+def open_socket():
+    """Open a non-blocking ICMP socket; returns `(sock, is_raw)` or `(None, False)`."""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        return sock, kind == socket.SOCK_RAW
+    return None, False
+
+
+class IcmpProber:
+    def __init__(self):
+        sock, raw = open_socket()
+        if sock is None:
+            raise PermissionError('ICMP sockets are not permitted for this process')
+        self._sock = sock
+        self._raw = raw
+        # datagram sockets get their identifier rewritten by the kernel and only
+        # see their own replies; raw sockets see everything so we filter on ident
+        self._ident = os.getpid() & 0xffff
+        self._seq = 0
+        self._waiters = {}  # seq -> (future, address)
+        self._loop = asyncio.new_event_loop()
+        self._slots = None
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='icmp-prober', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(ICMP_MAX_INFLIGHT)
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        ready.set()
+        self._loop.run_forever()
+
+    def _next_seq(self):
+        for _ in range(0x10000):
+            self._seq = (self._seq + 1) & 0xffff
+            if self._seq and self._seq not in self._waiters:
+                return self._seq
+        raise RuntimeError('no free ICMP sequence numbers')
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, addr = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            received = time.perf_counter()
+            parsed = parse_reply(data)
+            if not parsed:
+                continue
+            icmp_type, ident, seq = parsed
+            if icmp_type != ICMP_ECHO_REPLY or (self._raw and ident != self._ident):
+                continue
+            waiter = self._waiters.get(seq)
+            if waiter and waiter[1] == addr[0] and not waiter[0].done():
+                waiter[0].set_result(received)
+
+    async def _resolve(self, target):
+        try:
+            infos = await self._loop.getaddrinfo(target, None, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        except (socket.gaierror, UnicodeError):
+            return None
+        return infos[0][4][0]
+
+    async def _echo(self, address, timeout):
+        """One echo request; returns `(rtt in ms, None)` or `(None, error)`."""
+        async with self._slots:
+            seq = self._next_seq()
+            fut = self._loop.create_future()
+            self._waiters[seq] = (fut, address)
+            try:
+                sent = time.perf_counter()
+                try:
+                    await self._loop.sock_sendto(self._sock, build_echo(self._ident, seq), (address, 0))
+                except OSError:
+                    return None, "send-failed"
+                try:
+                    received = await asyncio.wait_for(fut, timeout)
+                except asyncio.TimeoutError:
+                    return None, "no-response"
+            finally:
+                self._waiters.pop(seq, None)
+        return round((received - sent) * 1000, 3), None
+
+    async def ping(self, target, timeout):
+        address = await self._resolve(target)
+        if address is None:
+            return {"success": False, "time": None, "error": "unresolved"}
+        rtt, error = await self._echo(address, timeout)
+        return {"success": error is None, "time": rtt, "error": error}
+
+    async def ping_many(self, target, count, interval, timeout):
+        """`count` echo requests `interval` seconds apart; loss and RTT statistics as in pingstats."""
+        address = await self._resolve(target)
+        if address is None:
+            return {**pingstats.result(count, []), "error": "unresolved"}
+        start = self._loop.time()
+        echoes = []
+        for i in range(count):
+            # send on a fixed schedule; replies are awaited concurrently
+            await asyncio.sleep(max(0.0, start + i * interval - self._loop.time()))
+            echoes.append(asyncio.ensure_future(self._echo(address, timeout)))
+        replies = await asyncio.gather(*echoes)
+        times = [rtt for rtt, _error in replies if rtt is not None]
+        res = pingstats.result(count, times)
+        if not times and any(error == "send-failed" for _rtt, error in replies):
+            res["error"] = "send-failed"
+        return res
+
+    def submit(self, target, timeout):
+        """Schedule a probe from any thread; returns a `concurrent.futures.Future`."""
+        return asyncio.run_coroutine_threadsafe(self.ping(target, timeout), self._loop)
+
+    def submit_many(self, target, count, interval, timeout):
+        """Like `submit`, for a multi-packet probe (see `ping_many`)."""
+        return asyncio.run_coroutine_threadsafe(self.ping_many(target, count, interval, timeout), self._loop)
+
+
+_prober = None
+_prober_lock = threading.Lock()
+_available = None
+
+
+def available():
+    global _available
+    if _available is None:
+        sock, _ = open_socket()
+        _available = sock is not None
+        if sock is not None:
+            sock.close()
+    return _available
+
+
+def get_prober():
+    global _prober
+    with _prober_lock:
+        if _prober is None:
+            _prober = IcmpProber()
+        return _prober
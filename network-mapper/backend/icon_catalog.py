@@ -0,0 +1,191 @@
+"""Searchable catalog of the icon library.
+
+The catalog tokenizes every icon in `frontend/icons/standard` by its file
+name plus the `desc` column of `frontend/icons/from-pptx/mapping.csv` (the
+icon's original name in the PowerPoint library, which keeps words such as
+"media control unit" that the file name runs together). It keeps an inverted
+index token -> icons, a sorted token list for prefix lookups and a
+single-deletion table for typo-tolerant matches, so a search never scans the
+library.
+
+`get_catalog()` rebuilds the catalog when the icon directory or either CSV
+changes (mtime), and is otherwise a few `stat` calls.
+
+Ranking: every query term must match a token of the icon. An exact token
+scores 3, a prefix 2, a token one edit away 1; icons in the `default` state
+and at 64 px (the size the picker shows) get a small bonus. Ties are broken
+by name.
+"""
+import bisect
+import csv
+import os
+import re
+import threading
+
+ICONS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'frontend', 'icons', 'standard'))
+PPTX_MAPPING = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'frontend', 'icons', 'from-pptx', 'mapping.csv'))
+ICON_EXTENSIONS = ('.png', '.svg')
+# states the library ships every icon in; searchable, but not part of the label
+STATES = {'admindown', 'critical', 'default', 'major', 'minor', 'normal', 'unknown',
+          'unmanaged', 'unreachable', 'warning'}
+SIZES = {'16', '24', '32', '48', '64', '96', '128', '256', '512'}
+NOISE = {'png', 'svg'}
+SCORE_EXACT, SCORE_PREFIX, SCORE_FUZZY = 3, 2, 1
+# terms shorter than this only match exactly or by prefix
+FUZZY_MIN_LENGTH = 4
+
+
+def tokenize(text):
+    return [t for t in re.split(r'[^a-z0-9]+', (text or '').lower()) if t and t not in NOISE]
+
+
+def _key(name):
+    """Match from-pptx/standard names: lowercase, `.png.png` collapsed, odd characters as `_`."""
+    name = name.replace('\\', '/').split('/')[-1].lower()
+    name = re.sub(r'(\.png)+$', '.png', name)
+    return re.sub(r'[^0-9a-z._-]+', '_', name).strip('_')
+
+
+def _deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def read_descriptions(icons_dir=ICONS_DIR, pptx_mapping=PPTX_MAPPING):
+    """standard icon name -> description words from the PowerPoint mapping (missing files are fine)."""
+    by_pptx_name = {}
+    try:
+        with open(pptx_mapping, newline='', encoding='utf-8') as fh:
+            for row in csv.DictReader(fh):
+                desc = (row.get('desc') or '').replace('\\', '/').split('/')[-1]
+                out = row.get('out')
+                if desc and out:
+                    by_pptx_name[_key(out)] = os.path.splitext(desc)[0]
+    except OSError:
+        return {}
+    # normalize_icons.py records which standard file each from-pptx file became (collisions get _1, _2, ...)
+    renamed = {}
+    try:
+        with open(os.path.join(icons_dir, 'mapping_normalized.csv'), newline='', encoding='utf-8') as fh:
+            for row in csv.DictReader(fh):
+                if row.get('src') and row.get('out'):
+                    renamed[_key(row['src'])] = row['out'].replace('\\', '/').split('/')[-1]
+    except OSError:
+        pass
+    return {renamed.get(k, k): desc for k, desc in by_pptx_name.items()}
+
+
+def icon_label(name):
+    words = [t for t in tokenize(os.path.splitext(name)[0]) if t not in STATES and t not in SIZES and t != 'device']
+    if words and words[0].isdigit():
+        words = words[1:]
+    return ' '.join(w.capitalize() for w in words) or name
+
+
+class IconCatalog:
+    def __init__(self, names, descriptions=None, version=None):
+        descriptions = descriptions or {}
+        self.version = version
+        self.names = sorted(names)
+        self.labels = [icon_label(n) for n in self.names]
+        self.tags = []
+        self.bonus = []
+        self.postings = {}
+        for i, name in enumerate(self.names):
+            tokens = list(dict.fromkeys(tokenize(name) + tokenize(descriptions.get(name))))
+            self.tags.append([t for t in tokens if not t.isdigit() or t not in SIZES])
+            self.bonus.append(0.2 * ('default' in tokens) + 0.1 * ('64' in tokens))
+            for t in tokens:
+                self.postings.setdefault(t, set()).add(i)
+        self.vocabulary = sorted(self.postings)
+        self.neighbours = {}
+        for t in self.vocabulary:
+            if len(t) >= FUZZY_MIN_LENGTH - 1:
+                for d in _deletions(t):
+                    self.neighbours.setdefault(d, set()).add(t)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _term_matches(self, term):
+        """token -> score for one query term."""
+        matches = {}
+        lo = bisect.bisect_left(self.vocabulary, term)
+        for t in self.vocabulary[lo:]:
+            if not t.startswith(term):
+                break
+            matches[t] = SCORE_EXACT if t == term else SCORE_PREFIX
+        if len(term) >= FUZZY_MIN_LENGTH:
+            # one insertion, deletion or substitution away: share a single-deletion form
+            candidates = set(self.neighbours.get(term, ()))
+            for d in _deletions(term):
+                if d in self.postings:
+                    candidates.add(d)
+                candidates.update(self.neighbours.get(d, ()))
+            for t in candidates:
+                matches.setdefault(t, SCORE_FUZZY)
+        return matches
+
+    def search(self, query, offset=0, limit=50):
+        """Ranked `(total, [{name, label, tags, score}])` for `query`; an empty query lists everything."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            total = len(self.names)
+            return total, [self._item(i, 0) for i in range(offset, min(total, offset + limit))]
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token, score in self._term_matches(term).items():
+                for i in self.postings[token]:
+                    if term_scores.get(i, 0) < score:
+                        term_scores[i] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+            if not scores:
+                return 0, []
+        ranked = sorted(scores, key=lambda i: (-(scores[i] + self.bonus[i]), self.names[i]))
+        return len(ranked), [self._item(i, scores[i] + self.bonus[i]) for i in ranked[offset:offset + limit]]
+
+    def _item(self, i, score):
+        return {'name': self.names[i], 'label': self.labels[i], 'tags': self.tags[i], 'score': round(score, 2)}
+
+
+def signature(icons_dir=ICONS_DIR, pptx_mapping=PPTX_MAPPING):
+    """Changes whenever an icon is added/removed/renamed or a mapping CSV is rewritten."""
+    parts = []
+    for path in (icons_dir, os.path.join(icons_dir, 'mapping_normalized.csv'), pptx_mapping):
+        try:
+            parts.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            parts.append('-')
+    return '.'.join(parts)
+
+
+def build_catalog(icons_dir=ICONS_DIR, pptx_mapping=PPTX_MAPPING):
+    version = signature(icons_dir, pptx_mapping)
+    try:
+        with os.scandir(icons_dir) as entries:
+            names = [e.name for e in entries if e.is_file() and e.name.lower().endswith(ICON_EXTENSIONS)]
+    except OSError:
+        names = []
+    return IconCatalog(names, read_descriptions(icons_dir, pptx_mapping), version)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(icons_dir=ICONS_DIR, pptx_mapping=PPTX_MAPPING):
+    """The catalog for `icons_dir`, rebuilt only when `signature()` changed."""
+    key = (icons_dir, pptx_mapping)
+    current = signature(icons_dir, pptx_mapping)
+    catalog = _catalogs.get(key)
+    if catalog is not None and catalog.version == current:
+        return catalog
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.version != current:
+            catalog = build_catalog(icons_dir, pptx_mapping)
+            _catalogs[key] = catalog
+    return catalog
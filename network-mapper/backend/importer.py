@@ -0,0 +1,229 @@
+"""Streaming CSV device import.
+
+The upload is decoded line by line as `csv` asks for it, so memory stays flat
+no matter how large the file is. Building names are resolved through a cache
+filled with one query up front; buildings that don't exist yet are inserted
+inside the running transaction instead of being committed one by one.
+Devices are written with Core `executemany` inserts in batches of
+`IMPORT_BATCH_SIZE`, committing after each batch so the SQLite write lock is
+released between batches.
+
+`mode="upsert"` makes re-imports idempotent: existing devices are loaded once
+into a dict keyed by `UPSERT_KEYS[key]`, matching rows update only the columns
+that changed (bulk UPDATE by primary key) and the rest are inserted.
+
+Rows that can't be imported are reported as `{"line", "error"}` and skipped;
+they never abort the rest of the import.
+"""
+import csv
+import os
+
+from sqlalchemy import insert, select, update
+
+try:
+    from models import Building, Device, normalize_mac
+except Exception:
+    from backend.models import Building, Device, normalize_mac
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+# the response lists at most this many row errors; `errorCount` has the total
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', '1000'))
+
+# devices column -> accepted CSV headers; the first non-empty one wins
+COLUMN_ALIASES = {
+    'name': ('name', 'hostname', 'device'),
+    'ip': ('ip', 'address'),
+    'device_type': ('type', 'device_type'),
+    'mac': ('mac',),
+    'room': ('room',),
+    'note': ('note',),
+}
+# Device.name and Device.device_type are NOT NULL
+CREATE_DEFAULTS = {'name': '', 'device_type': 'unknown'}
+
+# upsert key -> (devices columns it reads, function of a values dict returning the key or None)
+UPSERT_KEYS = {
+    'mac': (('mac',), lambda v: normalize_mac(v.get('mac'))),
+    'ip_building': (('ip', 'building_id'), lambda v: (v['ip'], v.get('building_id')) if v.get('ip') else None),
+    'name_building': (('name', 'building_id'), lambda v: (v['name'], v.get('building_id')) if v.get('name') else None),
+}
+IMPORT_MODES = ('insert', 'upsert')
+
+
+class _LineDecoder:
+    """Iterate a binary stream as text lines, remembering which lines weren't UTF-8.
+
+    Bad lines are passed on with replacement characters so `csv` keeps its
+    place in the file; the importer rejects the rows they belong to.
+    """
+
+    def __init__(self, binary):
+        self._binary = binary
+        self.line_num = 0
+        self.bytes_read = 0
+        self.bad_lines = set()
+
+    def __iter__(self):
+        for raw in self._binary:
+            self.line_num += 1
+            self.bytes_read += len(raw)
+            if self.line_num == 1 and raw.startswith(b'\xef\xbb\xbf'):
+                raw = raw[3:]
+            try:
+                yield raw.decode('utf-8')
+            except UnicodeDecodeError:
+                self.bad_lines.add(self.line_num)
+                yield raw.decode('utf-8', errors='replace')
+
+
+def header_columns(fieldnames):
+    """The devices columns a CSV header provides values for."""
+    present = set(fieldnames or ())
+    return [col for col, aliases in COLUMN_ALIASES.items() if present.intersection(aliases)]
+
+
+def device_values(row, columns):
+    """Map one CSV row to values for `columns`; empty cells become None."""
+    values = {}
+    for col in columns:
+        value = None
+        for alias in COLUMN_ALIASES[col]:
+            value = row.get(alias) or None
+            if value:
+                break
+        values[col] = value
+    return values
+
+
+class BuildingCache:
+    """Building name -> id for the duration of one import."""
+
+    def __init__(self, session):
+        self.session = session
+        self.ids = dict(session.execute(select(Building.name, Building.id)).all())
+
+    def get_id(self, name):
+        if not name:
+            return None
+        building_id = self.ids.get(name)
+        if building_id is None:
+            building_id = self.session.execute(insert(Building).values(name=name)).inserted_primary_key[0]
+            self.ids[name] = building_id
+        return building_id
+
+
+def existing_index(session, key):
+    """`{key: row-dict}` over current devices, built with one query (lowest id wins on duplicates)."""
+    key_columns, key_fn = UPSERT_KEYS[key]
+    cols = ['id', 'building_id', *COLUMN_ALIASES]
+    stmt = select(*(getattr(Device, c) for c in cols)).order_by(Device.id.desc())
+    for c in key_columns:
+        if c != 'building_id':
+            stmt = stmt.where(getattr(Device, c).isnot(None))
+    index = {}
+    for row in session.execute(stmt):
+        values = dict(zip(cols, row))
+        k = key_fn(values)
+        if k is not None:
+            index[k] = values
+    return index
+
+
+def import_csv(session, binary, batch_size=None, mode='insert', key='mac', skip_rows=0, on_batch=None):
+    """Import devices from a binary CSV stream.
+
+    Returns `{created, updated, unchanged, errorCount, errors}`. Raises
+    `ValueError` for an unknown `mode`/`key` or when the CSV lacks the
+    columns the upsert key needs.
+
+    `skip_rows` data rows are parsed but not written (resuming an import that
+    already committed them). `on_batch(progress)` is called with
+    `{rows, bytes, created, updated, unchanged, errorCount, errors}` after each
+    batch is written and before it is committed, so anything it writes through
+    `session` commits atomically with the batch.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError('invalid-mode')
+    if mode == 'upsert' and key not in UPSERT_KEYS:
+        raise ValueError('invalid-key')
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    lines = _LineDecoder(binary)
+    reader = csv.DictReader(lines)
+    columns = header_columns(reader.fieldnames)
+    has_building = 'building' in (reader.fieldnames or ())
+    upsert = mode == 'upsert'
+    if upsert:
+        key_columns, key_fn = UPSERT_KEYS[key]
+        if any(c not in columns for c in key_columns if c != 'building_id'):
+            raise ValueError('missing-key-column')
+        index = existing_index(session, key)
+        seen = set()
+    buildings = BuildingCache(session)
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    errors = []
+    error_count = 0
+    inserts = []
+    updates = []
+
+    def flush():
+        if inserts:
+            session.execute(insert(Device), inserts)
+            counts['created'] += len(inserts)
+            inserts.clear()
+        if updates:
+            # ORM bulk UPDATE by primary key; rows are grouped by the columns they set
+            session.execute(update(Device), updates)
+            counts['updated'] += len(updates)
+            updates.clear()
+        if on_batch:
+            on_batch({'rows': rows, 'bytes': lines.bytes_read, **counts, 'errorCount': error_count, 'errors': errors})
+        session.commit()
+
+    first_line = 2
+    rows = 0
+    for row in reader:
+        rows += 1
+        # a quoted field may span several physical lines
+        span = range(first_line, lines.line_num + 1)
+        first_line = lines.line_num + 1
+        error = None
+        if any(n in lines.bad_lines for n in span):
+            error = 'invalid-utf8'
+        elif None in row:
+            error = 'too-many-fields'
+        else:
+            values = device_values(row, columns)
+            if has_building:
+                values['building_id'] = buildings.get_id(row.get('building'))
+            if upsert:
+                k = key_fn(values)
+                if k is None:
+                    error = 'missing-key'
+                elif k in seen:
+                    error = 'duplicate-key'
+                else:
+                    seen.add(k)
+        if rows <= skip_rows:
+            continue
+        if error:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({'line': span.start, 'error': error})
+            continue
+        current = index.get(k) if upsert else None
+        if current is None:
+            for col, default in CREATE_DEFAULTS.items():
+                if values.get(col) is None:
+                    values[col] = default
+            inserts.append(values)
+        else:
+            changed = {c: v for c, v in values.items()
+                       if v != current[c] and not (c in CREATE_DEFAULTS and v is None)}
+            if changed:
+                updates.append({'id': current['id'], **changed})
+            else:
+                counts['unchanged'] += 1
+        if len(inserts) + len(updates) >= batch_size:
+            flush()
+    flush()
+    return {**counts, 'errorCount': error_count, 'errors': errors}
@@ -0,0 +1,214 @@
+"""Background CSV import jobs.
+
+`POST /api/devices/import` spools the upload to `IMPORT_FOLDER`, records an
+`import_jobs` row and hands the id to a small thread pool, so the request
+returns immediately. The worker streams the file through
+`importer.import_csv` and writes the job's progress in the same transaction
+as each device batch, so the row always says exactly how many CSV rows are
+committed.
+
+A job whose worker died (gunicorn recycled it, the container restarted) is
+left `queued` or `running` with a stale heartbeat. `resume_jobs` (called at
+startup) and `GET /api/jobs/<id>` pick such jobs up again; the atomic claim in
+`claim` makes sure only one worker runs a job, and `skip_rows` continues
+after the last committed batch instead of importing rows twice. A process
+queues each job at most once (`submit`), so progress polls for a job that is
+still waiting its turn don't pile up duplicate runs.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+
+try:
+    from models import ImportJob
+    import importer
+except Exception:
+    from backend.models import ImportJob
+    from backend import importer
+
+IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER', os.path.join(os.path.dirname(__file__), 'imports'))
+# imports are write-heavy; with SQLite more than one at a time just queues on the write lock
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '1'))
+# seconds without a committed batch before a running job counts as abandoned
+IMPORT_JOB_STALE = float(os.environ.get('IMPORT_JOB_STALE', '60'))
+
+_executor = None
+_executor_lock = threading.Lock()
+# jobs queued or running on this process's executor: job id -> Future
+_submitted = {}
+_submitted_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix='import-job')
+        return _executor
+
+
+def create_job(session_factory, fileobj, filename=None, mode='insert', key='mac'):
+    """Spool `fileobj` to disk and record a queued job; returns its id."""
+    if mode not in importer.IMPORT_MODES:
+        raise ValueError('invalid-mode')
+    if mode == 'upsert' and key not in importer.UPSERT_KEYS:
+        raise ValueError('invalid-key')
+    os.makedirs(IMPORT_FOLDER, exist_ok=True)
+    path = os.path.join(IMPORT_FOLDER, f'{uuid.uuid4().hex}.csv')
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+    session = session_factory()
+    try:
+        job = ImportJob(mode=mode, key=key if mode == 'upsert' else None, filename=filename,
+                        path=path, total_bytes=os.path.getsize(path))
+        session.add(job)
+        session.commit()
+        return job.id
+    finally:
+        session.close()
+
+
+def claim(session, job_id):
+    """Atomically mark a queued (or abandoned running) job as ours; False if someone else has it."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=IMPORT_JOB_STALE)
+    result = session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, or_(
+            ImportJob.status == 'queued',
+            and_(ImportJob.status == 'running', or_(ImportJob.heartbeat.is_(None), ImportJob.heartbeat < stale)),
+        ))
+        .values(status='running', heartbeat=now, started=func.coalesce(ImportJob.started, now))
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def run_job(session_factory, job_id):
+    """Run (or resume) one job to completion in the calling thread."""
+    session = session_factory()
+    try:
+        if not claim(session, job_id):
+            return
+        job = session.get(ImportJob, job_id)
+        path, mode, key, skip = job.path, job.mode, job.key, job.rows_done
+        base = {'created': job.created_rows, 'updated': job.updated_rows,
+                'unchanged': job.unchanged_rows, 'errorCount': job.error_rows}
+        base_errors = json.loads(job.errors) if job.errors else []
+
+        def on_batch(progress):
+            session.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+                rows_done=progress['rows'],
+                bytes_done=progress['bytes'],
+                created_rows=base['created'] + progress['created'],
+                updated_rows=base['updated'] + progress['updated'],
+                unchanged_rows=base['unchanged'] + progress['unchanged'],
+                error_rows=base['errorCount'] + progress['errorCount'],
+                errors=json.dumps((base_errors + progress['errors'])[:importer.IMPORT_MAX_ERRORS]),
+                heartbeat=datetime.utcnow(),
+            ))
+
+        status, error = 'done', None
+        try:
+            with open(path, 'rb') as fh:
+                importer.import_csv(session, fh, mode=mode, key=key or 'mac', skip_rows=skip, on_batch=on_batch)
+        except Exception as e:
+            session.rollback()
+            status, error = 'failed', str(e)
+        session.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+            status=status, error=error, finished=datetime.utcnow(), heartbeat=datetime.utcnow(), path=None))
+        session.commit()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    finally:
+        session.close()
+
+
+def submit(session_factory, job_id):
+    """Queue `job_id` on this process's workers; a job already queued or running here isn't queued again."""
+    executor = _get_executor()
+    with _submitted_lock:
+        fut = _submitted.get(job_id)
+        if fut is not None:
+            return fut
+        fut = _submitted[job_id] = executor.submit(run_job, session_factory, job_id)
+    fut.add_done_callback(lambda f: _forget(job_id, f))
+    return fut
+
+
+def _forget(job_id, fut):
+    with _submitted_lock:
+        if _submitted.get(job_id) is fut:
+            del _submitted[job_id]
+
+
+def is_abandoned(job, now=None):
+    """True for an unfinished job with a stale heartbeat that isn't waiting on this process's workers.
+
+    A job queued here behind a long import is old but not abandoned; a queued job
+    left by a worker that died before claiming it is.
+    """
+    if job.status not in ('queued', 'running'):
+        return False
+    with _submitted_lock:
+        if job.id in _submitted:
+            return False
+    now = now or datetime.utcnow()
+    last = job.heartbeat or job.created
+    return last is None or (now - last).total_seconds() > IMPORT_JOB_STALE
+
+
+def resume_jobs(session_factory):
+    """Queue every unfinished job; `claim` drops the ones another worker is still running."""
+    session = session_factory()
+    try:
+        ids = session.execute(select(ImportJob.id).where(ImportJob.status.in_(('queued', 'running')))
+                              .order_by(ImportJob.id)).scalars().all()
+    finally:
+        session.close()
+    for job_id in ids:
+        submit(session_factory, job_id)
+    return ids
+
+
+def serialize_job(job, now=None):
+    now = now or datetime.utcnow()
+    out = {
+        'id': job.id,
+        'status': job.status,
+        'mode': job.mode,
+        'key': job.key,
+        'filename': job.filename,
+        'rowsProcessed': job.rows_done,
+        'bytesProcessed': job.bytes_done,
+        'totalBytes': job.total_bytes,
+        'created': job.created_rows,
+        'updated': job.updated_rows,
+        'unchanged': job.unchanged_rows,
+        'errorCount': job.error_rows,
+        'errors': json.loads(job.errors) if job.errors else [],
+        'error': job.error,
+        'submitted': job.created.isoformat() if job.created else None,
+        'started': job.started.isoformat() if job.started else None,
+        'finished': job.finished.isoformat() if job.finished else None,
+        'rowsPerSecond': None,
+        'etaSeconds': None,
+    }
+    if job.started:
+        elapsed = ((job.finished or now) - job.started).total_seconds()
+        if elapsed > 0:
+            out['rowsPerSecond'] = round(job.rows_done / elapsed, 1)
+            # rows in the rest of the file are unknown; bytes give the fraction done
+            if job.status == 'running' and job.bytes_done and job.total_bytes:
+                out['etaSeconds'] = round(elapsed * (job.total_bytes - job.bytes_done) / job.bytes_done, 1)
+    if job.status == 'done':
+        out['etaSeconds'] = 0
+    return out
@@ -0,0 +1,264 @@
+"""Live reachability for the building editor, pushed as server-sent events.
+
+`GET /api/status/stream?floorplan_id=<id>` (or `building_id`) subscribes to a
+*scope*. Each process keeps one `Watch` per scope that has subscribers, no
+matter how many there are. Every `LIVE_INTERVAL` seconds the watch probes the
+scope's devices once (`probe.sweep`), records the results in `status_history`
+and hands only the devices whose up/down state changed to every subscriber.
+The watch stops when its last subscriber leaves.
+
+Across gunicorn workers, a lock file per scope elects one prober. Watches in
+the other workers read the newest `status_history` rows instead of probing, so
+a building open in 30 browsers is still probed once per interval.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from queue import Queue, Empty, Full
+
+from sqlalchemy import select
+
+try:
+    from models import Device
+    import poller
+    import probe
+    import serializers
+    import servicecheck
+except Exception:
+    from backend.models import Device
+    from backend import poller
+    from backend import probe
+    from backend import serializers
+    from backend import servicecheck
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-worker election, every process probes
+    fcntl = None
+
+# seconds between probe rounds of one scope
+LIVE_INTERVAL = float(os.environ.get('LIVE_INTERVAL', '10'))
+# comment line sent when nothing changed, so dead connections are noticed
+LIVE_HEARTBEAT = float(os.environ.get('LIVE_HEARTBEAT', '15'))
+# streams end after this many seconds and EventSource reconnects (after LIVE_RETRY_MS),
+# so a half-open connection can't pin a worker thread for good
+LIVE_STREAM_MAX = float(os.environ.get('LIVE_STREAM_MAX', '300'))
+LIVE_RETRY_MS = int(os.environ.get('LIVE_RETRY_MS', '3000'))
+# open streams per process; each holds a request thread, so further subscribers get 503 instead of
+# taking the threads every other request needs (keep it below GUNICORN_THREADS)
+LIVE_MAX_STREAMS = int(os.environ.get('LIVE_MAX_STREAMS', '16'))
+# events buffered per subscriber; a client that falls further behind is disconnected
+LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', '1000'))
+LIVE_LOCK_DIR = os.environ.get('LIVE_LOCK_DIR', tempfile.gettempdir())
+
+SCOPES = {'floorplan': Device.floorplan_id, 'building': Device.building_id}
+
+
+class TooManyStreams(Exception):
+    """This process already serves `LIVE_MAX_STREAMS` streams."""
+
+
+class Subscription:
+    def __init__(self, scope, maxsize=None):
+        self.scope = scope
+        self.queue = Queue(maxsize or LIVE_QUEUE_SIZE)
+        self.lagging = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            self.lagging = True
+
+    def get(self, timeout):
+        """Next `(event name, data)`; raises `queue.Empty` after `timeout` seconds."""
+        return self.queue.get(timeout=timeout)
+
+
+class Watch:
+    """One scope's shared probe loop and its subscribers."""
+
+    def __init__(self, hub, scope):
+        self.hub = hub
+        self.scope = scope
+        self.state = {}  # device_id -> status dict (see serializers.status_dict)
+        self.subscribers = set()
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._lock_fh = None
+        self._thread = None
+
+    def add(self, sub):
+        with self._lock:
+            self.subscribers.add(sub)
+            if self.loaded:
+                sub.put(('snapshot', list(self.state.values())))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name=f'live-{self.scope[0]}-{self.scope[1]}', daemon=True)
+                self._thread.start()
+
+    def remove(self, sub):
+        """Drop `sub`; returns True when no subscribers are left."""
+        with self._lock:
+            self.subscribers.discard(sub)
+            return not self.subscribers
+
+    def stop(self):
+        self._stop.set()
+
+    def _publish(self, event):
+        with self._lock:
+            for sub in self.subscribers:
+                sub.put(event)
+
+    def _is_prober(self):
+        """True when this process probes the scope (holds its lock file)."""
+        if self.hub.probe_fn is None and not probe.engine_available():
+            return False  # nothing to probe with; follow whatever other processes record
+        if fcntl is None or self._lock_fh is not None:
+            return True
+        kind, scope_id = self.scope
+        fh = open(os.path.join(self.hub.lock_dir, f'network-mapper-live-{kind}-{scope_id}.lock'), 'a')
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._lock_fh = fh
+        return True
+
+    def _devices(self, session):
+        column = SCOPES[self.scope[0]]
+        return session.execute(select(Device.id, Device.ip, Device.check_type, Device.check_port, Device.check_path,
+                                      Device.check_status).where(column == self.scope[1])).all()
+
+    def load(self):
+        """Seed the state with last-known status and send it as every subscriber's snapshot."""
+        session = self.hub.session_factory()
+        try:
+            ids = [d.id for d in self._devices(session)]
+            latest = poller.latest_status(session, ids)
+        finally:
+            session.close()
+        with self._lock:
+            self.state = {device_id: serializers.status_dict(s) for device_id, s in latest.items()}
+            self.loaded = True
+            snapshot = ('snapshot', list(self.state.values()))
+            for sub in self.subscribers:
+                sub.put(snapshot)
+
+    def cycle(self):
+        """One round: probe (or read what the prober recorded) and publish the transitions."""
+        session = self.hub.session_factory()
+        try:
+            devices = self._devices(session)
+            prober = self._is_prober()
+            rows = None if prober else list(poller.latest_status(session, [d.id for d in devices]).values())
+        finally:
+            # don't hold a connection through the probe round
+            session.close()
+        if prober:
+            rows = []
+            targets = ((d.id, d.ip, servicecheck.from_device(d)) for d in devices)
+            for device_id, res in probe.sweep(targets, probe=self.hub.probe_fn):
+                if res['error'] not in probe.NOT_PROBED:
+                    rows.append(poller.status_row(device_id, res))
+            poller.record_status(self.hub.session_factory, rows)
+        return self.apply([serializers.status_dict(r) for r in rows], {d.id for d in devices})
+
+    def apply(self, statuses, device_ids):
+        """Merge new statuses into the state; publishes and returns those whose `up` changed."""
+        changed = []
+        with self._lock:
+            for device_id in self.state.keys() - device_ids:
+                del self.state[device_id]  # moved to another floorplan or deleted
+            for s in statuses:
+                old = self.state.get(s['device_id'])
+                self.state[s['device_id']] = s
+                if old is None or old['up'] != s['up']:
+                    changed.append(s)
+        for s in changed:
+            self._publish(('status', s))
+        return changed
+
+    def run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    if not self.loaded:
+                        self.load()
+                    self.cycle()
+                except Exception as e:
+                    # keep watching through transient DB errors (e.g. locked database)
+                    print('Warning: live status round failed:', e)
+                self._stop.wait(self.hub.interval)
+        finally:
+            if self._lock_fh is not None:
+                self._lock_fh.close()
+
+
+class Hub:
+    """Per-process registry of watches, keyed by `(kind, id)` scope."""
+
+    def __init__(self, session_factory, probe_fn=None, interval=None, lock_dir=None, max_streams=None):
+        self.session_factory = session_factory
+        # None: probe.sweep's configured engine; tests pass a blocking callable
+        self.probe_fn = probe_fn
+        self.interval = interval or LIVE_INTERVAL
+        self.lock_dir = lock_dir or LIVE_LOCK_DIR
+        self.max_streams = max_streams or LIVE_MAX_STREAMS
+        self._watches = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, kind, scope_id):
+        """New subscription to a scope; raises `TooManyStreams` when `max_streams` are open."""
+        if kind not in SCOPES:
+            raise ValueError(f'unknown scope {kind!r}')
+        scope = (kind, scope_id)
+        sub = Subscription(scope)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                raise TooManyStreams()
+            self._subscribers.add(sub)
+            watch = self._watches.get(scope)
+            if watch is None:
+                watch = self._watches[scope] = Watch(self, scope)
+            watch.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+            watch = self._watches.get(sub.scope)
+            if watch is not None and watch.remove(sub):
+                watch.stop()
+                del self._watches[sub.scope]
+
+    def watches(self):
+        with self._lock:
+            return dict(self._watches)
+
+
+def format_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def events(sub, heartbeat=None, lifetime=None):
+    """Server-sent event stream for `sub`: a snapshot, then one `status` event per transition."""
+    heartbeat = heartbeat or LIVE_HEARTBEAT
+    deadline = time.monotonic() + (lifetime or LIVE_STREAM_MAX)
+    yield f'retry: {LIVE_RETRY_MS}\n\n'
+    while not sub.lagging:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            name, data = sub.get(timeout=min(heartbeat, remaining))
+        except Empty:
+            yield ': keepalive\n\n'
+            continue
+        yield format_event(name, data)
@@ -0,0 +1,57 @@
+"""Lightweight schema upgrades for existing databases.
+
+`create_all` only creates missing tables, so databases created by an older
+version never pick up new indexes or columns. `upgrade` adds both: missing
+nullable columns via `ALTER TABLE ... ADD COLUMN` and missing indexes via
+`CREATE INDEX` (each checked first, so running it on every start is cheap).
+For anything beyond additive changes, add a proper Alembic migration.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+try:
+    from models import Base
+except Exception:
+    from backend.models import Base
+
+
+def _index_names(conn, insp, table_name):
+    if conn.dialect.name == 'sqlite':
+        # reflection skips expression indexes on SQLite; read the catalog directly
+        rows = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"), {"t": table_name})
+        return {r[0] for r in rows}
+    return {ix['name'] for ix in insp.get_indexes(table_name)}
+
+
+def upgrade(engine):
+    """Bring `engine`'s schema up to `Base.metadata`; returns a list of applied changes."""
+    Base.metadata.create_all(engine)
+    applied = []
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {c['name'] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing or col.primary_key or not col.nullable:
+                    continue
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}'
+                conn.execute(text(ddl))
+                applied.append(ddl)
+            indexes = _index_names(conn, insp, table.name)
+            for index in table.indexes:
+                if index.name not in indexes:
+                    # IF NOT EXISTS: another worker may be running the same upgrade
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                    applied.append(f'CREATE INDEX {index.name}')
+    return applied
+
+
+if __name__ == '__main__':
+    import os
+    try:
+        import database
+    except Exception:
+        from backend import database
+    engine = database.make_engine(os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db'))
+    changes = upgrade(engine)
+    print('\n'.join(changes) if changes else 'Schema is up to date')
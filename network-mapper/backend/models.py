@@ -1,9 +1,28 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Index, func, text
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+
+def normalize_mac(value):
+    """Canonical MAC form used for lookups: lowercase hex without separators."""
+    if not value:
+        return None
+    return value.strip().lower().replace(':', '').replace('-', '').replace('.', '') or None
+
+
+def normalized_mac(column):
+    """SQL expression matching `normalize_mac`; the `ix_devices_mac_norm` index is built on it.
+
+    Separators are rendered as SQL literals (not bound parameters) so queries
+    produce exactly the indexed expression and the planner can use the index.
+    """
+    expr = column
+    for sep in (':', '-', '.'):
+        expr = func.replace(expr, text(f"'{sep}'"), text("''"))
+    return func.lower(expr)
+
 class Building(Base):
     __tablename__ = 'buildings'
     id = Column(Integer, primary_key=True)
@@ -16,10 +35,17 @@ class Building(Base):
 class Floorplan(Base):
     __tablename__ = 'floorplans'
     id = Column(Integer, primary_key=True)
-    building_id = Column(Integer, ForeignKey('buildings.id'), nullable=False)
+    building_id = Column(Integer, ForeignKey('buildings.id'), nullable=False, index=True)
+    # name the client uploaded it under; only used for display
     filename = Column(String, nullable=False)
+    # sha256 of the file and its content-addressed name in UPLOAD_FOLDER (see storage.py);
+    # None for plans uploaded before content addressing, which are stored under `filename`
+    content_hash = Column(String(64), nullable=True, index=True)
+    stored_name = Column(String, nullable=True)
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
+    # highest level of the tile pyramid (see tiles.py); None when the upload wasn't tiled
+    tile_max_zoom = Column(Integer, nullable=True)
     created = Column(DateTime, default=datetime.utcnow)
     building = relationship('Building', back_populates='floorplans')
 
@@ -27,25 +53,91 @@ class Device(Base):
     __tablename__ = 'devices'
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    ip = Column(String, nullable=True)
+    ip = Column(String, nullable=True, index=True)
     device_type = Column(String, nullable=False)
-    building_id = Column(Integer, ForeignKey('buildings.id'), nullable=True)
+    building_id = Column(Integer, ForeignKey('buildings.id'), nullable=True, index=True)
     floorplan_id = Column(Integer, ForeignKey('floorplans.id'), nullable=True)
     x = Column(Float, nullable=True)
     y = Column(Float, nullable=True)
     note = Column(String, nullable=True)
     mac = Column(String, nullable=True)
     room = Column(String, nullable=True)
+    # how the device is probed (see servicecheck.py): None/'icmp' pings it; 'tcp', 'http' or 'https'
+    # check the service on check_port (with check_path and the expected check_status for http)
+    check_type = Column(String, nullable=True)
+    check_port = Column(Integer, nullable=True)
+    check_path = Column(String, nullable=True)
+    check_status = Column(Integer, nullable=True)
+    # seconds between background polls of this device (None: POLL_INTERVAL)
+    poll_interval = Column(Float, nullable=True)
     created = Column(DateTime, default=datetime.utcnow)
     building = relationship('Building', back_populates='devices')
+    # floorplan_id alone is served by the leading column of the composite
+    __table_args__ = (
+        Index('ix_devices_floorplan_id_device_type', 'floorplan_id', 'device_type'),
+    )
+
+# not unique: existing inventories may already hold duplicate MACs
+Index('ix_devices_mac_norm', normalized_mac(Device.mac))
 
 
 class Audit(Base):
     __tablename__ = 'audits'
     id = Column(Integer, primary_key=True)
     action = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     requested_id = Column(Integer, nullable=True)
     restored_id = Column(Integer, nullable=True)
     preserved_id = Column(Boolean, default=False)
     detail = Column(String, nullable=True)
+
+
+class StatusHistory(Base):
+    """One row per reachability probe; the newest row per device is its last-known status."""
+    __tablename__ = 'status_history'
+    id = Column(Integer, primary_key=True)
+    # no FK: history outlives deleted devices and is pruned by age
+    device_id = Column(Integer, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    up = Column(Boolean, nullable=False)
+    rtt_ms = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+    __table_args__ = (
+        Index('ix_status_history_device_id_id', 'device_id', 'id'),
+        Index('ix_status_history_timestamp', 'timestamp'),
+    )
+
+
+class ImportJob(Base):
+    """A background CSV import; progress is committed with each device batch so a restarted worker can resume."""
+    __tablename__ = 'import_jobs'
+    id = Column(Integer, primary_key=True)
+    # queued | running | done | failed
+    status = Column(String, nullable=False, default='queued')
+    mode = Column(String, nullable=False, default='insert')
+    key = Column(String, nullable=True)
+    filename = Column(String, nullable=True)
+    # spooled upload on disk; removed when the job finishes
+    path = Column(String, nullable=True)
+    total_bytes = Column(Integer, nullable=True)
+    bytes_done = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    created_rows = Column(Integer, nullable=False, default=0)
+    updated_rows = Column(Integer, nullable=False, default=0)
+    unchanged_rows = Column(Integer, nullable=False, default=0)
+    error_rows = Column(Integer, nullable=False, default=0)
+    # JSON list of {line, error}, capped like the synchronous import response
+    errors = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created = Column(DateTime, default=datetime.utcnow)
+    started = Column(DateTime, nullable=True)
+    finished = Column(DateTime, nullable=True)
+    # refreshed with every committed batch; a running job with an old heartbeat is resumed
+    heartbeat = Column(DateTime, nullable=True)
+
+
+class TableVersion(Base):
+    """Change counter per table, bumped in the same transaction as any write to it (see versions.py)."""
+    __tablename__ = 'table_versions'
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
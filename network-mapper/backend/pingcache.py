@@ -0,0 +1,150 @@
+"""Single-flight probes with a short-lived result cache shared by all workers.
+
+Every probe of the probe pool (probepool.py: `/api/ping`, sweeps, live
+status) goes through `PingCache.probe`. Concurrent requests for the same
+target (and engine) share one probe instead of each running its own `ping`:
+
+- within a process, later callers wait on the first caller's future;
+- across gunicorn workers, each target has a small cache file in
+  `PING_CACHE_DIR`, and the process that probes holds an exclusive `flock` on
+  it. A worker that asks for the same target meanwhile blocks on the lock and
+  then reads the fresh result instead of probing again.
+
+The file keeps the result for `PING_CACHE_TTL` seconds (0 turns the cache
+off; coalescing of concurrent calls in one process stays). Each answer says
+whether it was probed for this call (`cached: false`) and the result's age in
+seconds. Put `PING_CACHE_DIR` on tmpfs (`/dev/shm`) to keep the cache in memory.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing and caching per process only
+    fcntl = None
+
+try:
+    import probe
+except Exception:
+    from backend import probe
+
+PING_CACHE_TTL = float(os.environ.get('PING_CACHE_TTL', '5'))
+PING_CACHE_DIR = os.environ.get('PING_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'network-mapper-ping-cache'))
+# entries untouched for this long are deleted (at most once per interval, by whichever process writes)
+PING_CACHE_PRUNE = float(os.environ.get('PING_CACHE_PRUNE', '300'))
+# results that say nothing about the target are never cached
+UNCACHED_ERRORS = ('exception', 'ping-not-found')
+
+
+class PingCache:
+    def __init__(self, probe_fn, ttl=None, directory=None):
+        """`probe_fn(target, engine=None)` is called at most once per target at a time."""
+        self.probe_fn = probe_fn
+        self.ttl = PING_CACHE_TTL if ttl is None else ttl
+        self.directory = directory or PING_CACHE_DIR
+        self._inflight = {}  # key -> Future of (result, checked)
+        self._lock = threading.Lock()
+        self._next_prune = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    @staticmethod
+    def _key(target, engine, count, interval, check):
+        if check is not None:
+            return f'{check}:{target}'
+        if count == 1:
+            return f'{engine}:{target}'
+        # no interval means the probe's default, so both share an entry
+        return f'{engine}:{target}:{count}x{interval or probe.PROBE_INTERVAL:g}'
+
+    def _fresh(self, entry, now):
+        return entry is not None and 0 <= now - entry['checked'] <= self.ttl
+
+    def peek(self, target, engine, count=1, interval=None, check=None):
+        """The cached answer if it is still fresh, else None; never probes or waits for a lock."""
+        if self.ttl <= 0:
+            return None
+        try:
+            with open(self._path(self._key(target, engine, count, interval, check))) as fh:
+                entry = json.loads(fh.read() or 'null')
+        except (OSError, ValueError):  # missing, or caught mid-write
+            return None
+        if not self._fresh(entry, time.time()):
+            return None
+        return self._answer(entry['result'], entry['checked'], cached=True)
+
+    def probe(self, target, engine, count=1, interval=None, check=None):
+        """`{success, time, error, cached, age}` for a normalized target and a resolved engine name.
+
+        Multi-packet probes (`count > 1`, see pingstats.py) are cached separately per count and
+        interval, and service checks (servicecheck.py) per check.
+        """
+        key = self._key(target, engine, count, interval, check)
+        if check is not None:
+            kwargs = {'check': check}
+        else:
+            kwargs = {'count': count, 'interval': interval} if count > 1 else {}
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            res, checked = fut.result()
+            return self._answer(res, checked, cached=True)
+        try:
+            res, checked, cached = self._probe_shared(key, target, engine, kwargs)
+            fut.set_result((res, checked))
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return self._answer(res, checked, cached)
+
+    def _answer(self, res, checked, cached):
+        return {**res, "cached": cached, "age": round(max(0.0, time.time() - checked), 3)}
+
+    def _probe_shared(self, key, target, engine, kwargs):
+        if self.ttl <= 0:
+            return self.probe_fn(target, engine=engine, **kwargs), time.time(), False
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key), 'a+') as fh:
+            if fcntl:
+                # blocks while another worker probes this target, then sees its result
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            fh.seek(0)
+            try:
+                entry = json.loads(fh.read() or 'null')
+            except ValueError:
+                entry = None
+            if self._fresh(entry, time.time()):
+                return entry['result'], entry['checked'], True
+            res = self.probe_fn(target, engine=engine, **kwargs)
+            checked = time.time()
+            if res.get('error') not in UNCACHED_ERRORS:
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps({"key": key, "result": res, "checked": checked}))
+                fh.flush()
+        self._maybe_prune(checked)
+        return res, checked, False
+
+    def _maybe_prune(self, now):
+        if now < self._next_prune:
+            return
+        self._next_prune = now + PING_CACHE_PRUNE
+        cutoff = now - max(PING_CACHE_PRUNE, self.ttl)
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass  # removed by another worker
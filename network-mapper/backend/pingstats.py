@@ -0,0 +1,81 @@
+"""Round-trip statistics for multi-packet probes, shared by both engines.
+
+`parse_output` reads what `ping` printed: iputils (Linux), busybox, BSD/macOS
+and Windows, including sub-millisecond `time=0.412 ms` replies. The in-process
+ICMP engine measures the RTTs itself and passes them to `summarize`, which
+computes min/avg/max/mdev the way iputils does, so both engines report the
+same numbers for the same replies.
+
+Results keep the single-probe `{success, time, error}` keys (`time` is the
+average) and add `sent`, `received`, `loss` (percent) and `min`/`avg`/`max`/`mdev`
+in float milliseconds (None when nothing came back).
+"""
+import math
+import re
+
+# one reply line; `time<1ms` is how Windows says "under a millisecond"
+REPLY = re.compile(r'time\s*([=<])\s*([0-9]+(?:\.[0-9]+)?)\s*ms', re.IGNORECASE)
+COUNTS = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received')
+WINDOWS_COUNTS = re.compile(r'Sent = (\d+), Received = (\d+)')
+LOSS = re.compile(r'([0-9]+(?:\.[0-9]+)?)% (?:packet )?loss')
+# iputils: rtt min/avg/max/mdev; BSD/macOS: round-trip min/avg/max/stddev; busybox: round-trip min/avg/max
+SUMMARY = re.compile(r'(?:rtt|round-trip) min/avg/max(?:/(?:mdev|stddev))? = '
+                     r'([0-9.]+)/([0-9.]+)/([0-9.]+)(?:/([0-9.]+))? ms')
+
+
+def reply_times(text):
+    """RTTs of the reply lines in order, skipping duplicates (`(DUP!)`)."""
+    times = []
+    for line in text.splitlines():
+        if 'DUP!' in line:
+            continue
+        m = REPLY.search(line)
+        if m:
+            times.append(float(m.group(2)))
+    return times
+
+
+def summarize(times):
+    """`{min, avg, max, mdev}` of RTTs in ms; mdev is the population standard deviation, as in iputils."""
+    if not times:
+        return {"min": None, "avg": None, "max": None, "mdev": None}
+    avg = sum(times) / len(times)
+    variance = max(0.0, sum(t * t for t in times) / len(times) - avg * avg)
+    return {"min": round(min(times), 3), "avg": round(avg, 3), "max": round(max(times), 3),
+            "mdev": round(math.sqrt(variance), 3)}
+
+
+def result(sent, times, received=None, loss=None, stats=None):
+    """Probe result for `sent` packets; `times` are the RTTs of those that came back."""
+    received = len(times) if received is None else received
+    stats = stats or summarize(times)
+    if loss is None:
+        loss = round(100.0 * (sent - received) / sent, 3) if sent else 100.0
+    return {"success": received > 0, "time": stats["avg"], "error": None if received else "no-response",
+            "sent": sent, "received": received, "loss": loss, **stats}
+
+
+def parse_output(text, sent=None):
+    """Probe result from the output of `ping -c N` (`ping -n N` on Windows).
+
+    Counts, loss and the summary line come from ping's own statistics when it
+    printed them (it doesn't when killed on timeout); otherwise from `sent`
+    and the reply lines.
+    """
+    times = reply_times(text)
+    received, loss, stats = len(times), None, None
+    counts = COUNTS.search(text)
+    if counts:
+        sent, received = int(counts.group(1)), int(counts.group(2))
+        m = LOSS.search(text)
+        loss = float(m.group(1)) if m else None
+    else:
+        # Windows counts "Destination host unreachable" answers as received: trust the reply lines
+        m = WINDOWS_COUNTS.search(text)
+        sent = max(int(m.group(1)) if m else sent or 0, received)
+    m = SUMMARY.search(text)
+    if m and received:
+        low, avg, high, mdev = m.groups()
+        stats = {"min": float(low), "avg": float(avg), "max": float(high),
+                 "mdev": float(mdev) if mdev is not None else summarize(times)["mdev"]}
+    return result(sent, times, received, loss, stats)
@@ -0,0 +1,281 @@
+"""Background reachability poller.
+
+Pulls targets from the `devices` table, probes each device on its own
+schedule (interval plus jitter so probes spread out instead of bursting) over
+a bounded thread pool, and appends results to `status_history`. The API reads
+last-known status from that table instead of pinging on every click.
+
+Run standalone with `python -m backend.poller`, or set `POLLER_ENABLED=1` to
+have the web app start it; with several gunicorn workers a lock file makes
+sure only one of them polls at a time. Either way probes go through the probe
+pool (probepool.py), so they share its queue, concurrency cap and per-subnet
+rate limits with the web requests.
+"""
+import heapq
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from queue import Queue, Empty
+
+from sqlalchemy import insert, select, func
+
+try:
+    from models import Device, StatusHistory
+    import probe
+    import database
+    import servicecheck
+    import probepool
+except Exception:
+    from backend.models import Device, StatusHistory
+    from backend import probe
+    from backend import database
+    from backend import servicecheck
+    from backend import probepool
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-worker lock, every process polls
+    fcntl = None
+
+POLL_INTERVAL = float(os.environ.get('POLL_INTERVAL', '60'))
+# shortest per-device poll_interval accepted
+POLL_MIN_INTERVAL = 1.0
+# fraction of the interval each reschedule is randomly shifted by
+POLL_JITTER = float(os.environ.get('POLL_JITTER', '0.1'))
+POLL_CONCURRENCY = int(os.environ.get('POLL_CONCURRENCY', '32'))
+# how often the device list is re-read so new/removed devices are picked up
+POLL_REFRESH = float(os.environ.get('POLL_REFRESH', '60'))
+POLL_HISTORY_DAYS = float(os.environ.get('POLL_HISTORY_DAYS', '7'))
+# probe-pool answers that say nothing about the device: no row is written, the device is polled next round
+POLL_SKIPPED_ERRORS = ('busy', 'deadline')
+POLL_LOCK = os.environ.get('POLL_LOCK', os.path.join(tempfile.gettempdir(), 'network-mapper-poller.lock'))
+
+
+def status_row(device_id, res):
+    """Map a probe result (`{success, time, error}`) to a `status_history` row dict."""
+    rtt = res.get('time')
+    return {
+        'device_id': device_id,
+        'timestamp': datetime.utcnow(),
+        'up': bool(res.get('success')),
+        'rtt_ms': float(rtt) if rtt not in (None, '') else None,
+        'error': res.get('error'),
+    }
+
+
+def record_status(session_factory, rows):
+    """Bulk-insert status rows in one transaction."""
+    if not rows:
+        return
+    session = session_factory()
+    try:
+        session.execute(insert(StatusHistory), rows)
+        session.commit()
+    finally:
+        session.close()
+
+
+def latest_status(session, device_ids=None):
+    """Return `{device_id: StatusHistory-row}` with the newest row per device."""
+    newest = select(StatusHistory.device_id, func.max(StatusHistory.id).label('max_id')).group_by(StatusHistory.device_id)
+    if device_ids is not None:
+        newest = newest.where(StatusHistory.device_id.in_(device_ids))
+    newest = newest.subquery()
+    rows = session.execute(
+        select(StatusHistory).join(newest, StatusHistory.id == newest.c.max_id)
+    ).scalars().all()
+    return {r.device_id: r for r in rows}
+
+
+class Poller:
+    def __init__(self, session_factory, probe_fn=None, interval=None, jitter=None,
+                 concurrency=None, refresh=None, history_days=None):
+        self.session_factory = session_factory
+        self.probe_fn = probe_fn or probe.probe_target
+        self.interval = interval or POLL_INTERVAL
+        self.jitter = POLL_JITTER if jitter is None else jitter
+        self.refresh = refresh or POLL_REFRESH
+        self.history_days = history_days or POLL_HISTORY_DAYS
+        self._executor = ThreadPoolExecutor(max_workers=concurrency or POLL_CONCURRENCY, thread_name_prefix='poller')
+        self._targets = {}    # device_id -> (normalized target, service check or None, interval)
+        self._schedule = []   # heap of (due, device_id)
+        self._inflight = set()
+        self._results = Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _next_due(self, now, interval=None):
+        interval = interval or self.interval
+        spread = interval * self.jitter
+        return now + interval + random.uniform(-spread, spread)
+
+    def refresh_targets(self, now=None):
+        """Reload device targets; new devices get a random first slot within their interval.
+
+        A device's `poll_interval` overrides the poller's interval (at least `POLL_MIN_INTERVAL`).
+        """
+        now = time.monotonic() if now is None else now
+        session = self.session_factory()
+        try:
+            rows = session.execute(select(Device.id, Device.ip, Device.check_type, Device.check_port, Device.check_path,
+                                          Device.check_status, Device.poll_interval).where(Device.ip.isnot(None))).all()
+        finally:
+            session.close()
+        targets = {}
+        for row in rows:
+            target = probe.normalize_target(row.ip)
+            if target:
+                interval = max(row.poll_interval, POLL_MIN_INTERVAL) if row.poll_interval else self.interval
+                targets[row.id] = (target, servicecheck.from_device(row), interval)
+        for device_id in targets.keys() - self._targets.keys():
+            heapq.heappush(self._schedule, (now + random.uniform(0, targets[device_id][2]), device_id))
+        # removed devices are dropped lazily when their slot comes up
+        self._targets = targets
+
+    def _submit(self, device_id):
+        target, check, _ = self._targets[device_id]
+        self._inflight.add(device_id)
+        if check is not None:
+            fut = self._executor.submit(self.probe_fn, target, check=check)
+        else:
+            fut = self._executor.submit(self.probe_fn, target)
+        fut.add_done_callback(lambda f, did=device_id: self._results.put((did, f)))
+
+    def submit_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self._schedule and self._schedule[0][0] <= now:
+            _, device_id = heapq.heappop(self._schedule)
+            if device_id not in self._targets or device_id in self._inflight:
+                continue
+            self._submit(device_id)
+
+    def drain(self, timeout=0):
+        """Collect finished probes, reschedule them and write their rows in one batch."""
+        rows = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                remaining = max(0, deadline - time.monotonic())
+                device_id, fut = self._results.get(timeout=remaining) if remaining else self._results.get_nowait()
+            except Empty:
+                break
+            self._inflight.discard(device_id)
+            try:
+                res = fut.result()
+            except Exception:
+                res = {"success": False, "time": None, "error": "exception"}
+            if res.get('error') not in POLL_SKIPPED_ERRORS:
+                rows.append(status_row(device_id, res))
+            if device_id in self._targets:
+                heapq.heappush(self._schedule, (self._next_due(time.monotonic(), self._targets[device_id][2]), device_id))
+            if not self._inflight:
+                break
+        record_status(self.session_factory, rows)
+        return len(rows)
+
+    def poll_all(self):
+        """Probe every known device right now and wait for the results (used by `--once` and tests)."""
+        self.refresh_targets()
+        for device_id in list(self._targets):
+            if device_id not in self._inflight:
+                self._submit(device_id)
+        written = 0
+        while self._inflight:
+            written += self.drain(timeout=probe.PING_TIMEOUT + 1)
+        return written
+
+    def prune(self):
+        cutoff = datetime.utcnow() - timedelta(days=self.history_days)
+        session = self.session_factory()
+        try:
+            removed = session.query(StatusHistory).filter(StatusHistory.timestamp < cutoff).delete(synchronize_session=False)
+            session.commit()
+            return removed
+        finally:
+            session.close()
+
+    def run(self, tick=1.0):
+        next_refresh = 0
+        next_prune = 0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            try:
+                if now >= next_refresh:
+                    self.refresh_targets(now)
+                    next_refresh = now + self.refresh
+                if now >= next_prune:
+                    self.prune()
+                    next_prune = now + 3600
+                self.submit_due(now)
+                self.drain(timeout=tick)
+            except Exception as e:
+                # keep polling through transient DB errors (e.g. locked database)
+                print('Warning: poller iteration failed:', e)
+                self._stop.wait(tick)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='poller', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def start_singleton(session_factory, lock_path=None, retry=None, probe_fn=None):
+    """Start a poller in this process once it holds the cross-worker lock file.
+
+    Workers that lose the race keep a standby thread that retries, so polling
+    resumes if the owning worker is recycled. The web app passes its pooled
+    probe as `probe_fn`, so polls share the probe pool's queue and rate limits.
+    """
+    lock_path = lock_path or POLL_LOCK
+    retry = retry or POLL_REFRESH
+
+    def standby():
+        fh = open(lock_path, 'a')
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                time.sleep(retry)
+        # fh stays open for the life of the process to hold the lock
+        Poller(session_factory, probe_fn=probe_fn).run()
+
+    t = threading.Thread(target=standby, name='poller-standby', daemon=True)
+    t.start()
+    return t
+
+
+def main():
+    import argparse
+    from sqlalchemy.orm import sessionmaker
+    parser = argparse.ArgumentParser(description='network-mapper reachability poller')
+    parser.add_argument('--once', action='store_true', help='probe every device once and exit')
+    args = parser.parse_args()
+    engine = database.make_engine(os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db'))
+    database.prepare_schema(engine)
+    session_factory = sessionmaker(bind=engine)
+    # the pool process at PROBE_POOL_SOCKET when one is configured, else a pool in this process
+    pool = probepool.connect()
+    p = Poller(session_factory, probe_fn=lambda target, check=None: probepool.pooled_probe(pool, target, check=check))
+    if args.once:
+        print(f'Recorded {p.poll_all()} probe results')
+        return
+    try:
+        p.run()
+    except KeyboardInterrupt:
+        p.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Reachability probe helpers shared by the ping endpoints.
+
+Two engines produce the same `{success, time, error}` result (`time` in
+float milliseconds):
+- `subprocess`: `ping_once` wraps a single `ping -c 1`, run on a thread pool.
+- `socket`: the in-process ICMP engine in `icmp.py`.
+With `count > 1` either engine sends that many echo requests `interval`
+seconds apart and adds loss and min/avg/max/mdev (see pingstats.py).
+Devices configured with a TCP or HTTP(S) check are probed with it instead
+(see servicecheck.py), through the same `probe_target` and `sweep`.
+`PROBE_ENGINE=auto` (default) picks `socket` when the kernel allows ICMP
+sockets and falls back to `subprocess` otherwise. `sweep` fans a list of
+targets out over either engine and yields results as they complete.
+"""
+import os
+import platform
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from urllib.parse import urlparse
+
+try:
+    import icmp
+    import pingstats
+    import servicecheck
+except Exception:
+    from backend import icmp
+    from backend import pingstats
+    from backend import servicecheck
+
+# per-probe subprocess timeout (seconds)
+PING_TIMEOUT = float(os.environ.get('PING_TIMEOUT', '3'))
+# sweep defaults; callers may ask for less/more but never above the caps
+SWEEP_CONCURRENCY = int(os.environ.get('PING_SWEEP_CONCURRENCY', '32'))
+SWEEP_MAX_CONCURRENCY = int(os.environ.get('PING_SWEEP_MAX_CONCURRENCY', '128'))
+SWEEP_DEADLINE = float(os.environ.get('PING_SWEEP_DEADLINE', '30'))
+SWEEP_MAX_DEADLINE = float(os.environ.get('PING_SWEEP_MAX_DEADLINE', '120'))
+# multi-packet probes: at most PROBE_MAX_COUNT packets, PROBE_INTERVAL seconds apart by default;
+# iputils refuses intervals under 0.2 s for unprivileged users
+PROBE_MAX_COUNT = int(os.environ.get('PROBE_MAX_COUNT', '10'))
+PROBE_INTERVAL = float(os.environ.get('PROBE_INTERVAL', '0.2'))
+PROBE_MIN_INTERVAL = 0.2
+PROBE_MAX_INTERVAL = 1.0
+# auto | socket | subprocess
+PROBE_ENGINE = os.environ.get('PROBE_ENGINE', 'auto').lower()
+# result errors that say nothing about the target (skipped when recording status)
+NOT_PROBED = ('invalid-target', 'deadline', 'busy', 'ping-not-found')
+
+
+def resolve_ping_binary():
+    ping_path = shutil.which("ping")
+    if ping_path:
+        return ping_path
+    for candidate in ("/sbin/ping", "/bin/ping", "/usr/bin/ping"):
+        if Path(candidate).exists():
+            return candidate
+    return None
+
+PING_BINARY = resolve_ping_binary()
+
+
+def normalize_target(target):
+    if not target:
+        return None
+    cleaned = target.strip()
+    if not cleaned:
+        return None
+    if cleaned.startswith(("http://", "https://")):
+        parsed = urlparse(cleaned)
+        return parsed.hostname
+    if '/' in cleaned:
+        cleaned = cleaned.split('/', 1)[0]
+    if ':' in cleaned and cleaned.count(':') == 1:
+        cleaned = cleaned.split(':', 1)[0]
+    return cleaned
+
+
+def ping_command(target, count=1, interval=None, timeout=None):
+    if platform.system().lower() == "windows":
+        # no interval option; -w is the per-reply timeout in ms
+        return [PING_BINARY, "-n", str(count), "-w", str(int((timeout or PING_TIMEOUT) * 1000)), target]
+    cmd = [PING_BINARY, "-c", str(count)]
+    if count > 1:
+        cmd += ["-i", f"{interval or PROBE_INTERVAL:g}"]
+    return cmd + [target]
+
+
+def ping_once(target, timeout=None):
+    """Send one echo request to an already-normalized target.
+
+    Returns `{"success", "time", "error"}` in the same shape `/api/ping` has
+    always returned.
+    """
+    if not PING_BINARY:
+        return {"success": False, "time": None, "error": "ping-not-found"}
+    try:
+        result = subprocess.run(ping_command(target), capture_output=True, text=True, timeout=timeout or PING_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {"success": False, "time": None, "error": "no-response"}
+    except Exception:
+        return {"success": False, "time": None, "error": "exception"}
+    if result.returncode != 0:
+        return {"success": False, "time": None, "error": "no-response"}
+    times = pingstats.reply_times(result.stdout)
+    return {"success": True, "time": times[0] if times else None, "error": None}
+
+
+def ping_multi(target, count, interval=None, timeout=None):
+    """`count` echo requests `interval` seconds apart through ping(8), with loss and RTT statistics."""
+    if not PING_BINARY:
+        return {**pingstats.result(count, []), "error": "ping-not-found"}
+    interval = interval or PROBE_INTERVAL
+    # the last request goes out after (count - 1) intervals and may take `timeout` to answer
+    limit = (count - 1) * interval + (timeout or PING_TIMEOUT)
+    try:
+        result = subprocess.run(ping_command(target, count, interval, timeout), capture_output=True, text=True, timeout=limit)
+        output = result.stdout
+    except subprocess.TimeoutExpired as e:
+        # killed before its summary: count the replies it printed
+        output = e.stdout.decode(errors='replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+    except Exception:
+        return {**pingstats.result(count, []), "error": "exception"}
+    return pingstats.parse_output(output, sent=count)
+
+
+def resolve_engine(engine=None):
+    """Map `auto` (or an explicit choice) to the engine that will actually run."""
+    engine = (engine or PROBE_ENGINE).lower()
+    if engine in ('auto', 'socket') and icmp.available():
+        return 'socket'
+    return 'subprocess'
+
+
+def engine_available(engine=None):
+    return resolve_engine(engine) == 'socket' or bool(PING_BINARY)
+
+
+def probe_target(target, timeout=None, engine=None, count=1, interval=None, check=None):
+    """Probe one normalized target with the configured engine, or run its service `check` (blocking)."""
+    if check is not None:
+        return servicecheck.run(target, check, timeout)
+    timeout = timeout or PING_TIMEOUT
+    socket_engine = resolve_engine(engine) == 'socket' and ':' not in target
+    if count > 1:
+        if socket_engine:
+            return icmp.get_prober().submit_many(target, count, interval or PROBE_INTERVAL, timeout).result()
+        return ping_multi(target, count, interval, timeout)
+    if socket_engine:
+        return icmp.get_prober().submit(target, timeout).result()
+    # IPv6 literals always go through ping(8)
+    return ping_once(target, timeout)
+
+
+def sweep(targets, concurrency=None, deadline=None, probe=None, engine=None):
+    """Probe many targets concurrently and yield `(key, result)` as each finishes.
+
+    `targets` is an iterable of `(key, raw_target)` pairs, or `(key, raw_target,
+    check)` for devices with a service check (`servicecheck.Check` or None); raw
+    targets are run through `normalize_target` and invalid ones are reported
+    immediately. Service checks run on the thread pool alongside pings. At
+    most `concurrency` probes are outstanding at once. Anything not finished
+    when `deadline` seconds have elapsed is reported with `error: "deadline"`.
+    `probe` overrides the engine with a blocking callable run on a thread pool;
+    it is called as `probe(target)`, or `probe(target, check=check)` for service checks.
+    """
+    concurrency = max(1, min(int(concurrency or SWEEP_CONCURRENCY), SWEEP_MAX_CONCURRENCY))
+    deadline = min(float(deadline or SWEEP_DEADLINE), SWEEP_MAX_DEADLINE)
+    started = time.monotonic()
+
+    prober = icmp.get_prober() if probe is None and resolve_engine(engine) == 'socket' else None
+    # threads start lazily, so under the socket engine this only serves IPv6 targets
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ping-sweep')
+
+    def submit(target, check):
+        if check is not None:
+            return executor.submit(probe or probe_target, target, check=check)
+        if prober is not None and ':' not in target:
+            return prober.submit(target, PING_TIMEOUT)
+        return executor.submit(probe or ping_once, target)
+
+    pending = {}
+    remaining_targets = iter(targets)
+    try:
+        while True:
+            while len(pending) < concurrency:
+                try:
+                    key, raw, *check = next(remaining_targets)
+                except StopIteration:
+                    break
+                target = normalize_target(raw)
+                if not target:
+                    yield key, {"success": False, "time": None, "error": "invalid-target"}
+                    continue
+                pending[submit(target, check[0] if check else None)] = key
+            if not pending:
+                break
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = pending.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception:
+                    res = {"success": False, "time": None, "error": "exception"}
+                yield key, res
+
+        for fut, key in pending.items():
+            fut.cancel()
+            yield key, {"success": False, "time": None, "error": "deadline"}
+        pending.clear()
+        for key, raw, *_ in remaining_targets:
+            error = "deadline" if normalize_target(raw) else "invalid-target"
+            yield key, {"success": False, "time": None, "error": error}
+    finally:
+        # queued probes are dropped; in-flight subprocesses finish on their own timeout
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,336 @@
+"""Probe worker pool, kept apart from the HTTP request threads.
+
+Web handlers don't run `ping` themselves; they hand the target to a
+`ProbePool` and wait at most a short budget for the answer:
+
+- a bounded queue (`PROBE_QUEUE_SIZE`): when it is full, `submit` raises
+  `Busy` right away and the API answers 429 instead of piling up threads;
+- at most `PROBE_POOL_CONCURRENCY` probes run at once;
+- a token bucket per subnet (/24 for IPv4, /64 for IPv6, the name for
+  hostnames) allows `PROBE_SUBNET_RATE` probes per second (bursts of
+  `PROBE_SUBNET_BURST`). Queued subnets take turns, so a storm against one
+  unreachable subnet can't starve the others;
+- TCP/HTTP service checks (servicecheck.py) queue, run and count against
+  the rate limits like pings;
+- every probe goes through the shared `pingcache.PingCache`, so identical
+  requests are coalesced, and a result that arrives after the caller stopped
+  waiting is there for its retry.
+
+Under gunicorn the pool runs in its own process, which the master starts
+before forking the workers (`gunicorn.conf.py`, `start_server`). Workers talk
+to it over the Unix socket in `PROBE_POOL_SOCKET` (`ProbeClient`), one JSON line
+each way. Without a socket (the Flask dev server, tests) the pool runs in the
+web process. `python -m backend.probepool` serves the pool on its own, e.g. in
+a separate container sharing the socket.
+"""
+import collections
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import probe
+    import pingcache
+    import servicecheck
+except Exception:
+    from backend import probe
+    from backend import pingcache
+    from backend import servicecheck
+
+PROBE_POOL_CONCURRENCY = int(os.environ.get('PROBE_POOL_CONCURRENCY', '64'))
+PROBE_QUEUE_SIZE = int(os.environ.get('PROBE_QUEUE_SIZE', '2000'))
+# probes per second per subnet (0 = unlimited) and how many may go out back to back
+PROBE_SUBNET_RATE = float(os.environ.get('PROBE_SUBNET_RATE', '20'))
+PROBE_SUBNET_BURST = int(os.environ.get('PROBE_SUBNET_BURST', '40'))
+# how long /api/ping waits before answering 202 queued (callers may ask for up to PROBE_MAX_WAIT)
+PROBE_WAIT = float(os.environ.get('PROBE_WAIT', '1'))
+PROBE_MAX_WAIT = probe.PING_TIMEOUT + 1
+# PROBE_POOL_SOCKET (read when connecting): talk to the pool process on this Unix socket;
+# unset: run the pool in-process. gunicorn's master puts the pool it starts here:
+PROBE_POOL_DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'network-mapper-probes.sock')
+
+
+class Busy(Exception):
+    """The probe queue is full."""
+
+
+def _failed():
+    return {"success": False, "time": None, "error": "exception", "cached": False, "age": 0.0}
+
+
+def subnet_key(target):
+    """Rate-limit bucket of a normalized target."""
+    try:
+        ip = ipaddress.ip_address(target)
+    except ValueError:
+        return target.lower()
+    prefix = 24 if ip.version == 4 else 64
+    return str(ipaddress.ip_network(f'{ip}/{prefix}', strict=False))
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.updated = float(burst), now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now, cost=1):
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def ready_in(self, now, cost=1):
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class ProbePool:
+    name = 'local'
+
+    def __init__(self, cache=None, concurrency=None, queue_size=None, rate=None, burst=None):
+        self.cache = cache or pingcache.PingCache(probe.probe_target)
+        self.concurrency = concurrency or PROBE_POOL_CONCURRENCY
+        self.queue_size = queue_size or PROBE_QUEUE_SIZE
+        self.rate = PROBE_SUBNET_RATE if rate is None else rate
+        self.burst = burst or PROBE_SUBNET_BURST
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='probe-pool')
+        self._cond = threading.Condition()
+        self._waiting = collections.OrderedDict()  # subnet -> deque of keys, in turn order
+        self._jobs = {}  # key -> Future, queued or running (identical submits share it)
+        self._buckets = {}
+        self._queued = 0
+        self._running = 0
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name='probe-pool-dispatch', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, target, engine=None, count=1, interval=None, check=None):
+        """Future of `{success, time, error, cached, age}`; raises `Busy` when the queue is full.
+
+        A multi-packet probe (`count` > 1) takes `count` of its subnet's tokens (at most a full burst).
+        With a `servicecheck.Check` the target's service is checked instead of pinged.
+        """
+        engine = probe.resolve_engine(engine)
+        cached = self.cache.peek(target, engine, count, interval, check)
+        if cached is not None:
+            fut = Future()
+            fut.set_result(cached)
+            return fut
+        key = (target, engine, count, interval, check)
+        with self._cond:
+            fut = self._jobs.get(key)
+            if fut is not None:
+                return fut
+            if self._queued >= self.queue_size:
+                raise Busy()
+            fut = self._jobs[key] = Future()
+            self._waiting.setdefault(subnet_key(target), collections.deque()).append(key)
+            self._queued += 1
+            self._cond.notify()
+        return fut
+
+    def probe(self, target, engine=None, wait=None, count=1, interval=None, check=None):
+        """Answer within `wait` seconds (None: however long it takes), else None; raises `Busy`."""
+        try:
+            return self.submit(target, engine, count, interval, check).result(timeout=wait)
+        except FutureTimeout:
+            return None
+
+    def stats(self):
+        with self._cond:
+            return {"queued": self._queued, "running": self._running, "subnets": len(self._waiting)}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _next_job(self, now):
+        """Pop the first key whose subnet has a token, rotating subnets; else (None, seconds to wait)."""
+        wake = None
+        for subnet in list(self._waiting):
+            bucket = self._buckets.get(subnet)
+            if bucket is None:
+                bucket = self._buckets[subnet] = TokenBucket(self.rate, self.burst, now)
+            cost = min(self._waiting[subnet][0][2], self.burst)
+            if self.rate > 0 and not bucket.take(now, cost):
+                ready = bucket.ready_in(now, cost)
+                wake = ready if wake is None else min(wake, ready)
+                continue
+            keys = self._waiting.pop(subnet)
+            key = keys.popleft()
+            if keys:
+                self._waiting[subnet] = keys  # back of the line
+            return key, None
+        return None, wake
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._closed:
+                if self._running >= self.concurrency or not self._waiting:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                key, wake = self._next_job(now)
+                if key is None:
+                    self._cond.wait(wake)
+                    continue
+                self._queued -= 1
+                self._running += 1
+                if len(self._buckets) > 4096:
+                    self._buckets = {s: b for s, b in self._buckets.items() if s in self._waiting or not b.full(now)}
+                self._executor.submit(self._run, key)
+
+    def _run(self, key):
+        target, engine, count, interval, check = key
+        try:
+            res = self.cache.probe(target, engine, count, interval, check)
+        except Exception:
+            res = _failed()
+        with self._cond:
+            fut = self._jobs.pop(key)
+            self._running -= 1
+            self._cond.notify()
+        fut.set_result(res)
+
+
+class ProbeClient:
+    """Web-worker side of a pool running in another process."""
+    name = 'process'
+
+    def __init__(self, path):
+        self.path = path
+        self._fallback = None
+
+    def probe(self, target, engine=None, wait=None, count=1, interval=None, check=None):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(self.path)
+                sock.settimeout(None if wait is None else max(wait, 0.01))
+                request = {"target": target, "engine": engine, "count": count, "interval": interval,
+                           "check": check and list(check)}
+                sock.sendall(json.dumps(request).encode() + b'\n')
+                line = sock.makefile('rb').readline()
+        except (FileNotFoundError, ConnectionRefusedError):
+            # the pool process is gone: keep answering from an in-process pool
+            if self._fallback is None:
+                print(f'Warning: probe pool at {self.path} unavailable, probing in-process')
+                self._fallback = ProbePool()
+            return self._fallback.probe(target, engine, wait, count, interval, check)
+        except socket.timeout:
+            return None
+        except OSError:
+            return _failed()
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return _failed()  # the pool process closed the connection without answering
+        if msg.get('busy'):
+            raise Busy()
+        return msg['result']
+
+    def stats(self):
+        return {}
+
+
+def pooled_probe(pool, target, engine=None, check=None):
+    """Blocking probe through `pool` for sweeps, live status and the poller; never raises `Busy`.
+
+    A full queue answers `busy`, and no answer within `probe.SWEEP_MAX_DEADLINE` answers `deadline`.
+    """
+    try:
+        res = pool.probe(target, engine, wait=probe.SWEEP_MAX_DEADLINE, check=check)
+    except Busy:
+        return {"success": False, "time": None, "error": "busy"}
+    return res or {"success": False, "time": None, "error": "deadline"}
+
+
+def connect(path=None):
+    """The pool for this process: a client of the pool process when a socket is configured."""
+    path = path or os.environ.get('PROBE_POOL_SOCKET')
+    return ProbeClient(path) if path else ProbePool()
+
+
+def serve(path, pool=None):
+    """Serve `pool` on a Unix socket until the process is stopped."""
+    pool = pool or ProbePool()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line.strip():
+                return
+            try:
+                req = json.loads(line)
+                check = servicecheck.Check(*req['check']) if req.get('check') else None
+                fut = pool.submit(req['target'], req.get('engine'), req.get('count', 1), req.get('interval'), check)
+                msg = {"result": fut.result()}
+            except Busy:
+                msg = {"busy": True}
+            except Exception:
+                # a request the pool can't take (e.g. a malformed check) still gets an answer
+                msg = {"result": _failed()}
+            try:
+                self.wfile.write(json.dumps(msg).encode() + b'\n')
+            except OSError:
+                pass  # the web worker stopped waiting; the result is in the cache
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.close()
+
+
+def start_server(path=None, timeout=10, env=None):
+    """Start `python -m backend.probepool` as a child process (gunicorn's master) and wait for its socket."""
+    path = path or PROBE_POOL_DEFAULT_SOCKET
+    if os.path.exists(path):
+        os.unlink(path)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, '-m', 'backend.probepool', '--socket', path], cwd=root, env=env)
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f'probe pool did not start on {path}')
+        time.sleep(0.05)
+    return proc, path
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='network-mapper probe pool')
+    parser.add_argument('--socket', default=os.environ.get('PROBE_POOL_SOCKET') or PROBE_POOL_DEFAULT_SOCKET)
+    args = parser.parse_args()
+    print(f'Probe pool listening on {args.socket}')
+    try:
+        serve(args.socket)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
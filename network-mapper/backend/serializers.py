@@ -0,0 +1,102 @@
+"""JSON shapes of buildings, floorplans and devices, in one place.
+
+List endpoints build a Core `select()` of just the columns they return
+(`select_devices()` etc.) and turn the row tuples into dicts with
+`*_rows(session, stmt)`, skipping ORM object construction, the identity map
+and instrumented attribute access. Objects already loaded through the ORM
+(single-device GET, snapshots for undo) go through `device_dict` and
+friends, which produce the same keys. `python scripts/bench_serialize.py`
+compares the two paths.
+
+With `?format=columns` a list endpoint answers with `columns()` instead:
+one array per field, which is smaller and cheaper to encode and parse than
+one object per row.
+"""
+from sqlalchemy import select
+
+try:
+    from models import Building, Floorplan, Device
+    import storage
+    import tiles
+except Exception:
+    from backend.models import Building, Floorplan, Device
+    from backend import storage
+    from backend import tiles
+
+DEVICE_FIELDS = ('id', 'name', 'ip', 'device_type', 'building_id', 'floorplan_id', 'x', 'y', 'note', 'mac', 'room',
+                 'check_type', 'check_port', 'check_path', 'check_status', 'poll_interval')
+CHECK_FIELDS = ('check_type', 'check_port', 'check_path', 'check_status')
+BUILDING_FIELDS = ('id', 'name', 'lat', 'lon')
+# everything floorplan_dict reads (storage.floorplan_url and tiles.tiles_info included)
+FLOORPLAN_COLUMNS = ('id', 'building_id', 'filename', 'created', 'stored_name', 'content_hash',
+                     'width', 'height', 'tile_max_zoom')
+FLOORPLAN_FIELDS = ('id', 'building_id', 'filename', 'created', 'url', 'hash', 'width', 'height', 'tiles')
+
+
+def select_devices():
+    return select(*(getattr(Device, f) for f in DEVICE_FIELDS))
+
+
+def select_buildings():
+    return select(*(getattr(Building, f) for f in BUILDING_FIELDS))
+
+
+def select_floorplans():
+    return select(*(getattr(Floorplan, f) for f in FLOORPLAN_COLUMNS))
+
+
+def device_dict(d):
+    return {k: getattr(d, k) for k in DEVICE_FIELDS}
+
+
+def building_dict(b):
+    return {k: getattr(b, k) for k in BUILDING_FIELDS}
+
+
+def floorplan_dict(f):
+    """Works for `Floorplan` objects and `select_floorplans()` rows alike."""
+    return {"id": f.id, "building_id": f.building_id, "filename": f.filename,
+            "created": f.created.isoformat() if f.created else None,
+            "url": storage.floorplan_url(f), "hash": f.content_hash,
+            "width": f.width, "height": f.height, "tiles": tiles.tiles_info(f)}
+
+
+def status_dict(s):
+    """Last-known status; works for `StatusHistory` objects and `poller.status_row()` dicts alike."""
+    get = s.get if isinstance(s, dict) else lambda k: getattr(s, k)
+    checked = get('timestamp')
+    return {"device_id": get('device_id'), "up": get('up'), "rtt_ms": get('rtt_ms'), "error": get('error'),
+            "checked": checked.isoformat() + "Z" if checked else None}
+
+
+def columns(rows, fields):
+    """Parallel arrays for `?format=columns`: `{"count": n, "columns": {field: [values...]}}`.
+
+    `rows` are tuples in `fields` order (Core rows) or dicts with those keys.
+    """
+    if rows and isinstance(rows[0], dict):
+        rows = [tuple(r[f] for f in fields) for r in rows]
+    arrays = list(zip(*rows)) if rows else [()] * len(fields)
+    return {"count": len(rows), "columns": {f: list(a) for f, a in zip(fields, arrays)}}
+
+
+def _dicts(rows, fields):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def fetch(session, stmt):
+    """Row tuples of a `select_*()` statement."""
+    return session.execute(stmt).all()
+
+
+def device_rows(session, stmt):
+    """`[device dict]` for a `select_devices()` statement (filtered, ordered, limited as needed)."""
+    return _dicts(fetch(session, stmt), DEVICE_FIELDS)
+
+
+def floorplan_rows(session, stmt):
+    return [floorplan_dict(row) for row in fetch(session, stmt)]
+
+
+def device_dicts(rows):
+    return _dicts(rows, DEVICE_FIELDS)
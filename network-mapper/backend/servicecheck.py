@@ -0,0 +1,217 @@
+"""TCP and HTTP(S) service checks, run by the same probe layer as ICMP.
+
+ICMP is often filtered, and a host that answers ping may still have a dead
+web server. A device can instead be checked with
+
+- `tcp`: connect to `check_port`; `time` is the connect time;
+- `http` / `https`: `HEAD check_path` on `check_port` (80/443 by default),
+  retried as `GET` when the server doesn't allow HEAD (405/501). The check
+  succeeds on `check_status`, or on any status below 400 when that is unset.
+  `time` runs until the response headers arrive, and `status` is the code.
+
+Results have the probe shape `{success, time, error}` plus `check` (the
+kind). Errors: `no-response` (timeout), `refused`, `unresolved`, `tls`,
+`unexpected-status` and `exception`.
+
+HTTP connections are kept alive and reused: up to `SERVICE_HTTP_POOL_SIZE`
+idle connections per scheme, host and port. A kept-alive connection the
+server has closed since is retried once on a fresh one. HTTPS verifies
+certificates; set `SERVICE_CHECK_TLS_VERIFY=0` for devices with self-signed ones.
+"""
+import http.client
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import namedtuple
+
+SERVICE_CHECK_TIMEOUT = float(os.environ.get('SERVICE_CHECK_TIMEOUT', '3'))
+# idle keep-alive connections kept per (scheme, host, port)
+SERVICE_HTTP_POOL_SIZE = int(os.environ.get('SERVICE_HTTP_POOL_SIZE', '4'))
+SERVICE_CHECK_TLS_VERIFY = os.environ.get('SERVICE_CHECK_TLS_VERIFY', '1').lower() not in ('0', 'false', 'no')
+# GET bodies longer than this aren't read to the end; the connection is closed instead of reused
+HTTP_MAX_BODY = 64 * 1024
+
+KINDS = ('tcp', 'http', 'https')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class Check(namedtuple('Check', 'kind port path status')):
+    """A device's service check; hashable, so it keys the probe pool, and `str()` keys the ping cache."""
+    __slots__ = ()
+
+    def __str__(self):
+        if self.kind == 'tcp':
+            return f'tcp:{self.port}'
+        return f'{self.kind}:{self.port}{self.path}={self.status or ""}'
+
+
+def _integer(value, name):
+    """`value` as an int: ints and integer strings only (not bools or floats such as 443.5)."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{name} must be an integer, not {value!r}')
+    return int(value)
+
+
+def from_fields(kind, port=None, path=None, status=None):
+    """`Check` for a device's `check_*` columns; None for ICMP. Raises ValueError when they don't make sense."""
+    kind = kind or 'icmp'
+    if not isinstance(kind, str):
+        raise ValueError(f'check type must be a string, not {kind!r}')
+    kind = kind.strip().lower()
+    if kind == 'icmp':
+        return None
+    if kind not in KINDS:
+        raise ValueError(f'unknown check type {kind!r}')
+    if port in (None, ''):
+        if kind == 'tcp':
+            raise ValueError('tcp checks need a port')
+        port = DEFAULT_PORTS[kind]
+    port = _integer(port, 'port')
+    if not 0 < port < 65536:
+        raise ValueError(f'port {port} out of range')
+    if kind == 'tcp':
+        return Check(kind, port, None, None)
+    path = path or '/'
+    if not isinstance(path, str):
+        raise ValueError(f'path must be a string, not {path!r}')
+    if not path.startswith('/') or any(c.isspace() for c in path):
+        raise ValueError(f'bad path {path!r}')
+    status = _integer(status, 'status') if status not in (None, '') else None
+    if status is not None and not 100 <= status < 600:
+        raise ValueError(f'status {status} out of range')
+    return Check(kind, port, path, status)
+
+
+def from_device(d):
+    """`Check` for a device row or object (None for ICMP or an unusable configuration)."""
+    try:
+        return from_fields(d.check_type, d.check_port, d.check_path, d.check_status)
+    except (TypeError, ValueError):
+        return None
+
+
+def _failure(check, error, **extra):
+    return {"success": False, "time": None, "error": error, "check": check.kind, **extra}
+
+
+def _error_name(e):
+    if isinstance(e, socket.timeout):
+        return 'no-response'
+    if isinstance(e, ConnectionRefusedError):
+        return 'refused'
+    if isinstance(e, socket.gaierror):
+        return 'unresolved'
+    if isinstance(e, ssl.SSLError):
+        return 'tls'
+    if isinstance(e, OSError):
+        return 'no-response'  # unreachable networks and hosts
+    return 'exception'
+
+
+def tcp_check(target, check, timeout=None):
+    started = time.perf_counter()
+    try:
+        sock = socket.create_connection((target, check.port), timeout=timeout or SERVICE_CHECK_TIMEOUT)
+    except Exception as e:
+        return _failure(check, _error_name(e))
+    elapsed = (time.perf_counter() - started) * 1000
+    sock.close()
+    return {"success": True, "time": round(elapsed, 3), "error": None, "check": check.kind}
+
+
+class ConnectionPool:
+    """Idle keep-alive `http.client` connections, per (scheme, host, port)."""
+
+    def __init__(self, size=None):
+        self.size = SERVICE_HTTP_POOL_SIZE if size is None else size
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._tls = None
+
+    def _context(self):
+        if self._tls is None:
+            ctx = ssl.create_default_context()
+            if not SERVICE_CHECK_TLS_VERIFY:
+                ctx.check_hostname = False
+                ctx.verify_mode = ssl.CERT_NONE
+            self._tls = ctx
+        return self._tls
+
+    def get(self, scheme, host, port, timeout):
+        """`(connection, reused)`; a new connection isn't connected yet."""
+        with self._lock:
+            idle = self._idle.get((scheme, host, port))
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.sock.settimeout(timeout)
+            return conn, True
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._context()), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def put(self, scheme, host, port, conn):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host, port), [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+_pool = ConnectionPool()
+
+
+def _request(conn, method, path):
+    conn.request(method, path, headers={'User-Agent': 'network-mapper', 'Accept': '*/*'})
+    resp = conn.getresponse()
+    if method == 'GET':
+        resp.read(HTTP_MAX_BODY)
+    else:
+        resp.read()
+    return resp
+
+
+def http_check(target, check, timeout=None, pool=None):
+    pool = pool or _pool
+    timeout = timeout or SERVICE_CHECK_TIMEOUT
+    method = 'HEAD'
+    while True:
+        started = time.perf_counter()
+        conn, reused = pool.get(check.kind, target, check.port, timeout)
+        try:
+            resp = _request(conn, method, check.path)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+            conn.close()
+            if reused:
+                continue  # the server dropped the idle connection; try a fresh one
+            return _failure(check, _error_name(e))
+        except Exception as e:
+            conn.close()
+            return _failure(check, _error_name(e))
+        elapsed = (time.perf_counter() - started) * 1000
+        if resp.isclosed() and not resp.will_close:
+            pool.put(check.kind, target, check.port, conn)
+        else:
+            conn.close()
+        if method == 'HEAD' and resp.status in (405, 501):
+            method = 'GET'
+            continue
+        ok = resp.status == check.status if check.status else resp.status < 400
+        return {"success": ok, "time": round(elapsed, 3), "error": None if ok else 'unexpected-status',
+                "check": check.kind, "status": resp.status}
+
+
+def run(target, check, timeout=None):
+    """Run `check` against a normalized target (blocking)."""
+    if check.kind == 'tcp':
+        return tcp_check(target, check, timeout)
+    return http_check(target, check, timeout)
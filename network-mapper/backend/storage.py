@@ -0,0 +1,142 @@
+"""Content-addressed floorplan storage.
+
+Uploads are streamed to a temporary file in `UPLOAD_FOLDER` while being
+hashed, then renamed to `<sha256>.<ext>`. Uploading the same plan again finds
+the file already there and keeps a single copy; the client's file name is
+only kept on the row for display. Because a stored name always refers to
+the same bytes, `/uploads/<sha256>.<ext>` can be cached as immutable.
+
+Pixel dimensions are read from the image header (PNG, GIF and JPEG are parsed
+directly; other formats go through Pillow's lazy `Image.open`, which also
+stops after the header), so even a huge scan is never decoded to measure it.
+"""
+import hashlib
+import os
+import re
+import struct
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # PNG/GIF/JPEG sizes are still read without Pillow
+    Image = None
+
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
+CHUNK_SIZE = 1024 * 1024
+STORED_NAME = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$')
+
+
+def extension(filename):
+    """Lowercased extension of a client file name ('' when missing or odd)."""
+    ext = os.path.splitext(os.path.basename(filename or ''))[1].lower()
+    return ext if re.fullmatch(r'\.[a-z0-9]{1,8}', ext) else ''
+
+
+def is_content_addressed(name):
+    return bool(STORED_NAME.match(name or ''))
+
+
+def store_upload(stream, filename, folder=None):
+    """Stream `stream` into `folder` under its content hash.
+
+    Returns `{"name", "hash", "size", "path", "existed"}`; `existed` is True
+    when identical content was already stored (the new copy is discarded).
+    """
+    folder = folder or UPLOAD_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        name = digest.hexdigest() + extension(filename)
+        path = os.path.join(folder, name)
+        existed = os.path.exists(path)
+        if existed:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {'name': name, 'hash': digest.hexdigest(), 'size': size, 'path': path, 'existed': existed}
+
+
+def _png_size(head, fh):
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    return None
+
+
+def _gif_size(head, fh):
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+    return None
+
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) don't
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(head, fh):
+    if head[:2] != b'\xff\xd8':
+        return None
+    fh.seek(2)
+    while True:
+        marker = fh.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:  # fill byte
+            fh.seek(-1, os.SEEK_CUR)
+            continue
+        if code in (0x01, *range(0xD0, 0xD8)):  # markers without a length
+            continue
+        length = fh.read(2)
+        if len(length) < 2:
+            return None
+        seg_len = struct.unpack('>H', length)[0]
+        if code in _JPEG_SOF:
+            data = fh.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        fh.seek(seg_len - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    """`(width, height)` from the image header, or None if it can't be determined."""
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(32)
+            for parse in (_png_size, _gif_size, _jpeg_size):
+                size = parse(head, fh)
+                if size:
+                    return size
+    except OSError:
+        return None
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as im:  # lazy: reads the header only
+            return im.size
+    except Exception:
+        return None
+
+
+def floorplan_url(fp):
+    return f'/uploads/{fp.stored_name or fp.filename}'
+
+
+def stored_path(fp, folder=None):
+    return os.path.join(folder or UPLOAD_FOLDER, fp.stored_name or fp.filename)
+
@@ -11,7 +11,8 @@ def test_health():
 def test_import_devices_csv():
     csv_data = "name,ip,type,building\nTestSwitch,10.0.0.5,switch,TestBuilding\n"
     files = {'file': ('devices.csv', csv_data)}
-    r = requests.post(BASE + '/api/devices/import', files=files)
+    # wait=1: run the import job inside the request and return the finished job
+    r = requests.post(BASE + '/api/devices/import', files=files, data={'wait': '1'})
     assert r.status_code == 200
     created = r.json().get('created')
     assert isinstance(created, int)
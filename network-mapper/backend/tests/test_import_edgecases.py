@@ -18,6 +18,7 @@ def test_import_csv_with_missing_extra_and_duplicate_rows():
     r = requests.post(
         f"{BASE}/api/devices/import",
         files={"file": ("edgecases.csv", csv_data, "text/csv")},
+        data={"wait": "1"},  # finish the import job within the request
         timeout=10,
     )
     assert r.status_code == 200, r.text
@@ -32,6 +33,7 @@ def test_import_csv_with_minimal_columns_does_not_crash():
     r = requests.post(
         f"{BASE}/api/devices/import",
         files={"file": ("minimal.csv", csv_data, "text/csv")},
+        data={"wait": "1"},
         timeout=10,
     )
     assert r.status_code == 200, r.text
@@ -0,0 +1,205 @@
+"""Tiled image pyramid for floorplan uploads.
+
+Large CAD exports are cut into `TILE_SIZE` PNG tiles at every zoom level
+(level `max_zoom` is full resolution, each lower level halves the size, level
+0 fits in one tile) plus a small preview for first paint. The building editor
+shows the preview straight away and fetches only the tiles covering the
+visible part of the plan at the level matching the on-screen size.
+
+Layout under `TILES_FOLDER/<key>/`: `preview.png`, `<z>/<x>_<y>.png`, where
+the key is the floorplan's content hash (see storage.py), so a plan uploaded
+to several buildings is tiled once and its tile URLs never change meaning.
+Rows from before content addressing use their id until `main()` backfills them.
+Level `z` is `ceil(width / 2**(max_zoom - z))` pixels wide, so the client can
+place tiles in the same normalized 0–1 space the device markers use.
+
+Pillow is optional: without it (or for formats it can't read, e.g. SVG)
+uploads are stored untiled and the editor loads the original file.
+"""
+import math
+import os
+import re
+import shutil
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:  # tiling disabled; floorplans are served as uploaded
+    Image = None
+
+try:
+    import storage
+except Exception:
+    from backend import storage
+
+TILE_SIZE = 256
+# longest edge of the preview image shown before tiles arrive
+PREVIEW_SIZE = int(os.environ.get('FLOORPLAN_PREVIEW_SIZE', '1024'))
+TILES_FOLDER = os.environ.get('TILES_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads', 'tiles'))
+# refuse to tile anything bigger than this many pixels (decompression bombs)
+MAX_PIXELS = int(os.environ.get('FLOORPLAN_MAX_PIXELS', str(400_000_000)))
+if Image is not None and Image.MAX_IMAGE_PIXELS is not None:
+    # MAX_PIXELS is checked from the header before decoding; Pillow's own bomb check would refuse smaller plans
+    Image.MAX_IMAGE_PIXELS = max(Image.MAX_IMAGE_PIXELS, MAX_PIXELS)
+TILE_KEY = re.compile(r'^(?:[0-9a-f]{64}|[0-9]+)$')
+
+
+def tile_key(fp):
+    return fp.content_hash or str(fp.id)
+
+
+def tile_dir(key):
+    """Pyramid directory for a tile key; ValueError for anything that isn't one."""
+    key = str(key)
+    if not TILE_KEY.match(key):
+        raise ValueError('invalid-tile-key')
+    return os.path.join(TILES_FOLDER, key)
+
+
+def max_zoom_for(width, height, tile_size=TILE_SIZE):
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+
+def build_pyramid(src_path, out_dir, tile_size=TILE_SIZE):
+    """Write tiles and preview for `src_path` into `out_dir`.
+
+    Returns `{"width", "height", "maxZoom"}`, or None when the file can't be
+    tiled (no Pillow, not a raster image, too large).
+    """
+    if Image is None:
+        return None
+    try:
+        im = Image.open(src_path)  # lazy: reads the header only
+    except Exception:
+        return None
+    with im:
+        width, height = im.size
+        # before load(): a decompression bomb is refused without decoding it
+        if width * height > MAX_PIXELS:
+            return None
+        try:
+            im.load()
+        except Exception:
+            return None
+        if im.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            im = im.convert('RGBA')
+        max_zoom = max_zoom_for(width, height, tile_size)
+        parent = os.path.dirname(out_dir)
+        os.makedirs(parent, exist_ok=True)
+        # a directory per build: concurrent uploads of the same plan don't write into each other's
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=os.path.basename(out_dir) + '.tmp-')
+        os.chmod(tmp_dir, 0o755)
+        try:
+            _write_pyramid(im, tmp_dir, max_zoom, tile_size)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    # swap in the finished pyramid so readers never see a half-written one
+    shutil.rmtree(out_dir, ignore_errors=True)
+    try:
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        # a concurrent build of the same file got there first; its pyramid is identical
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {'width': width, 'height': height, 'maxZoom': max_zoom}
+
+
+def _write_pyramid(im, tmp_dir, max_zoom, tile_size):
+    preview = im.copy()
+    preview.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.LANCZOS)
+    preview.save(os.path.join(tmp_dir, 'preview.png'))
+
+    level = im
+    for z in range(max_zoom, -1, -1):
+        level_dir = os.path.join(tmp_dir, str(z))
+        os.makedirs(level_dir)
+        lw, lh = level.size
+        for ty in range(math.ceil(lh / tile_size)):
+            for tx in range(math.ceil(lw / tile_size)):
+                box = (tx * tile_size, ty * tile_size, min(lw, (tx + 1) * tile_size), min(lh, (ty + 1) * tile_size))
+                level.crop(box).save(os.path.join(level_dir, f'{tx}_{ty}.png'))
+        if z:
+            # reduce() rounds up, matching ceil(width / 2**(max_zoom - z)) used by the client
+            level = level.reduce(2)
+
+
+def tile_floorplan(fp, src_path, force=False):
+    """Build the pyramid for a Floorplan row and record its size/levels on it (caller commits).
+
+    Content-addressed plans whose pyramid already exists (same file uploaded
+    before) reuse it.
+    """
+    out_dir = tile_dir(tile_key(fp))
+    if not force and fp.content_hash and fp.width and fp.height and os.path.exists(os.path.join(out_dir, 'preview.png')):
+        fp.tile_max_zoom = max_zoom_for(fp.width, fp.height)
+        return True
+    info = build_pyramid(src_path, out_dir)
+    if info is None:
+        return False
+    fp.width = info['width']
+    fp.height = info['height']
+    fp.tile_max_zoom = info['maxZoom']
+    return True
+
+
+def remove_tiles(key):
+    shutil.rmtree(tile_dir(key), ignore_errors=True)
+
+
+def tiles_info(fp):
+    """The `tiles` object `/api/floorplans` returns for a row, or None if it has no pyramid."""
+    if fp.tile_max_zoom is None:
+        return None
+    base = f'/api/tiles/{tile_key(fp)}'
+    return {
+        'tileSize': TILE_SIZE,
+        'maxZoom': fp.tile_max_zoom,
+        'url': base + '/{z}/{x}/{y}.png',
+        'preview': base + '/preview.png',
+    }
+
+
+def main():
+    """Backfill content hashes, sizes and pyramids for floorplans uploaded before they existed.
+
+    Legacy files are copied to their content-addressed name; the originals
+    are left in place.
+    """
+    import argparse
+    from sqlalchemy.orm import sessionmaker
+    try:
+        from models import Floorplan
+        import database
+    except Exception:
+        from backend.models import Floorplan
+        from backend import database
+    parser = argparse.ArgumentParser(description='build floorplan tile pyramids')
+    parser.add_argument('--force', action='store_true', help='rebuild floorplans that already have tiles')
+    parser.add_argument('--uploads', default=storage.UPLOAD_FOLDER)
+    args = parser.parse_args()
+    engine = database.make_engine(os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db'))
+    session = sessionmaker(bind=engine)()
+    try:
+        for fp in session.query(Floorplan).order_by(Floorplan.id):
+            if fp.content_hash is None:
+                legacy = os.path.join(args.uploads, fp.filename)
+                if os.path.exists(legacy):
+                    old_key = tile_key(fp)
+                    with open(legacy, 'rb') as fh:
+                        stored = storage.store_upload(fh, fp.filename, args.uploads)
+                    fp.content_hash, fp.stored_name = stored['hash'], stored['name']
+                    fp.width, fp.height = storage.image_size(stored['path']) or (fp.width, fp.height)
+                    remove_tiles(old_key)
+                    fp.tile_max_zoom = None
+            if fp.tile_max_zoom is not None and not args.force:
+                session.commit()
+                continue
+            ok = tile_floorplan(fp, storage.stored_path(fp, args.uploads), force=args.force)
+            print(f'{fp.id} {fp.filename}: ' + (f'{fp.width}x{fp.height}, {fp.tile_max_zoom + 1} levels' if ok else 'skipped'))
+            session.commit()
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Per-table change counters used as strong ETags by the list endpoints.
+
+`track(session_factory)` hooks the sessionmaker: every ORM flush and every
+DML statement run through a session (including the Core bulk inserts of the
+CSV importer) records which tables it touched, and `before_commit` bumps the
+matching `table_versions` rows inside the same transaction. Writers in any
+gunicorn worker or background thread therefore move the counter, and a GET
+can answer `If-None-Match` by reading one primary-key row instead of the
+table it describes.
+
+Counters start from the current time in milliseconds rather than 0, so a
+recreated database never reissues an ETag a browser still has cached.
+"""
+import time
+
+from sqlalchemy import event, select, update
+
+try:
+    from models import TableVersion
+except Exception:
+    from backend.models import TableVersion
+
+TRACKED_TABLES = frozenset(('buildings', 'floorplans', 'devices'))
+_CHANGED = 'nm_changed_tables'
+
+
+def _mark(session, table_name):
+    if table_name in TRACKED_TABLES:
+        session.info.setdefault(_CHANGED, set()).add(table_name)
+
+
+def _after_flush(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            _mark(session, table.name)
+
+
+def _do_orm_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, 'table', None)
+        if table is not None:
+            _mark(session=state.session, table_name=table.name)
+
+
+def _before_commit(session):
+    # pending objects are flushed after this hook runs; flush now so they are counted
+    session.flush()
+    for name in sorted(session.info.pop(_CHANGED, ())):
+        bump(session, name)
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+
+
+def bump(session, name):
+    """Increment `name`'s counter in the session's transaction (creating it on first use)."""
+    result = session.execute(update(TableVersion).where(TableVersion.name == name)
+                             .values(version=TableVersion.version + 1))
+    if result.rowcount == 0:
+        session.add(TableVersion(name=name, version=int(time.time() * 1000)))
+        session.flush()
+
+
+def track(session_factory):
+    event.listen(session_factory, 'after_flush', _after_flush)
+    event.listen(session_factory, 'do_orm_execute', _do_orm_execute)
+    event.listen(session_factory, 'before_commit', _before_commit)
+    event.listen(session_factory, 'after_rollback', _after_rollback)
+    return session_factory
+
+
+def etag(session, *names):
+    """Strong ETag for a response built from `names`, or None before their first tracked write."""
+    rows = dict(session.execute(select(TableVersion.name, TableVersion.version)
+                                .where(TableVersion.name.in_(names))).all())
+    if any(n not in rows for n in names):
+        return None
+    return '-'.join(f'{n}.{rows[n]}' for n in names)
@@ -29,9 +29,9 @@ async function cleanupE2E(request: APIRequestContext): Promise<void> {
 }
 
 async function uploadCsvViaUi(page: Page, csv: string, fileName: string): Promise<string> {
-  // retry the whole upload sequence to reduce flakiness (intermittent dialog/timeouts)
+  // retry the whole upload sequence to reduce flakiness (intermittent timeouts)
   return await retry(async () => {
-    const dialogPromise = page.waitForEvent('dialog', { timeout: 30_000 });
+    await page.evaluate(() => { document.getElementById('importStatus')!.textContent = ''; });
     await page.setInputFiles('form#importForm input[name="file"]', {
       name: fileName,
       mimeType: 'text/csv',
@@ -41,10 +41,10 @@ async function uploadCsvViaUi(page: Page, csv: string, fileName: string): Promis
     await page.waitForSelector('form#importForm button[type="submit"]', { timeout: 10_000 });
     await page.click('form#importForm button[type="submit"]');
 
-    const dialog = await dialogPromise;
-    const msg = dialog.message();
-    await dialog.accept();
-    return msg;
+    // the import runs as a background job; the page polls it and writes the summary into #importStatus
+    const status = page.locator('#importStatus');
+    await expect(status).toContainText(/Imported|Import failed/, { timeout: 30_000 });
+    return (await status.textContent()) || '';
   }, 3, 500);
 }
 
@@ -87,8 +87,8 @@ test.describe('CSV import edge cases (E2E)', () => {
       `${unique}-host,switch,${unique}-Building,ignored`,
     ].join('\n');
 
-    const alertText = await uploadCsvViaUi(page, csv, 'missing-cols.csv');
-    expect(alertText).toContain('Imported 1 devices');
+    const statusText = await uploadCsvViaUi(page, csv, 'missing-cols.csv');
+    expect(statusText).toContain('Imported 1 rows: 1 created');
 
     await waitForDeviceRowWithText(page, `${unique}-host`);
     const count = await countDevicesByPrefix(request, unique);
@@ -107,8 +107,8 @@ test.describe('CSV import edge cases (E2E)', () => {
       `${unique}-other,10.88.0.11,camera,${unique}-Building`,
     ].join('\n');
 
-    const alertText = await uploadCsvViaUi(page, csv, 'dupes.csv');
-    expect(alertText).toContain('Imported 3 devices');
+    const statusText = await uploadCsvViaUi(page, csv, 'dupes.csv');
+    expect(statusText).toContain('Imported 3 rows: 3 created');
 
     await waitForDeviceRowWithText(page, `${unique}-other`);
     const count = await countDevicesByPrefix(request, unique);
@@ -126,8 +126,8 @@ test.describe('CSV import edge cases (E2E)', () => {
       rows.push(`${unique}-${i},10.77.${Math.floor(i / 250)}.${(i % 250) + 1},switch,${unique}-Building`);
     }
 
-    const alertText = await uploadCsvViaUi(page, rows.join('\n'), 'bulk.csv');
-    expect(alertText).toContain(`Imported ${batchSize} devices`);
+    const statusText = await uploadCsvViaUi(page, rows.join('\n'), 'bulk.csv');
+    expect(statusText).toContain(`Imported ${batchSize} rows: ${batchSize} created`);
 
     await waitForDeviceRowWithText(page, `${unique}-${batchSize - 1}`, 20);
     const count = await countDevicesByPrefix(request, unique);
@@ -17,6 +17,8 @@ document.addEventListener('DOMContentLoaded', ()=>{
   let currentEditingId = null;
   const undoStack = [];
   const redoStack = [];
+  // marker ids (strings, as in data-id) picked with shift/ctrl-click
+  const selectedIds = new Set();
   const DEVICE_TYPES_KEY = 'nmDeviceTypesV1';
   const TYPE_ICON_MAP_KEY = 'nmTypeIconMapV1';
   const DEFAULT_DEVICE_TYPES = ['switch', 'ap', 'camera', 'phone'];
@@ -84,6 +86,8 @@ document.addEventListener('DOMContentLoaded', ()=>{
       if(a.type==='create') msg = `Create: device ${a.id}`;
       if(a.type==='delete') msg = `Delete: device ${a.id}`;
       if(a.type==='update') msg = `Update: device ${a.id}`;
+      if(a.type==='bulk') msg = `${a.label}: ${a.items.length} devices`;
+      if(a.type==='bulk-delete') msg = `Delete: ${a.snapshots.length} devices`;
       li.innerHTML = `<div>${msg}</div><div class='meta'>${new Date(a.ts||Date.now()).toLocaleString()}</div>`;
       list.appendChild(li);
     });
@@ -92,12 +96,64 @@ document.addEventListener('DOMContentLoaded', ()=>{
     if(histCount) histCount.textContent = undoStack.length;
   }
 
+  // Group actions (multi-select move/retype/delete) are one history entry and
+  // one bulk request each way: `bulk` holds per-device {id, prev, next} field
+  // sets, `bulk-delete` holds the snapshots returned by DELETE /api/devices/bulk.
+  async function sendBulkPatch(changes){
+    const r = await fetch('/api/devices/bulk', {method:'PATCH', headers:{'Content-Type':'application/json'}, body: JSON.stringify({changes})});
+    return r.ok ? r.json() : null;
+  }
+
+  function applyMarkerFields(id, fields){
+    const m = document.querySelector(`.marker[data-id='${id}']`);
+    if(!m) return;
+    if('name' in fields) m.title = fields.name || '';
+    if('device_type' in fields) setMarkerIcon(m, fields.device_type);
+    if('x' in fields) m.style.left = ((fields.x||0)*100)+'%';
+    if('y' in fields) m.style.top = ((fields.y||0)*100)+'%';
+  }
+
+  async function applyBulk(action, which){
+    const j = await sendBulkPatch(action.items.map(it=>({id: Number(it.id), ...it[which]})));
+    if(j) action.items.forEach(it=>applyMarkerFields(it.id, it[which]));
+    return !!j;
+  }
+
+  async function bulkDelete(ids){
+    const r = await fetch('/api/devices/bulk', {method:'DELETE', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ids: ids.map(Number)})});
+    if(!r.ok) return null;
+    const j = await r.json();
+    j.snapshots.forEach(s=>{ document.querySelector(`.marker[data-id='${s.id}']`)?.remove(); selectedIds.delete(String(s.id)); });
+    renderSelection();
+    return j.snapshots;
+  }
+
+  async function bulkRestore(snapshots){
+    const r = await fetch('/api/devices/bulk/restore', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({snapshots})});
+    if(!r.ok) return null;
+    const j = await r.json();
+    const wrap = document.getElementById('floorWrap');
+    // ids may change when the original is taken; later redo must use the new ones
+    return snapshots.map((s, i)=>{
+      const restored = {...s, id: j.restored[i].id};
+      if(wrap && String(restored.floorplan_id) === floorplanArea.getAttribute('data-floorplan-id')) wrap.appendChild(createMarkerElement(restored));
+      return restored;
+    });
+  }
+
   // Undo/redo relies on API `prev` and `snapshot` payloads from PUT/DELETE to reverse client actions safely.
   async function performUndo(){
     const action = undoStack.pop();
     if(!action) return showToast('Nothing to undo','error');
     try{
-      if(action.type==='move'){
+      if(action.type==='bulk'){
+        if(await applyBulk(action, 'prev')){ showToast(`${action.label} undone`,'success'); redoStack.push(action); }
+        else{ showToast('Undo failed','error'); undoStack.push(action); }
+      }else if(action.type==='bulk-delete'){
+        const restored = await bulkRestore(action.snapshots);
+        if(restored){ showToast('Delete undone (restored)','success'); redoStack.push({...action, snapshots: restored}); }
+        else{ showToast('Restore failed','error'); undoStack.push(action); }
+      }else if(action.type==='move'){
         const id = action.id;
         const prev = action.prev;
         const r = await fetch('/api/devices/'+id, {method:'PUT', headers:{'Content-Type':'application/json'}, body: JSON.stringify({x: prev.x, y: prev.y})});
@@ -122,7 +178,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
             if(r.ok){
               const jr = await r.json();
               const restoredId = jr.id;
-              const payload = {name: snap.name, device_type: snap.device_type, ip: snap.ip, note: snap.note, x: snap.x, y: snap.y, floorplan_id: snap.floorplan_id, mac: snap.mac || null, room: snap.room || null};
+              const payload = {name: snap.name, device_type: snap.device_type, ip: snap.ip, note: snap.note, x: snap.x, y: snap.y, floorplan_id: snap.floorplan_id, mac: snap.mac || null, room: snap.room || null, check_type: snap.check_type || null, check_port: snap.check_port ?? null, check_path: snap.check_path || null, check_status: snap.check_status ?? null, poll_interval: snap.poll_interval ?? null};
               const d = {id: restoredId, name: payload.name, device_type: payload.device_type, x: payload.x, y: payload.y};
               const m = createMarkerElement(d);
               document.getElementById('floorWrap').appendChild(m);
@@ -134,7 +190,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
           }
         }catch(e){ console.warn('restore endpoint failed, falling back to create', e); }
         // fallback: create a new device
-        const payload = {name: snap.name, device_type: snap.device_type, ip: snap.ip, note: snap.note, x: snap.x, y: snap.y, floorplan_id: snap.floorplan_id, mac: snap.mac || null, room: snap.room || null}
+        const payload = {name: snap.name, device_type: snap.device_type, ip: snap.ip, note: snap.note, x: snap.x, y: snap.y, floorplan_id: snap.floorplan_id, mac: snap.mac || null, room: snap.room || null, check_type: snap.check_type || null, check_port: snap.check_port ?? null, check_path: snap.check_path || null, check_status: snap.check_status ?? null, poll_interval: snap.poll_interval ?? null}
         const r2 = await fetch('/api/devices', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload)});
         if(r2.ok){ const j = await r2.json(); const d = {id:j.id, name: payload.name, device_type: payload.device_type, x: payload.x, y: payload.y}; const m = createMarkerElement(d); document.getElementById('floorWrap').appendChild(m); showToast('Delete undone (restored)','success');
           // for redo we need to refer to new id
@@ -156,7 +212,14 @@ document.addEventListener('DOMContentLoaded', ()=>{
     const action = redoStack.pop();
     if(!action) return showToast('Nothing to redo','error');
     try{
-      if(action.type==='move'){
+      if(action.type==='bulk'){
+        if(await applyBulk(action, 'next')){ showToast(`Redo ${action.label.toLowerCase()}`,'success'); undoStack.push(action); }
+        else{ showToast('Redo failed','error'); redoStack.push(action); }
+      }else if(action.type==='bulk-delete'){
+        const snapshots = await bulkDelete(action.snapshots.map(s=>s.id));
+        if(snapshots){ showToast('Redo delete','success'); undoStack.push({...action, snapshots}); }
+        else{ showToast('Redo failed','error'); redoStack.push(action); }
+      }else if(action.type==='move'){
         // reapply move
         const id = action.id; const next = action.next;
         const r = await fetch('/api/devices/'+id, {method:'PUT', headers:{'Content-Type':'application/json'}, body: JSON.stringify({x: next.x, y: next.y})});
@@ -253,43 +316,250 @@ document.addEventListener('DOMContentLoaded', ()=>{
       }catch(e){}
     });
   })();
+  // list endpoints answer with ETags; 'no-cache' makes the browser revalidate its
+  // cached copy (If-None-Match) instead of re-downloading, so repeats are 304s
+  const REVALIDATE = {cache: 'no-cache'};
+
+  // list endpoints with ?format=columns send {count, columns: {field: [values...]}}: one array
+  // per field is smaller to download and quicker to JSON.parse than one object per row
+  async function fetchRows(url){
+    const res = await fetch(url + (url.includes('?') ? '&' : '?') + 'format=columns', REVALIDATE);
+    if(!res.ok) throw new Error(`${url}: ${res.status}`);
+    return rowsFromColumns(await res.json());
+  }
+
+  function rowsFromColumns({count, columns}){
+    const fields = Object.keys(columns);
+    const rows = new Array(count);
+    for(let i = 0; i < count; i++){
+      const row = {};
+      for(const f of fields) row[f] = columns[f][i];
+      rows[i] = row;
+    }
+    return rows;
+  }
+
   async function loadFloorplans(){
-    const [fpsRes, bsRes] = await Promise.all([fetch('/api/floorplans'), fetch('/api/buildings')]);
-    const fps = await fpsRes.json();
-    const bs = await bsRes.json();
+    const [fps, bs] = await Promise.all([fetchRows('/api/floorplans'), fetchRows('/api/buildings')]);
     const bMap = Object.fromEntries(bs.map(b=>[b.id,b]));
     fpSelect.innerHTML = '';
     fps.forEach(f=>{ const opt = document.createElement('option'); opt.value = f.id; opt.innerText = `${bMap[f.building_id]?.name || f.building_id} — ${f.filename}`; fpSelect.appendChild(opt)});
   }
 
   async function loadFloorplanById(fpId){
-    const fpsRes = await fetch('/api/floorplans');
-    const fps = await fpsRes.json();
+    const fps = await fetchRows('/api/floorplans');
     const fp = fps.find(x=>String(x.id)===String(fpId));
     if(!fp) return alert('floorplan not found');
-    floorplanArea.innerHTML = `<p>Loaded: ${fp.filename}</p><div id='floorWrap' style='position:relative;display:inline-block'><img id='floorImage' src='/uploads/${fp.filename}' style='max-width:100%;display:block'></div>`;
+    // tiled plans show the small preview first; tiles for the visible area are layered on top
+    const src = fp.tiles ? fp.tiles.preview : fp.url;
+    floorplanArea.innerHTML = `<p>Loaded: ${fp.filename} <span class='zoomControls'><button id='zoomOutBtn' title='Zoom out'>−</button><button id='zoomResetBtn' title='Fit'>100%</button><button id='zoomInBtn' title='Zoom in'>+</button></span></p><div id='floorViewport'><div id='floorWrap'><img id='floorImage' src='${src}' draggable='false'></div></div>`;
     floorplanArea.setAttribute('data-floorplan-id', fp.id);
 
     const img = document.getElementById('floorImage');
     img.addEventListener('click', onImageClick);
+    setupFloorView(fp);
 
     await placeExistingMarkers(fp.id);
     // ensure markers refresh their icons in case the icon set changed recently
     try{ refreshAllMarkerIcons(); }catch(e){}
   }
 
+  // --- floorplan zoom and tiles ---
+  // Markers are positioned in % of #floorWrap, so zooming only changes the wrap's width.
+  const ZOOM_STEPS = [1, 1.5, 2, 3, 4, 6, 8, 12, 16];
+  let floorView = null;
+
+  function setupFloorView(fp){
+    const viewport = document.getElementById('floorViewport');
+    const wrap = document.getElementById('floorWrap');
+    const img = document.getElementById('floorImage');
+    const view = floorView = {fp, viewport, wrap, img, zoom: 1, baseWidth: 0, layer: null, tiles: new Map(), wanted: new Set(), frame: null};
+    if(fp.tiles){
+      view.layer = document.createElement('div');
+      view.layer.className = 'tileLayer';
+      img.after(view.layer);
+    }
+    const fit = ()=>{
+      if(floorView !== view) return;
+      const natural = fp.width || img.naturalWidth || viewport.clientWidth;
+      view.baseWidth = Math.min(natural, viewport.clientWidth) || viewport.clientWidth;
+      applyZoom(view.zoom);
+    };
+    if(img.complete && img.naturalWidth) fit(); else img.addEventListener('load', fit, {once: true});
+    view.fit = fit;
+    viewport.addEventListener('scroll', scheduleTiles);
+    viewport.addEventListener('wheel', (ev)=>{
+      if(!ev.ctrlKey) return;
+      ev.preventDefault();
+      stepZoom(ev.deltaY < 0 ? 1 : -1, {x: ev.clientX, y: ev.clientY});
+    }, {passive: false});
+    document.getElementById('zoomInBtn').addEventListener('click', ()=>stepZoom(1));
+    document.getElementById('zoomOutBtn').addEventListener('click', ()=>stepZoom(-1));
+    document.getElementById('zoomResetBtn').addEventListener('click', ()=>applyZoom(1));
+  }
+
+  window.addEventListener('resize', ()=>{ if(floorView) floorView.fit(); });
+
+  function stepZoom(dir, anchor){
+    if(!floorView) return;
+    const z = floorView.zoom;
+    const next = dir > 0 ? ZOOM_STEPS.find(s=>s > z) : [...ZOOM_STEPS].reverse().find(s=>s < z);
+    if(next) applyZoom(next, anchor);
+  }
+
+  // keep the plan point under `anchor` (client coords, default: viewport centre) in place
+  function applyZoom(zoom, anchor){
+    const v = floorView;
+    if(!v || !v.baseWidth) return;
+    const rect = v.viewport.getBoundingClientRect();
+    const ax = anchor ? anchor.x - rect.left : v.viewport.clientWidth / 2;
+    const ay = anchor ? anchor.y - rect.top : v.viewport.clientHeight / 2;
+    const nx = (v.viewport.scrollLeft + ax) / (v.wrap.offsetWidth || 1);
+    const ny = (v.viewport.scrollTop + ay) / (v.wrap.offsetHeight || 1);
+    v.zoom = zoom;
+    v.wrap.style.width = Math.round(v.baseWidth * zoom) + 'px';
+    v.viewport.scrollLeft = nx * v.wrap.offsetWidth - ax;
+    v.viewport.scrollTop = ny * v.wrap.offsetHeight - ay;
+    const label = document.getElementById('zoomResetBtn');
+    if(label) label.innerText = Math.round(zoom * 100) + '%';
+    scheduleTiles();
+  }
+
+  function scheduleTiles(){
+    const v = floorView;
+    if(!v || !v.layer || v.frame) return;
+    v.frame = requestAnimationFrame(()=>{ v.frame = null; if(floorView === v) updateTiles(v); });
+  }
+
+  function updateTiles(v){
+    const {fp, wrap, viewport, layer} = v;
+    const t = fp.tiles;
+    const shownW = wrap.offsetWidth * (window.devicePixelRatio || 1);
+    if(!shownW) return;
+    // the lowest level that is still at least as wide as the plan on screen
+    let z = t.maxZoom;
+    while(z > 0 && Math.ceil(fp.width / 2 ** (t.maxZoom - z + 1)) >= shownW) z--;
+    const scale = 2 ** (t.maxZoom - z);
+    const lw = Math.ceil(fp.width / scale), lh = Math.ceil(fp.height / scale);
+    const cols = Math.ceil(lw / t.tileSize), rows = Math.ceil(lh / t.tileSize);
+    // visible part of the plan, in level pixels
+    const x0 = viewport.scrollLeft / wrap.offsetWidth * lw, x1 = (viewport.scrollLeft + viewport.clientWidth) / wrap.offsetWidth * lw;
+    const y0 = viewport.scrollTop / wrap.offsetHeight * lh, y1 = (viewport.scrollTop + viewport.clientHeight) / wrap.offsetHeight * lh;
+    const tx0 = Math.max(0, Math.floor(x0 / t.tileSize)), tx1 = Math.min(cols - 1, Math.floor(x1 / t.tileSize));
+    const ty0 = Math.max(0, Math.floor(y0 / t.tileSize)), ty1 = Math.min(rows - 1, Math.floor(y1 / t.tileSize));
+    const wanted = new Set();
+    for(let ty = ty0; ty <= ty1; ty++){
+      for(let tx = tx0; tx <= tx1; tx++){
+        const key = `${z}/${tx}/${ty}`;
+        wanted.add(key);
+        if(v.tiles.has(key)) continue;
+        const px = tx * t.tileSize, py = ty * t.tileSize;
+        const el = document.createElement('img');
+        el.alt = '';
+        el.draggable = false;
+        el.style.left = (px / lw * 100) + '%';
+        el.style.top = (py / lh * 100) + '%';
+        el.style.width = (Math.min(t.tileSize, lw - px) / lw * 100) + '%';
+        el.style.height = (Math.min(t.tileSize, lh - py) / lh * 100) + '%';
+        el.onload = el.onerror = ()=>pruneTiles(v);
+        el.src = t.url.replace('{z}', z).replace('{x}', tx).replace('{y}', ty);
+        layer.appendChild(el);
+        v.tiles.set(key, el);
+      }
+    }
+    v.wanted = wanted;
+    pruneTiles(v);
+  }
+
+  // drop tiles that are off-screen or from another level once the wanted ones have arrived,
+  // so zooming never flashes back to the blurry preview
+  function pruneTiles(v){
+    for(const key of v.wanted){ if(!v.tiles.get(key).complete) return; }
+    for(const [key, el] of v.tiles){
+      if(!v.wanted.has(key)){ el.remove(); v.tiles.delete(key); }
+    }
+  }
+
   async function placeExistingMarkers(fpId){
-    const devicesRes = await fetch('/api/devices');
-    const devices = await devicesRes.json();
-    const fpDevices = devices.filter(d=>d.floorplan_id==fpId);
+    const fpDevices = await fetchRows('/api/devices?floorplan_id=' + encodeURIComponent(fpId));
+    await assetManifest;
     const wrap = document.getElementById('floorWrap');
     wrap.querySelectorAll('.marker')?.forEach(n=>n.remove());
+    selectedIds.clear(); renderSelection();
     fpDevices.forEach(d=>{ const m = createMarkerElement(d); wrap.appendChild(m); });
+    watchMarkerStatus(fpId);
+  }
+
+  // Live reachability: /api/status/stream sends last-known status for the floorplan as a
+  // 'snapshot', then a 'status' event whenever a device goes up or down. The server probes
+  // each floorplan once per interval however many editors have it open. EventSource
+  // reconnects by itself (the server ends streams after a few minutes) and gets a new snapshot.
+  let statusStream = null;
+  function watchMarkerStatus(fpId){
+    if(statusStream) statusStream.close();
+    statusStream = null;
+    if(!window.EventSource) return loadMarkerStatus(fpId);
+    statusStream = new EventSource('/api/status/stream?floorplan_id=' + encodeURIComponent(fpId));
+    statusStream.addEventListener('snapshot', ev=>{
+      JSON.parse(ev.data).forEach(s=>setMarkerStatus(s.device_id, s.up, s.checked));
+    });
+    statusStream.addEventListener('status', ev=>{
+      const s = JSON.parse(ev.data);
+      setMarkerStatus(s.device_id, s.up, s.checked);
+    });
+    const stream = statusStream;
+    stream.onerror = ()=>{
+      // a 503 (the server's stream slots are taken) closes the stream for good:
+      // show last-known status and try again later
+      if(stream.readyState !== EventSource.CLOSED) return;
+      loadMarkerStatus(fpId);
+      setTimeout(()=>{ if(statusStream === stream) watchMarkerStatus(fpId); }, 30000);
+    };
+  }
+
+  // Color markers by last-known reachability recorded by the background poller.
+  async function loadMarkerStatus(fpId){
+    try{
+      const res = await fetch('/api/status?floorplan_id=' + encodeURIComponent(fpId));
+      if(!res.ok) return;
+      const statuses = await res.json();
+      statuses.forEach(s=>setMarkerStatus(s.device_id, s.up, s.checked));
+    }catch(e){ console.warn('status load failed', e); }
+  }
+
+  function setMarkerStatus(id, up, checked){
+    const m = document.querySelector(`.marker[data-id='${id}']`);
+    if(!m) return;
+    m.classList.toggle('status-up', !!up);
+    m.classList.toggle('status-down', !up);
+    if(checked) m.setAttribute('data-checked', checked);
   }
 
-  function getIconPath(type, ext='svg'){ return `/icons/${(type||'device')}.${ext}`; }
-  function getIconVersion(){ return localStorage.getItem('iconVersion') || '' }
-  function bumpIconVersion(){ const v = String(Date.now()); try{ localStorage.setItem('iconVersion', v); }catch(e){} return v }
+  // Icon URLs carry ?v=<content version> from the server's asset manifest: the browser
+  // caches them for good and the URL changes exactly when the file does.
+  let assetVersions = null;  // 'icons/<file>' -> version; null until the manifest has loaded
+  let assetManifest = Promise.resolve();
+
+  function loadAssetManifest(){
+    const params = new URLSearchParams();
+    Object.values(getTypeIconMap()).forEach((name)=>{
+      const base = safeIconBasename(name);
+      if(base) params.append('path', 'icons/standard/' + base);
+    });
+    assetManifest = fetch('/api/assets/manifest?' + params, REVALIDATE)
+      .then(res=>res.ok ? res.json() : null)
+      .then(j=>{ if(j) assetVersions = j.files || {}; })
+      .catch(e=>console.warn('asset manifest load failed', e));
+    return assetManifest;
+  }
+
+  function iconUrl(rel){
+    const v = assetVersions && assetVersions['icons/' + rel];
+    return '/icons/' + rel.split('/').map(encodeURIComponent).join('/') + (v ? '?v=' + v : '');
+  }
+
+  // tell other tabs (icon picker, other editors) to reload the manifest
+  function notifyIconsChanged(){ try{ localStorage.setItem('iconVersion', String(Date.now())); }catch(e){} }
 
   function slugifyType(raw){
     return String(raw || '')
@@ -341,18 +611,19 @@ document.addEventListener('DOMContentLoaded', ()=>{
   function setMarkerIcon(marker, type){
     const img = document.createElement('img');
     img.alt = type || 'device';
-    // Append cache-bust query param so browsers re-fetch when icons change.
-    const ver = getIconVersion() || String(Date.now());
     const candidates = getIconCandidates(type);
     const mappedIcon = getMappedIconFilename(type);
     const sources = [];
 
     if(mappedIcon){
-      sources.push('/icons/standard/' + encodeURIComponent(mappedIcon) + '?t=' + encodeURIComponent(ver));
+      sources.push(iconUrl('standard/' + mappedIcon));
     }
     candidates.forEach((t)=>{
-      sources.push(getIconPath(t, 'svg') + '?t=' + encodeURIComponent(ver));
-      sources.push(getIconPath(t, 'png') + '?t=' + encodeURIComponent(ver));
+      ['svg', 'png'].forEach((ext)=>{
+        // once the manifest is in, skip files the server doesn't have instead of waiting for 404s
+        const rel = `${t}.${ext}`;
+        if(!assetVersions || assetVersions['icons/' + rel]) sources.push(iconUrl(rel));
+      });
     });
 
     let idx = 0;
@@ -361,7 +632,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
       if(idx >= sources.length) return;
       img.src = sources[idx];
     };
-    img.src = sources[0] || (getIconPath('device', 'svg') + '?t=' + encodeURIComponent(ver));
+    img.src = sources[0] || iconUrl('device.svg');
 
     marker.innerHTML = '';
     marker.appendChild(img);
@@ -379,7 +650,9 @@ document.addEventListener('DOMContentLoaded', ()=>{
   // listen for storage events (e.g., icon/type updates from icon picker in other tab)
   window.addEventListener('storage', (e)=>{
     if(e.key === 'iconVersion' || e.key === TYPE_ICON_MAP_KEY){
-      try{ refreshAllMarkerIcons(); }catch(err){console.warn('refreshAllMarkerIcons failed', err); }
+      loadAssetManifest().then(()=>{
+        try{ refreshAllMarkerIcons(); }catch(err){console.warn('refreshAllMarkerIcons failed', err); }
+      });
     }
     if(e.key === DEVICE_TYPES_KEY){
       deviceTypes = loadDeviceTypes();
@@ -408,23 +681,44 @@ document.addEventListener('DOMContentLoaded', ()=>{
       marker.setPointerCapture(ev.pointerId);
       dragging = true; pointerId = ev.pointerId;
       marker.classList.add('dragging');
+      // start from where the marker is now (undo/redo and group moves reposition it)
+      lastPos = markerPos(marker);
+      // dragging a selected marker moves the whole selection by the same offset
+      const group = selectedIds.has(marker.getAttribute('data-id')) && selectedIds.size > 1
+        ? selectedMarkers().map(m=>({m, start: markerPos(m)})) : null;
+      const grabbed = pointerToFloor(ev);
       window.addEventListener('pointermove', onPointerMove);
       window.addEventListener('pointerup', onPointerUp, {once:true});
 
       function onPointerMove(e){
         if(!dragging || e.pointerId!==pointerId) return;
-        const img = document.getElementById('floorImage');
-        const rect = img.getBoundingClientRect();
-        let x = (e.clientX - rect.left) / rect.width;
-        let y = (e.clientY - rect.top) / rect.height;
-        x = Math.max(0, Math.min(1, x));
-        y = Math.max(0, Math.min(1, y));
+        const {x, y} = pointerToFloor(e);
+        if(group){ moveGroup(group, x - grabbed.x, y - grabbed.y); return; }
         marker.style.left = (x*100)+'%'; marker.style.top = (y*100)+'%';
       }
 
       async function onPointerUp(e){
         if(e.pointerId!==pointerId) return;
         dragging = false; marker.classList.remove('dragging');
+        if(group){
+          window.removeEventListener('pointermove', onPointerMove);
+          const {x, y} = pointerToFloor(e);
+          moveGroup(group, x - grabbed.x, y - grabbed.y);
+          const items = group.map(({m, start})=>({id: m.getAttribute('data-id'), prev: start, next: markerPos(m)}))
+            .filter(it=>it.prev.x !== it.next.x || it.prev.y !== it.next.y);
+          if(!items.length) return;
+          // only a move the server saved goes on the undo stack; otherwise the markers go back
+          let saved = null;
+          try{ saved = await sendBulkPatch(items.map(it=>({id: Number(it.id), ...it.next}))); }
+          catch(err){ console.warn('save failed', err); }
+          if(saved){
+            pushHistory({type:'bulk', label:'Move', items, ts: Date.now()});
+          }else{
+            items.forEach(it=>applyMarkerFields(it.id, it.prev));
+            showToast('Save failed','error');
+          }
+          return;
+        }
         const img = document.getElementById('floorImage');
         const rect = img.getBoundingClientRect();
         let x = (e.clientX - rect.left) / rect.width;
@@ -446,9 +740,10 @@ document.addEventListener('DOMContentLoaded', ()=>{
       }
     });
 
-    // single click opens properties panel
+    // single click opens properties panel; shift/ctrl/cmd-click toggles selection
     marker.addEventListener('click', (ev)=>{
       ev.preventDefault();
+      if(ev.shiftKey || ev.ctrlKey || ev.metaKey){ toggleSelected(marker.getAttribute('data-id')); return; }
       openPropsPanel(marker.getAttribute('data-id'));
     });
 
@@ -469,6 +764,71 @@ document.addEventListener('DOMContentLoaded', ()=>{
     return marker;
   }
 
+  function markerPos(m){
+    return {x: (parseFloat(m.style.left)||0)/100, y: (parseFloat(m.style.top)||0)/100};
+  }
+
+  function pointerToFloor(e){
+    const rect = document.getElementById('floorImage').getBoundingClientRect();
+    return {
+      x: Math.max(0, Math.min(1, (e.clientX - rect.left) / rect.width)),
+      y: Math.max(0, Math.min(1, (e.clientY - rect.top) / rect.height)),
+    };
+  }
+
+  function moveGroup(group, dx, dy){
+    group.forEach(({m, start})=>{
+      m.style.left = (Math.max(0, Math.min(1, start.x + dx))*100)+'%';
+      m.style.top = (Math.max(0, Math.min(1, start.y + dy))*100)+'%';
+    });
+  }
+
+  // --- multi-select ---
+  const selectionBar = document.getElementById('selectionBar');
+  const selectionCount = document.getElementById('selectionCount');
+  const bulkTypeSelect = document.getElementById('bulkTypeSelect');
+
+  function selectedMarkers(){
+    return [...selectedIds].map(id=>document.querySelector(`.marker[data-id='${id}']`)).filter(Boolean);
+  }
+
+  function renderSelection(){
+    document.querySelectorAll('.marker').forEach(m=>m.classList.toggle('selected', selectedIds.has(m.getAttribute('data-id'))));
+    if(selectionCount) selectionCount.textContent = selectedIds.size;
+    selectionBar?.classList.toggle('hidden', selectedIds.size === 0);
+  }
+
+  function toggleSelected(id){
+    id = String(id);
+    if(selectedIds.has(id)) selectedIds.delete(id); else selectedIds.add(id);
+    renderSelection();
+  }
+
+  function clearSelection(){ selectedIds.clear(); renderSelection(); }
+
+  document.getElementById('clearSelectionBtn')?.addEventListener('click', (e)=>{ e.preventDefault(); clearSelection(); });
+
+  document.getElementById('bulkRetypeBtn')?.addEventListener('click', async (e)=>{
+    e.preventDefault();
+    if(!selectedIds.size) return;
+    const t = ensureTypeExists(bulkTypeSelect.value);
+    const j = await sendBulkPatch([...selectedIds].map(id=>({id: Number(id), device_type: t})));
+    if(!j) return showToast('Retype failed','error');
+    const items = j.prev.map(p=>({id: String(p.id), prev: {device_type: p.device_type}, next: {device_type: t}}));
+    items.forEach(it=>applyMarkerFields(it.id, it.next));
+    pushHistory({type:'bulk', label:'Retype', items, ts: Date.now()});
+    showToast(`Set ${items.length} devices to ${titleFromType(t)}`,'success');
+  });
+
+  document.getElementById('bulkDeleteBtn')?.addEventListener('click', async (e)=>{
+    e.preventDefault();
+    if(!selectedIds.size || !confirm(`Delete ${selectedIds.size} devices?`)) return;
+    const snapshots = await bulkDelete([...selectedIds]);
+    if(!snapshots) return showToast('Delete failed','error');
+    pushHistory({type:'bulk-delete', snapshots, ts: Date.now()});
+    showToast(`Deleted ${snapshots.length} devices`,'success');
+  });
+
   // image click used for placement: open creation modal with coords
   let pendingPlace = false;
   const newDeviceBtn = document.getElementById('newDeviceBtn');
@@ -486,7 +846,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
     // building id helper
     const buildingName = uploadForm.elements['building'].value;
     let buildingId = null;
-    try{ const res = await fetch('/api/buildings'); const bs = await res.json(); const b = bs.find(b=>b.name===buildingName); buildingId = b?.id || null;}catch(e){console.warn('failed to resolve building id', e)}
+    try{ const bs = await fetchRows('/api/buildings'); const b = bs.find(b=>b.name===buildingName); buildingId = b?.id || null;}catch(e){console.warn('failed to resolve building id', e)}
 
     // open modal for new device (if pendingPlace or click-to-place after image click)
     openCreateModal({x, y, fpId, buildingId});
@@ -502,6 +862,10 @@ document.addEventListener('DOMContentLoaded', ()=>{
   const deviceIP = document.getElementById('deviceIP');
   const deviceMAC = document.getElementById('deviceMAC');
   const deviceRoom = document.getElementById('deviceRoom');
+  const deviceCheckType = document.getElementById('deviceCheckType');
+  const deviceCheckPort = document.getElementById('deviceCheckPort');
+  const deviceCheckPath = document.getElementById('deviceCheckPath');
+  const deviceCheckStatus = document.getElementById('deviceCheckStatus');
   const deviceNote = document.getElementById('deviceNote');
   const deviceX = document.getElementById('deviceX');
   const deviceY = document.getElementById('deviceY');
@@ -561,6 +925,18 @@ document.addEventListener('DOMContentLoaded', ()=>{
       });
     }
 
+    if(bulkTypeSelect){
+      const keep = bulkTypeSelect.value;
+      bulkTypeSelect.innerHTML = '';
+      deviceTypes.forEach((t)=>{
+        const opt = document.createElement('option');
+        opt.value = t;
+        opt.textContent = titleFromType(t);
+        bulkTypeSelect.appendChild(opt);
+      });
+      bulkTypeSelect.value = deviceTypes.includes(keep) ? keep : active;
+    }
+
     if(removeDeviceTypeSelect){
       removeDeviceTypeSelect.innerHTML = '';
       deviceTypes.forEach((t)=>{
@@ -607,7 +983,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
     if(iconMap[t]){
       delete iconMap[t];
       localStorage.setItem(TYPE_ICON_MAP_KEY, JSON.stringify(iconMap));
-      bumpIconVersion();
+      notifyIconsChanged();
     }
 
     renderDeviceTypeControls();
@@ -626,6 +1002,11 @@ document.addEventListener('DOMContentLoaded', ()=>{
     deviceMAC.value = existing?.mac || '';
     deviceRoom.value = existing?.room || existing?.note || '';
     deviceNote.value = existing?.note || '';
+    deviceCheckType.value = existing?.check_type || '';
+    deviceCheckPort.value = existing?.check_port ?? '';
+    deviceCheckPath.value = existing?.check_path || '';
+    deviceCheckStatus.value = existing?.check_status ?? '';
+    updateCheckFields();
     deviceX.value = (x||existing?.x||0);
     deviceY.value = (y||existing?.y||0);
     deviceFP.value = fpId || existing?.floorplan_id || '';
@@ -633,7 +1014,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
     deviceName.focus();
   }
 
-  function closeModal(){ deviceModal.classList.add('hidden'); deviceId.value=''; deviceName.value=''; deviceIP.value=''; deviceMAC.value=''; deviceRoom.value=''; deviceNote.value=''; }
+  function closeModal(){ deviceModal.classList.add('hidden'); deviceId.value=''; deviceName.value=''; deviceIP.value=''; deviceMAC.value=''; deviceRoom.value=''; deviceNote.value=''; deviceCheckType.value=''; }
 
   deviceCancel.addEventListener('click', (e)=>{ e.preventDefault(); closeModal(); });
 
@@ -644,7 +1025,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
 
   // validation helpers
   function clearErrors(){
-    ['deviceName','deviceType','deviceIP','deviceMAC','deviceRoom','deviceNote'].forEach(id=>{ const el = document.getElementById(id); el && el.classList.remove('invalid-field'); const err = document.getElementById(id+'Error'); if(err) err.textContent = ''; });
+    ['deviceName','deviceType','deviceIP','deviceMAC','deviceRoom','deviceNote','deviceCheckType'].forEach(id=>{ const el = document.getElementById(id); el && el.classList.remove('invalid-field'); const err = document.getElementById(id+'Error'); if(err) err.textContent = ''; });
     // reset save result
     deviceSaveResult.className = 'hidden'; deviceSaveResult.textContent = '';
   }
@@ -656,6 +1037,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
     }
     if(e.key === 'Escape'){
       if(pendingPlace){ pendingPlace = false; newDeviceBtn.innerText = 'New Device'; showToast('Placement cancelled','error'); }
+      else if(selectedIds.size) clearSelection();
     }
   });
   function setFieldError(el, msg){ if(!el) return; el.classList.add('invalid-field'); const err = document.getElementById(el.id + 'Error'); if(err) err.textContent = msg; }
@@ -675,9 +1057,34 @@ document.addEventListener('DOMContentLoaded', ()=>{
     if(deviceIP.value.trim() && !isValidIP(deviceIP.value.trim())){ setFieldError(deviceIP, 'Invalid IP address'); ok = false; }
     if(deviceMAC.value.trim() && !isValidMAC(deviceMAC.value.trim())){ setFieldError(deviceMAC, 'Invalid MAC format'); ok = false; }
     if(deviceRoom.value.trim().length > 32){ setFieldError(deviceRoom, 'Room exceeds 32 characters'); ok = false; }
+    const checkError = validateCheck();
+    if(checkError){ setFieldError(deviceCheckType, checkError); ok = false; }
     return ok;
   }
 
+  // service checks (TCP connect, HTTP(S) status) instead of ping; same rules as backend/servicecheck.py
+  function validateCheck(){
+    const kind = deviceCheckType.value;
+    if(!kind) return null;
+    const port = deviceCheckPort.value.trim();
+    if(kind === 'tcp' && !port) return 'TCP checks need a port';
+    if(port && !(Number.isInteger(+port) && +port > 0 && +port < 65536)) return 'Port must be 1-65535';
+    if(kind === 'tcp') return null;
+    const path = deviceCheckPath.value.trim();
+    if(path && (!path.startsWith('/') || /\s/.test(path))) return 'Path must start with / and contain no spaces';
+    const status = deviceCheckStatus.value.trim();
+    if(status && !(Number.isInteger(+status) && +status >= 100 && +status < 600)) return 'Status must be 100-599';
+    return null;
+  }
+
+  function updateCheckFields(){
+    const kind = deviceCheckType.value;
+    deviceCheckPort.classList.toggle('hidden', !kind);
+    deviceCheckPath.classList.toggle('hidden', !kind || kind === 'tcp');
+    deviceCheckStatus.classList.toggle('hidden', !kind || kind === 'tcp');
+  }
+  deviceCheckType.addEventListener('change', updateCheckFields);
+
   // live validation for IP/MAC and room count
   const deviceIPIcon = document.getElementById('deviceIPIcon');
   const deviceIPIconInvalid = document.getElementById('deviceIPIconInvalid');
@@ -720,7 +1127,11 @@ document.addEventListener('DOMContentLoaded', ()=>{
       y: parseFloat(deviceY.value),
       floorplan_id: deviceFP.value || null,
       mac: deviceMAC.value.trim() || null,
-      room: deviceRoom.value.trim() || null
+      room: deviceRoom.value.trim() || null,
+      check_type: deviceCheckType.value || null,
+      check_port: deviceCheckType.value && deviceCheckPort.value.trim() ? parseInt(deviceCheckPort.value, 10) : null,
+      check_path: ['http', 'https'].includes(deviceCheckType.value) ? (deviceCheckPath.value.trim() || null) : null,
+      check_status: ['http', 'https'].includes(deviceCheckType.value) && deviceCheckStatus.value.trim() ? parseInt(deviceCheckStatus.value, 10) : null
     };
     try{
       // UI: disable save, show spinner
@@ -763,7 +1174,7 @@ document.addEventListener('DOMContentLoaded', ()=>{
   const propEdit = document.getElementById('propEdit');
   propEdit?.addEventListener('click', async ()=>{
     if(!currentEditingId) return;
-    const res = await fetch('/api/devices'); const devices = await res.json(); const d = devices.find(x=>String(x.id)===String(currentEditingId));
+    const res = await fetch('/api/devices/' + encodeURIComponent(currentEditingId)); const d = res.ok ? await res.json() : null;
     if(d){ openCreateModal({existing: d}); propsPanel.classList.add('hidden'); try{ document.querySelector(`.marker[data-id='${currentEditingId}']`)?.setAttribute('data-type', d.device_type || 'device'); }catch(e){} }
   });
 
@@ -785,15 +1196,14 @@ document.addEventListener('DOMContentLoaded', ()=>{
 
   // add a small 'Refresh Icons' control to force icon reloads (helps when browser cache persists)
   const refreshIconsBtn = document.createElement('button'); refreshIconsBtn.id = 'refreshIconsBtn'; refreshIconsBtn.style.marginLeft = '8px'; refreshIconsBtn.innerText = 'Refresh Icons';
-  refreshIconsBtn.addEventListener('click', () => { const ver = bumpIconVersion(); try{ refreshAllMarkerIcons(); showToast('Icons refreshed', 'success'); }catch(e){console.warn(e); showToast('Refresh failed','error'); } });
+  refreshIconsBtn.addEventListener('click', async () => { await loadAssetManifest(); try{ refreshAllMarkerIcons(); showToast('Icons refreshed', 'success'); }catch(e){console.warn(e); showToast('Refresh failed','error'); } });
   refreshBtn.parentNode && refreshBtn.parentNode.insertBefore(refreshIconsBtn, refreshBtn.nextSibling);
 
   // properties panel actions
   async function openPropsPanel(id){
     currentEditingId = id;
-    const res = await fetch('/api/devices');
-    const devices = await res.json();
-    const d = devices.find(x=>String(x.id)===String(id));
+    const res = await fetch('/api/devices/' + encodeURIComponent(id));
+    const d = res.ok ? await res.json() : null;
     if(!d) return alert('device not found');
     ensureTypeExists(d.device_type || 'device');
     propName.value = d.name || '';
@@ -839,5 +1249,6 @@ document.addEventListener('DOMContentLoaded', ()=>{
 
   // initial load
   renderHistory();
+  loadAssetManifest();
   loadFloorplans();
 });
@@ -1,39 +1,167 @@
-async function loadDevices(){
+const PAGE_SIZE = 500;
+let nextAfterId = null;
+let buildingMap = {};
+
+function deviceQuery(afterId){
+  const params = new URLSearchParams({limit: PAGE_SIZE});
+  const text = document.getElementById('filterText').value.trim();
+  const type = document.getElementById('filterType').value.trim();
+  const ip = document.getElementById('filterIP').value.trim();
+  if(text) params.set('q', text);
+  if(type) params.set('device_type', type);
+  if(ip) params.set('ip', ip);
+  if(afterId) params.set('after_id', afterId);
+  return '/api/devices?' + params.toString();
+}
+
+// Loads one page of filtered devices; `append` continues from the last keyset cursor.
+async function loadDevices(append){
+  append = append === true;
   const t = document.querySelector('#devices tbody');
-  t.innerHTML = '<tr><td colspan="6">Loading...</td></tr>';
-  const res = await fetch('/api/devices');
+  const more = document.getElementById('loadMore');
+  if(!append){
+    t.innerHTML = '<tr><td colspan="7">Loading...</td></tr>';
+    const bRes = await fetch('/api/buildings', {cache: 'no-cache'});
+    const bs = await bRes.json();
+    buildingMap = Object.fromEntries(bs.map(b=>[b.id,b]));
+  }
+  // revalidate with If-None-Match; unchanged lists come back as 304 from the browser cache
+  const res = await fetch(deviceQuery(append ? nextAfterId : null), {cache: 'no-cache'});
   const ds = await res.json();
-  if(!ds.length){ t.innerHTML = '<tr><td colspan="6">No devices</td></tr>'; return }
-  const bRes = await fetch('/api/buildings');
-  const bs = await bRes.json();
-  const bMap = Object.fromEntries(bs.map(b=>[b.id,b]));
-  t.innerHTML = '';
+  nextAfterId = res.headers.get('X-Next-After-Id');
+  more.classList.toggle('hidden', !nextAfterId);
+  if(!append){
+    if(!ds.length){ t.innerHTML = '<tr><td colspan="7">No devices</td></tr>'; return }
+    t.innerHTML = '';
+  }
+  const rows = [];
   ds.forEach(d=>{
     const tr = document.createElement('tr');
-    tr.innerHTML = `<td>${d.id}</td><td>${d.name}</td><td>${d.ip || ''}</td><td>${d.device_type}</td><td>${bMap[d.building_id]?.name || ''}</td><td><button data-id='${d.id}' data-ip='${d.ip}'>Ping</button></td>`;
+    tr.innerHTML = `<td>${d.id}</td><td>${d.name}</td><td>${d.ip || ''}</td><td>${d.device_type}</td><td>${buildingMap[d.building_id]?.name || ''}</td><td class='status' data-status-id='${d.id}'></td><td><button data-id='${d.id}' data-ip='${d.ip}'>Ping</button></td>`;
     t.appendChild(tr);
+    rows.push(tr);
   });
-  document.querySelectorAll('button[data-id]').forEach(btn=>btn.addEventListener('click', async e=>{
-    const ip = btn.getAttribute('data-ip');
+  rows.map(tr=>tr.querySelector('button[data-id]')).forEach(btn=>btn.addEventListener('click', async e=>{
     btn.disabled = true;
     btn.innerText = 'Pinging...';
-    try{
-      const r = await fetch('/api/ping?ip='+encodeURIComponent(ip));
-      const j = await r.json();
-      alert('Ping result: ' + JSON.stringify(j));
-    }catch(err){ alert('Ping failed: ' + err) }
+    try{ await sweep([parseInt(btn.getAttribute('data-id'))]); }
+    catch(err){ alert('Ping failed: ' + err) }
     btn.disabled = false;
     btn.innerText = 'Ping';
-  }))
+  }));
+  await loadStatus(ds.map(d=>d.id));
+}
+
+// Last-known status comes from the poller's history table; no probes are sent on page load.
+// Only the page just loaded is asked for, so each page costs the same however large the inventory.
+async function loadStatus(ids){
+  if(!ids.length) return;
+  try{
+    const r = await fetch('/api/status?ids=' + ids.join(','));
+    const ss = await r.json();
+    ss.forEach(s=>renderStatus({id: s.device_id, success: s.up, time: s.rtt_ms, error: s.error, checked: s.checked}));
+  }catch(err){ console.warn('status load failed', err); }
+}
+
+function renderStatus(r){
+  const cell = document.querySelector(`td[data-status-id='${r.id}']`);
+  if(!cell) return;
+  if(r.success){ cell.textContent = 'up' + (r.time != null ? ` (${r.time} ms)` : ''); cell.className = 'status status-up'; }
+  else{ cell.textContent = r.error === 'invalid-target' ? 'no ip' : (r.error || 'down'); cell.className = 'status status-down'; }
+  cell.title = r.checked ? 'checked ' + new Date(r.checked).toLocaleString() : 'checked just now';
+}
+
+// Sweep devices in one request; the server streams one JSON line per device as it completes.
+async function sweep(ids, onProgress){
+  const r = await fetch('/api/ping/sweep', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({device_ids: ids})});
+  if(!r.ok) throw new Error(JSON.stringify(await r.json()));
+  const reader = r.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  let seen = 0;
+  let summary = null;
+  for(;;){
+    const {value, done} = await reader.read();
+    if(done) break;
+    buf += decoder.decode(value, {stream: true});
+    let nl;
+    while((nl = buf.indexOf('\n')) >= 0){
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if(!line) continue;
+      const msg = JSON.parse(line);
+      if(msg.done){ summary = msg; continue; }
+      renderStatus(msg);
+      seen += 1;
+      if(onProgress) onProgress(seen);
+    }
+  }
+  return summary;
+}
+
+async function pingAll(){
+  const btn = document.getElementById('pingAll');
+  const summary = document.getElementById('sweepSummary');
+  const ids = Array.from(document.querySelectorAll('td[data-status-id]')).map(td=>parseInt(td.getAttribute('data-status-id')));
+  if(!ids.length) return;
+  btn.disabled = true;
+  summary.textContent = `Pinging ${ids.length} devices...`;
+  try{
+    const res = await sweep(ids, seen=>{ summary.textContent = `Pinging... ${seen}/${ids.length}`; });
+    if(res) summary.textContent = `${res.up} up / ${res.down} down`;
+  }catch(err){ summary.textContent = 'Sweep failed: ' + err; }
+  btn.disabled = false;
+}
+
+document.getElementById('refresh').addEventListener('click', ()=>loadDevices());
+document.getElementById('loadMore').addEventListener('click', ()=>loadDevices(true));
+document.getElementById('filterForm').addEventListener('submit', ev=>{ ev.preventDefault(); loadDevices(); });
+document.getElementById('pingAll').addEventListener('click', pingAll);
+function importSummary(j){
+  let msg = `${j.rowsProcessed} rows: ${j.created} created`;
+  if(j.mode === 'upsert') msg += `, ${j.updated} updated, ${j.unchanged} unchanged`;
+  if(j.errorCount) msg += `, ${j.errorCount} skipped`;
+  return msg;
+}
+
+// poll a background import job until it finishes, updating the progress bar
+async function watchImport(jobId){
+  const bar = document.getElementById('importProgress');
+  const status = document.getElementById('importStatus');
+  bar.classList.remove('hidden');
+  while(true){
+    const r = await fetch(`/api/jobs/${jobId}`);
+    const j = await r.json();
+    if(!r.ok){ status.textContent = 'Import failed: ' + JSON.stringify(j); break; }
+    if(j.totalBytes) bar.value = j.bytesProcessed / j.totalBytes;
+    if(j.status === 'failed'){ status.textContent = 'Import failed: ' + j.error; break; }
+    if(j.status === 'done'){
+      bar.value = 1;
+      status.textContent = 'Imported ' + importSummary(j);
+      if(j.errorCount) alert(j.errorCount + ' rows skipped:\n' + j.errors.slice(0, 10).map(e=>`line ${e.line}: ${e.error}`).join('\n'));
+      loadDevices();
+      break;
+    }
+    let msg = j.status === 'queued' ? 'Queued...' : 'Importing... ' + importSummary(j);
+    if(j.rowsPerSecond) msg += ` (${Math.round(j.rowsPerSecond)} rows/s`;
+    if(j.rowsPerSecond) msg += j.etaSeconds != null ? `, ~${Math.ceil(j.etaSeconds)}s left)` : ')';
+    status.textContent = msg;
+    await new Promise(res=>setTimeout(res, 500));
+  }
+  bar.classList.add('hidden');
 }
 
-document.getElementById('refresh').addEventListener('click', loadDevices);
 document.getElementById('importForm').addEventListener('submit', async ev=>{
   ev.preventDefault();
-  const fd = new FormData(document.getElementById('importForm'));
+  const form = document.getElementById('importForm');
+  const fd = new FormData(form);
+  const status = document.getElementById('importStatus');
+  status.textContent = 'Uploading...';
   const r = await fetch('/api/devices/import', {method:'POST', body: fd});
   const j = await r.json();
-  if(r.ok){ alert('Imported ' + j.created + ' devices'); loadDevices(); } else { alert('Import failed: ' + JSON.stringify(j)); }
+  if(!r.ok){ status.textContent = ''; alert('Import failed: ' + JSON.stringify(j)); return; }
+  form.reset();
+  watchImport(j.jobId);
 });
 
 loadDevices();
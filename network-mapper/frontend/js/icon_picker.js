@@ -15,6 +15,20 @@ document.addEventListener('DOMContentLoaded', async ()=>{
   let icons = [];
   let deviceTypes = loadDeviceTypes();
 
+  // Icons are drawn from sprite atlas pages built by scripts/build_icon_atlas.py (one
+  // request per 256 icons) and only the cards in view exist in the DOM. Icons missing
+  // from the atlas (not rebuilt yet) fall back to their own image.
+  let atlas = null;
+  const atlasByName = new Map();
+  let filtered = [];
+  const cards = new Map();  // icon name -> rendered card
+  const ICON_SIZE = 48;
+  const CARD_MIN_WIDTH = 120;
+  const CARD_HEIGHT = 124;
+  const GAP = 8;
+  const OVERSCAN_ROWS = 2;
+  let renderFrame = null;
+
   function slugifyType(raw){
     return String(raw || '')
       .trim()
@@ -110,68 +124,163 @@ document.addEventListener('DOMContentLoaded', async ()=>{
     setStatus(`Mapped "${shortenIconName(iconFile)}" to "${humanizeType(target)}".`, false);
   }
 
-  function renderIcons(){
-    const q = (filter.value || '').toLowerCase().trim();
-    const targetType = slugifyType(targetSel.value);
-    const iconMap = loadTypeIconMap();
-    const activeIcon = iconMap[targetType] || '';
+  // Filtering is a ranked server-side search (/api/icons/search: prefix and typo-tolerant
+  // over names and library descriptions); the local substring filter is only a fallback.
+  const SEARCH_LIMIT = 500;
+  const SEARCH_DELAY_MS = 120;
+  let searchSeq = 0;
+  let searchTimer = null;
 
-    const filtered = icons.filter((icon)=>{
+  function localFilter(q){
+    return icons.filter((icon)=>{
       const friendly = shortenIconName(icon).toLowerCase();
-      return !q || icon.toLowerCase().includes(q) || friendly.includes(q);
+      return icon.toLowerCase().includes(q) || friendly.includes(q);
     });
+  }
+
+  async function applyFilter(){
+    const q = (filter.value || '').toLowerCase().trim();
+    const seq = ++searchSeq;
+    if(!q){
+      filtered = icons;
+      setStatus(`Loaded ${icons.length} icons.`, false);
+      return renderIcons();
+    }
+    try{
+      const res = await fetch('/api/icons/search?' + new URLSearchParams({q, limit: SEARCH_LIMIT}), {cache: 'no-cache'});
+      if(!res.ok) throw new Error('search failed: ' + res.status);
+      const j = await res.json();
+      if(seq !== searchSeq) return;  // a newer search is on its way
+      filtered = j.items.map(item=>item.name);
+      setStatus(j.total > filtered.length ? `Showing the best ${filtered.length} of ${j.total} matches.` : `${j.total} matches.`, false);
+    }catch(err){
+      if(seq !== searchSeq) return;
+      console.warn('icon search failed, filtering locally', err);
+      filtered = localFilter(q);
+    }
+    renderIcons();
+  }
 
+  function renderIcons(){
+    cards.clear();
     grid.innerHTML = '';
+    grid.style.height = '';
     if(!filtered.length){
       grid.textContent = 'No icons match your filter.';
       return;
     }
+    renderVisible();
+  }
+
+  function scheduleRender(){
+    if(renderFrame || !filtered.length) return;
+    renderFrame = requestAnimationFrame(()=>{ renderFrame = null; renderVisible(); });
+  }
 
-    filtered.forEach((icon)=>{
-      const div = document.createElement('div');
-      div.className = 'icon-card';
+  function renderVisible(){
+    const width = grid.clientWidth || CARD_MIN_WIDTH;
+    const cols = Math.max(1, Math.floor((width + GAP) / (CARD_MIN_WIDTH + GAP)));
+    const colWidth = (width - GAP * (cols - 1)) / cols;
+    const rowHeight = CARD_HEIGHT + GAP;
+    const rows = Math.ceil(filtered.length / cols);
+    grid.style.height = (rows * rowHeight - GAP) + 'px';
 
+    // rows of the grid inside the window, plus a little margin
+    const top = -grid.getBoundingClientRect().top;
+    const firstRow = Math.max(0, Math.floor(top / rowHeight) - OVERSCAN_ROWS);
+    const lastRow = Math.min(rows - 1, Math.floor((top + window.innerHeight) / rowHeight) + OVERSCAN_ROWS);
+
+    const targetType = slugifyType(targetSel.value);
+    const activeIcon = loadTypeIconMap()[targetType] || '';
+    const wanted = new Set();
+    for(let i = firstRow * cols; i < Math.min(filtered.length, (lastRow + 1) * cols); i++){
+      const icon = filtered[i];
+      wanted.add(icon);
+      let card = cards.get(icon);
+      if(!card){
+        card = createCard(icon, activeIcon, targetType);
+        cards.set(icon, card);
+        grid.appendChild(card);
+      }
+      card.style.left = ((i % cols) * (colWidth + GAP)) + 'px';
+      card.style.top = (Math.floor(i / cols) * rowHeight) + 'px';
+      card.style.width = colWidth + 'px';
+    }
+    for(const [icon, card] of cards){
+      if(!wanted.has(icon)){ card.remove(); cards.delete(icon); }
+    }
+  }
+
+  function iconImage(icon){
+    const entry = atlasByName.get(icon);
+    if(!entry){
       const img = document.createElement('img');
       img.src = '/icons/standard/' + encodeURIComponent(icon);
       img.alt = icon;
-      div.appendChild(img);
-
-      const name = document.createElement('div');
-      name.className = 'icon-name';
-      name.textContent = shortenIconName(icon);
-      name.title = icon;
-      div.appendChild(name);
-
-      const file = document.createElement('div');
-      file.className = 'icon-file';
-      file.textContent = icon;
-      file.title = icon;
-      div.appendChild(file);
-
-      const actions = document.createElement('div');
-      actions.className = 'icon-actions';
-      const applyBtn = document.createElement('button');
-      applyBtn.textContent = (activeIcon === icon) ? 'Selected' : 'Use';
-      applyBtn.addEventListener('click', ()=>{
-        mapIconToType(icon, targetType);
-        renderIcons();
-      });
-      actions.appendChild(applyBtn);
-      div.appendChild(actions);
-
-      grid.appendChild(div);
+      return img;
+    }
+    const page = atlas.pages[entry.page];
+    const scale = ICON_SIZE / atlas.cell;
+    const el = document.createElement('div');
+    el.className = 'icon-sprite';
+    el.setAttribute('role', 'img');
+    el.setAttribute('aria-label', icon);
+    el.style.backgroundImage = `url("${page.url}")`;
+    el.style.backgroundSize = `${page.width * scale}px ${page.height * scale}px`;
+    el.style.backgroundPosition = `-${entry.x * scale}px -${entry.y * scale}px`;
+    return el;
+  }
+
+  function createCard(icon, activeIcon, targetType){
+    const div = document.createElement('div');
+    div.className = 'icon-card';
+    div.appendChild(iconImage(icon));
+
+    const name = document.createElement('div');
+    name.className = 'icon-name';
+    name.textContent = shortenIconName(icon);
+    name.title = icon;
+    div.appendChild(name);
+
+    const file = document.createElement('div');
+    file.className = 'icon-file';
+    file.textContent = icon;
+    file.title = icon;
+    div.appendChild(file);
+
+    const actions = document.createElement('div');
+    actions.className = 'icon-actions';
+    const applyBtn = document.createElement('button');
+    applyBtn.textContent = (activeIcon === icon) ? 'Selected' : 'Use';
+    applyBtn.addEventListener('click', ()=>{
+      mapIconToType(icon, targetType);
+      renderIcons();
     });
+    actions.appendChild(applyBtn);
+    div.appendChild(actions);
+    return div;
+  }
+
+  async function loadAtlas(){
+    try{
+      const res = await fetch('/icons/atlas/index.json', {cache: 'no-cache'});
+      if(!res.ok) return;
+      atlas = await res.json();
+      atlasByName.clear();
+      atlas.icons.forEach(entry=>atlasByName.set(entry.name, entry));
+    }catch(err){
+      console.warn('icon atlas unavailable, loading icons one by one', err);
+    }
   }
 
   async function loadIcons(){
     grid.textContent = 'Loading...';
     setStatus('Loading icon library...', false);
     try{
-      const res = await fetch('/api/icons/list');
+      const [res] = await Promise.all([fetch('/api/icons/list', {cache: 'no-cache'}), loadAtlas()]);
       if(!res.ok) throw new Error('Failed to load icon list');
-      icons = await res.json();
-      setStatus(`Loaded ${icons.length} icons.`, false);
-      renderIcons();
+      icons = (await res.json()).filter(name=>/\.(png|svg)$/i.test(name));
+      await applyFilter();
     }catch(err){
       console.warn('icon load failed', err);
       icons = [];
@@ -185,7 +294,12 @@ document.addEventListener('DOMContentLoaded', async ()=>{
     renderIcons();
   });
   typeRemoveSelect.addEventListener('change', ()=>{ targetSel.value = typeRemoveSelect.value; renderIcons(); });
-  filter.addEventListener('input', renderIcons);
+  filter.addEventListener('input', ()=>{
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(applyFilter, SEARCH_DELAY_MS);
+  });
+  window.addEventListener('scroll', scheduleRender, {passive: true});
+  window.addEventListener('resize', scheduleRender);
 
   typeAddBtn.addEventListener('click', (e)=>{
     e.preventDefault();
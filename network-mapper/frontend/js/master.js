@@ -6,7 +6,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
 
   // simple: fetch buildings from backend (expect lat/lon fields)
   try{
-    let res = await fetch('/api/buildings');
+    let res = await fetch('/api/buildings', {cache: 'no-cache'});
     if(res.ok){
       let buildings = await res.json();
       buildings.forEach(b=>{
@@ -0,0 +1,48 @@
+"""gunicorn settings for network-mapper (picked up from the working directory, or pass -c).
+
+The schema is created/upgraded once here, in the master, before any worker
+forks; workers see `NM_SCHEMA_READY` and skip the DDL. The master also starts
+the probe pool process (backend/probepool.py) and hands its socket to the
+workers in `PROBE_POOL_SOCKET`, unless one is already configured or
+`PROBE_POOL=local` keeps probing inside each worker.
+"""
+import os
+
+_probe_pool = None
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '3'))
+# request threads per worker share the worker's connection pool (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+# Each open /api/status/stream holds a thread (not a connection) for up to LIVE_STREAM_MAX seconds.
+# A worker serves at most LIVE_MAX_STREAMS (16) streams and answers 503 beyond that, so with the
+# default 24 threads at least 8 per worker stay free for pages and API calls; raise both together.
+# More than one thread also selects the gthread worker, whose heartbeat doesn't stall on long responses.
+threads = int(os.environ.get('GUNICORN_THREADS', '24'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+
+def on_starting(server):
+    from backend import database
+    engine = database.make_engine()
+    try:
+        applied = database.prepare_schema(engine)
+    finally:
+        # no pooled connections may survive into the forked workers
+        engine.dispose()
+    for change in applied:
+        server.log.info('schema: %s', change)
+    server.log.info('schema ready: %s', engine.url.render_as_string(hide_password=True))
+    database.mark_schema_ready()
+
+    if os.environ.get('PROBE_POOL', 'process') != 'local' and not os.environ.get('PROBE_POOL_SOCKET'):
+        global _probe_pool
+        from backend import probepool
+        _probe_pool, path = probepool.start_server()
+        os.environ['PROBE_POOL_SOCKET'] = path
+        server.log.info('probe pool: pid %s on %s', _probe_pool.pid, path)
+
+
+def on_exit(server):
+    if _probe_pool is not None:
+        _probe_pool.terminate()
+        _probe_pool.wait(5)
@@ -1,5 +1,5 @@
 """
-Apply curated icons to core device types by selecting the first matching icon from /api/icons/list.
+Apply curated icons to core device types by picking the best-ranked match from /api/icons/search.
 Usage: python scripts/apply_curated_icons.py --base http://localhost:5000 --token <ADMIN_TOKEN>
 """
 import sys, requests
@@ -12,21 +12,22 @@ args = parser.parse_args()
 BASE = args.base
 HEADERS = {'X-Admin-Token': args.token} if args.token else {}
 
-res = requests.get(BASE + '/api/icons/list')
-if not res.ok:
-    print('Failed to get icons list', res.status_code, res.text); sys.exit(1)
-icons = res.json()
-print('Found', len(icons), 'icons')
-
-def pick(name_subs):
-    low = [i for i in icons if any(s in i.lower() for s in name_subs)]
-    return low[0] if low else None
+def pick(queries):
+    """Top search hit of the first query that finds anything."""
+    for q in queries:
+        res = requests.get(BASE + '/api/icons/search', params={'q': q, 'limit': 1})
+        if not res.ok:
+            print('Icon search failed', res.status_code, res.text); sys.exit(1)
+        items = res.json()['items']
+        if items:
+            return items[0]['name']
+    return None
 
 mapping = {
-    'switch': pick(['switch','route','device','hub']),
-    'ap': pick(['access-point','access_point','ap','dual-band-access-point','wireless']),
-    'phone': pick(['phone','ata','cucm','voice','ip_phone']),
-    'camera': pick(['camera','video','telepresence','webcam','ip_cam'])
+    'switch': pick(['switch', 'router', 'hub']),
+    'ap': pick(['access point', 'wireless']),
+    'phone': pick(['ip phone', 'phone', 'voice']),
+    'camera': pick(['camera', 'video', 'telepresence'])
 }
 
 for target, icon in mapping.items():
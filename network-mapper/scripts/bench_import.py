@@ -0,0 +1,55 @@
+"""
+Generate a large device CSV (same columns as sample_devices.csv) and time the streaming importer on it.
+Usage: python scripts/bench_import.py --rows 60000 [--buildings 40] [--batch 1000] [--resync mac|ip_building|name_building] [--write devices_60k.csv]
+Run from project root. Imports into a throwaway SQLite database; --resync then
+re-imports the same file in upsert mode with that key.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from backend import database, importer  # noqa: E402
+from backend.models import Base  # noqa: E402
+
+DEVICE_TYPES = ('switch', 'ap', 'camera', 'printer', 'phone')
+
+parser = ArgumentParser()
+parser.add_argument('--rows', type=int, default=60000)
+parser.add_argument('--buildings', type=int, default=40)
+parser.add_argument('--batch', type=int, default=importer.IMPORT_BATCH_SIZE)
+parser.add_argument('--resync', choices=sorted(importer.UPSERT_KEYS))
+parser.add_argument('--write', help='also save the generated CSV to this path')
+args = parser.parse_args()
+
+lines = ['name,ip,type,building,mac']
+for i in range(args.rows):
+    dtype = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+    mac = ':'.join(f'{b:02x}' for b in (2, 0) + tuple(i.to_bytes(4, 'big')))
+    lines.append(f'{dtype.title()} {i},10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256},{dtype},Building {i % args.buildings},{mac}')
+data = ('\n'.join(lines) + '\n').encode('utf-8')
+if args.write:
+    Path(args.write).write_bytes(data)
+    print(f'wrote {args.rows} rows to {args.write}')
+
+runs = [('insert', None)] + ([('upsert', args.resync)] if args.resync else [])
+with tempfile.TemporaryDirectory() as tmp:
+    # same connection profile (WAL, pragmas, pool) as the app
+    engine = database.make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for mode, key in runs:
+        started = time.perf_counter()
+        result = importer.import_csv(session, io.BytesIO(data), batch_size=args.batch, mode=mode, key=key)
+        elapsed = time.perf_counter() - started
+        label = mode if key is None else f'{mode}({key})'
+        print(f"{label:>22}: {args.rows} rows in {elapsed:.2f}s ({args.rows / elapsed:.0f} rows/s) -> "
+              f"created {result['created']}, updated {result['updated']}, unchanged {result['unchanged']}, "
+              f"{result['errorCount']} errors")
+    session.close()
+    engine.dispose()
@@ -0,0 +1,37 @@
+"""
+Compare the probe engines: in-process ICMP sockets vs one `ping` subprocess per probe.
+Usage: python scripts/bench_probe.py --count 500 --concurrency 64 [--target 127.0.0.1] [--engine socket|subprocess]
+Run from project root. The socket engine needs ICMP socket permission
+(net.ipv4.ping_group_range on Linux, or root).
+"""
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend import probe  # noqa: E402
+
+parser = ArgumentParser()
+parser.add_argument('--count', type=int, default=500)
+parser.add_argument('--concurrency', type=int, default=64)
+parser.add_argument('--target', default='127.0.0.1')
+parser.add_argument('--engine', choices=['socket', 'subprocess'], action='append')
+args = parser.parse_args()
+
+for engine in args.engine or ['socket', 'subprocess']:
+    if probe.resolve_engine(engine) != engine or not probe.engine_available(engine):
+        print(f'{engine:>10}: not available here, skipped')
+        continue
+    started = time.perf_counter()
+    results = [r for _, r in probe.sweep(((i, args.target) for i in range(args.count)),
+                                         concurrency=args.concurrency, deadline=probe.SWEEP_MAX_DEADLINE,
+                                         engine=engine)]
+    elapsed = time.perf_counter() - started
+    rtts = [float(r['time']) for r in results if r['success'] and r['time'] is not None]
+    ok = sum(1 for r in results if r['success'])
+    line = f'{engine:>10}: {ok}/{len(results)} up in {elapsed:.2f}s ({len(results) / elapsed:.0f} probes/s)'
+    if rtts:
+        line += f', rtt median {statistics.median(rtts):.3f} ms, max {max(rtts):.3f} ms'
+    print(line)
@@ -0,0 +1,93 @@
+"""
+Compare the ORM path and the Core column-select path for serializing device lists, then the
+stdlib and orjson JSON providers on rows and on the ?format=columns shape.
+Usage: python scripts/bench_serialize.py [--rows 100000] [--repeat 3]
+Run from project root. Fills a throwaway SQLite database with devices and times loading +
+dict-building + JSON encoding them both ways (best of --repeat runs).
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from backend import database, fastjson, serializers  # noqa: E402
+from backend.models import Base, Building, Device  # noqa: E402
+
+parser = ArgumentParser()
+parser.add_argument('--rows', type=int, default=100000)
+parser.add_argument('--repeat', type=int, default=3)
+args = parser.parse_args()
+
+
+def orm_path(session):
+    # what GET /api/devices did before serializers.py
+    devices = session.query(Device).order_by(Device.id).all()
+    return [{"id": d.id, "name": d.name, "ip": d.ip, "device_type": d.device_type, "building_id": d.building_id,
+             "floorplan_id": d.floorplan_id, "x": d.x, "y": d.y, "note": d.note, "mac": d.mac, "room": d.room}
+            for d in devices]
+
+
+def core_path(session):
+    return serializers.device_rows(session, serializers.select_devices().order_by(Device.id))
+
+
+def best_of(fn):
+    best = float('inf')
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    engine = database.make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.execute(insert(Building), [{'name': f'Building {i}'} for i in range(40)])
+        session.execute(insert(Device), [
+            {'name': f'Device {i}', 'ip': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}', 'device_type': 'switch',
+             'building_id': i % 40 + 1, 'x': (i % 997) / 997, 'y': (i % 991) / 991, 'mac': f'02:00:{i:08x}'}
+            for i in range(args.rows)])
+        session.commit()
+
+    results = {}
+    for label, fn in (('orm', orm_path), ('core', core_path)):
+        best_load = best_total = float('inf')
+        for _ in range(args.repeat):
+            with Session() as session:
+                started = time.perf_counter()
+                out = fn(session)
+                loaded = time.perf_counter()
+                json.dumps(out)
+                done = time.perf_counter()
+            best_load = min(best_load, loaded - started)
+            best_total = min(best_total, done - started)
+        results[label] = out
+        print(f'{label:>5}: {len(out)} rows, query+dicts {best_load:.3f}s ({len(out) / best_load:,.0f} rows/s), '
+              f'with JSON {best_total:.3f}s ({len(out) / best_total:,.0f} rows/s)')
+    assert results['orm'] == results['core'], 'both paths must produce the same output'
+
+    with Session() as session:
+        rows = serializers.fetch(session, serializers.select_devices().order_by(Device.id))
+    shapes = {'rows': serializers.device_dicts(rows), 'columns': serializers.columns(rows, serializers.DEVICE_FIELDS)}
+    app = Flask(__name__)
+    for engine_name in ('stdlib', 'orjson'):
+        provider = fastjson.FastJSONProvider(app, engine_name)
+        if provider.name != engine_name:
+            print(f'{engine_name:>7}: not installed')
+            continue
+        with app.app_context():
+            for shape, obj in shapes.items():
+                elapsed, resp = best_of(lambda: provider.response(obj))
+                print(f'{engine_name:>7} {shape:>7}: {elapsed:.3f}s ({args.rows / elapsed:,.0f} rows/s), '
+                      f'{len(resp.get_data()) / 1e6:.1f} MB')
+    engine.dispose()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Pack the normalized icon library into paged sprite atlases plus a JSON index for the icon picker.
+Usage: python scripts/build_icon_atlas.py [--cell 64] [--columns 16] [--rows 16] [--force]
+Run from project root after normalize_icons.py. Reads frontend/icons/standard/*.png and writes
+frontend/icons/atlas/page-<n>.png and index.json; does nothing when the source icons are unchanged
+since the last build (--force rebuilds anyway).
+
+index.json: {"cell", "columns", "rows", "sourceDigest",
+             "pages": [{"url", "width", "height"}],
+             "icons": [{"name", "page", "x", "y", "tags"}]}
+Page URLs carry ?v=<content version>, so the browser caches them as immutable.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from backend import assets  # noqa: E402
+
+SRC = ROOT / 'frontend' / 'icons' / 'standard'
+DST = ROOT / 'frontend' / 'icons' / 'atlas'
+URL_PREFIX = '/icons/atlas/'
+
+# filename parts that say nothing about what the icon shows
+NOISE = {'png', 'svg', 'device'}
+
+
+def icon_tags(filename):
+    """Search tags from an icon file name: '30001_device_access_point_critical_64.png' -> access, point, critical."""
+    tags = []
+    for token in re.split(r'[^a-z0-9]+', filename.lower()):
+        if token and not token.isdigit() and token not in NOISE and token not in tags:
+            tags.append(token)
+    return tags
+
+
+def source_icons(src):
+    return sorted(p for p in src.iterdir() if p.is_file() and p.suffix.lower() == '.png')
+
+
+def source_digest(paths):
+    h = hashlib.sha256()
+    for p in paths:
+        st = p.stat()
+        h.update(f'{p.name}\0{st.st_size}\0{st.st_mtime_ns}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def build(src=SRC, dst=DST, cell=64, columns=16, rows=16, force=False):
+    """Build the atlas; returns the index dict, or None when it was already up to date."""
+    paths = source_icons(src)
+    digest = source_digest(paths)
+    index_path = dst / 'index.json'
+    if not force and index_path.exists():
+        try:
+            if json.loads(index_path.read_text(encoding='utf-8')).get('sourceDigest') == digest:
+                return None
+        except ValueError:
+            pass
+    dst.mkdir(parents=True, exist_ok=True)
+    per_page = columns * rows
+    index = {'cell': cell, 'columns': columns, 'rows': rows, 'sourceDigest': digest, 'pages': [], 'icons': []}
+    page = None
+    for i, path in enumerate(paths):
+        slot = i % per_page
+        if slot == 0:
+            if page is not None:
+                _save_page(page, dst, len(index['pages']), index)
+            count = min(per_page, len(paths) - i)
+            page_rows = -(-count // columns)
+            page = Image.new('RGBA', (columns * cell, page_rows * cell), (0, 0, 0, 0))
+        x, y = (slot % columns) * cell, (slot // columns) * cell
+        try:
+            with Image.open(path) as im:
+                im = im.convert('RGBA')
+                if im.size != (cell, cell):
+                    im.thumbnail((cell, cell), Image.LANCZOS)
+                page.paste(im, (x + (cell - im.width) // 2, y + (cell - im.height) // 2))
+        except Exception as e:
+            print('skip', path.name, e)
+            continue
+        index['icons'].append({'name': path.name, 'page': i // per_page, 'x': x, 'y': y, 'tags': icon_tags(path.name)})
+    if page is not None:
+        _save_page(page, dst, len(index['pages']), index)
+    # drop pages left over from a bigger library
+    keep = {f'page-{n}.png' for n in range(len(index['pages']))}
+    for old in dst.glob('page-*.png'):
+        if old.name not in keep:
+            old.unlink()
+    tmp = index_path.with_suffix('.json.tmp')
+    tmp.write_text(json.dumps(index, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, index_path)
+    return index
+
+
+def _save_page(page, dst, number, index):
+    name = f'page-{number}.png'
+    tmp = dst / (name + '.tmp')
+    page.save(tmp, format='PNG')
+    os.replace(tmp, dst / name)
+    index['pages'].append({'url': f'{URL_PREFIX}{name}?v={assets.version(str(dst / name))}',
+                           'width': page.width, 'height': page.height})
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--src', type=Path, default=SRC)
+    parser.add_argument('--dst', type=Path, default=DST)
+    parser.add_argument('--cell', type=int, default=64)
+    parser.add_argument('--columns', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=16)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    index = build(args.src, args.dst, args.cell, args.columns, args.rows, args.force)
+    if index is None:
+        print(f'{args.dst / "index.json"} is up to date')
+    else:
+        print(f"packed {len(index['icons'])} icons into {len(index['pages'])} pages under {args.dst}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,19 @@
 Cleanup script to remove test-created buildings and their floorplans/devices.
 This targets buildings whose name contains 'E2E' or starts with 'E2E Icon Building'.
 Run locally from project root: python scripts/cleanup_test_artifacts.py
-It will remove DB rows and uploaded files (in backend/uploads) for matched artifacts.
+It will remove DB rows, stored floorplan files (UPLOAD_FOLDER) and their tiles (TILES_FOLDER) for matched
+artifacts; a file another floorplan shares by content hash is kept, like /api/admin/cleanup-tests does.
 """
 import os
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from backend import database
+from backend import storage
+from backend import tiles
 from backend.models import Building, Floorplan, Device
 
 DB_URL = os.environ.get('DATABASE_URL', 'sqlite:///network-mapper.db')
-engine = create_engine(DB_URL)
+engine = database.make_engine(DB_URL)
 Session = sessionmaker(bind=engine)
-UPLOADS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backend', 'uploads')
 
 def find_test_buildings(session):
     # match typical test artifact names
@@ -22,14 +24,20 @@ def remove_building(session, building):
     print(f"Removing building: {building.id} - {building.name}")
     fps = session.query(Floorplan).filter_by(building_id=building.id).all()
     for fp in fps:
-        # delete uploads file if exists
-        path = os.path.join(UPLOADS, fp.filename)
-        if os.path.exists(path):
-            print('  removing upload file', path)
-            try:
-                os.remove(path)
-            except Exception as e:
-                print('  failed to remove file', e)
+        # delete the stored file and its tiles, unless another floorplan shares its content
+        shared = fp.content_hash and session.query(Floorplan).filter(
+            Floorplan.content_hash == fp.content_hash, Floorplan.id != fp.id).count()
+        if shared:
+            print('  keeping upload file shared with another floorplan', storage.stored_path(fp))
+        else:
+            path = storage.stored_path(fp)
+            if os.path.exists(path):
+                print('  removing upload file', path)
+                try:
+                    os.remove(path)
+                except Exception as e:
+                    print('  failed to remove file', e)
+            tiles.remove_tiles(tiles.tile_key(fp))
         # delete devices linked to this floorplan
         devs = session.query(Device).filter_by(floorplan_id=fp.id).all()
         for d in devs:
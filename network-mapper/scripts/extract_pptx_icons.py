@@ -1,19 +1,45 @@
 #!/usr/bin/env python3
-import zipfile
-import xml.etree.ElementTree as ET
-import re
-from pathlib import Path
+"""
+Extract the pictures of one or more icon-library decks into frontend/icons/from-pptx.
+Usage: python scripts/extract_pptx_icons.py [deck.pptx ...] [--out DIR] [--jobs N]
+Run from project root, then normalize_icons.py. Without arguments reads iconlibrary-production-oct2016.pptx.
+
+Each picture is saved as <clean description><ext> and listed in one merged mapping.csv
+(slide, rId, src, desc, out, deck), in deck, slide and picture order.
+
+- Every archive's name list is read once; slides are parsed and media members are streamed to disk
+  (shutil.copyfileobj, hashed on the way) by a process pool (--jobs, default: one per CPU).
+- A media member referenced from several slides is read once, and a picture whose name and content
+  (SHA-256) match one already written reuses that file. Different content under an existing name
+  gets _1, _2, ... in deck/slide order, so names don't depend on files left in the directory.
+"""
 import csv
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
 
-PPTX = Path(__file__).resolve().parents[1] / 'iconlibrary-production-oct2016.pptx'
-OUTDIR = Path(__file__).resolve().parents[0] / '..' / 'frontend' / 'icons' / 'from-pptx'
-OUTDIR.mkdir(parents=True, exist_ok=True)
+ROOT = Path(__file__).resolve().parents[1]
+PPTX = ROOT / 'iconlibrary-production-oct2016.pptx'
+OUTDIR = ROOT / 'frontend' / 'icons' / 'from-pptx'
+MAPPING_FIELDS = ['slide', 'rId', 'src', 'desc', 'out', 'deck']
 
 ns = {
     'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
     'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
     'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
 }
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+EMBED = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed'
+SLIDE = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+
 
 def clean_name(s):
     # try to sanitize and shorten
@@ -22,57 +48,167 @@ def clean_name(s):
     s = s.strip('_').lower()
     return s or 'icon'
 
-mappings = []
-with zipfile.ZipFile(PPTX, 'r') as z:
-    # list all slides
-    slide_files = [f for f in z.namelist() if f.startswith('ppt/slides/slide') and f.endswith('.xml')]
-    for slide in slide_files:
-        rels_name = 'ppt/slides/_rels/' + Path(slide).name + '.rels'
-        rels = {}
-        if rels_name in z.namelist():
-            tree = ET.fromstring(z.read(rels_name))
-            for rel in tree.findall('{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
-                rid = rel.get('Id')
-                target = rel.get('Target')
-                rels[rid] = target
-        data = z.read(slide)
-        tree = ET.fromstring(data)
-        # find pics
-        for pic in tree.findall('.//p:pic', ns):
-            # find descriptor
-            cNvPr = pic.find('.//p:cNvPr', ns)
-            desc = ''
-            if cNvPr is not None:
-                desc = cNvPr.get('descr') or cNvPr.get('name') or ''
-            # find blip r:embed
-            blip = pic.find('.//a:blip', ns)
-            rid = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed') if blip is not None else None
-            target = rels.get(rid) if rid else None
-            if target and target.startswith('../'):
-                target = target.replace('../','')
-            if target:
-                src_name = 'ppt/' + target
-                if src_name in z.namelist():
-                    # build friendly name
-                    friendly = clean_name(desc)
-                    ext = Path(target).suffix
-                    out_name = friendly + ext
-                    out_path = OUTDIR / out_name
-                    # avoid collisions
-                    count = 1
-                    while out_path.exists():
-                        out_path = OUTDIR / f"{friendly}_{count}{ext}"
-                        count += 1
-                    with z.open(src_name) as src, open(out_path, 'wb') as dst:
-                        dst.write(src.read())
-                    mappings.append({'slide': slide, 'rId': rid, 'src': src_name, 'desc': desc, 'out': str(out_path.relative_to(Path.cwd()))})
-
-# write CSV
-csv_path = OUTDIR / 'mapping.csv'
-with open(csv_path, 'w', newline='', encoding='utf-8') as csvf:
-    writer = csv.DictWriter(csvf, fieldnames=['slide','rId','src','desc','out'])
-    writer.writeheader()
-    for m in mappings:
-        writer.writerow(m)
-
-print(f'Extracted {len(mappings)} images to {OUTDIR} and wrote mapping to {csv_path}')
+
+# one open archive and name set per deck and process: the central directory is read once, not per slide.
+# Worker processes must open their own: a ZipFile inherited over fork shares its file offset with the
+# parent and the other workers, and their parallel reads corrupt each other.
+_archives = {}
+
+
+def _archive(deck):
+    """`(ZipFile, frozenset of member names)` for `deck`."""
+    cached = _archives.get(deck)
+    if cached is None:
+        z = zipfile.ZipFile(deck, 'r')
+        cached = _archives[deck] = (z, frozenset(z.namelist()))
+    return cached
+
+
+def _close_archives():
+    for z, _names in _archives.values():
+        z.close()
+    _archives.clear()
+
+
+def _forget_archives():
+    """Pool initializer: drop any archives inherited from the parent without touching their shared handles."""
+    _archives.clear()
+
+
+def _member_names(deck, pool):
+    """Member names of `deck`; with a pool the parent reads them through a handle of its own."""
+    if pool is None:
+        return _archive(deck)[1]
+    with zipfile.ZipFile(deck, 'r') as z:
+        return frozenset(z.namelist())
+
+
+def slide_names(names):
+    """Slide parts of an archive in slide-number order."""
+    slides = [(int(m.group(1)), n) for n in names for m in [SLIDE.match(n)] if m]
+    return [n for _num, n in sorted(slides)]
+
+
+def scan_slide(job):
+    """Worker: `[(rId, media member, description)]` for the pictures on one slide, in document order."""
+    deck, slide = job
+    z, names = _archive(deck)
+    rels = {}
+    rels_name = f'ppt/slides/_rels/{PurePosixPath(slide).name}.rels'
+    if rels_name in names:
+        for rel in ET.fromstring(z.read(rels_name)).findall(REL):
+            rels[rel.get('Id')] = rel.get('Target')
+    pictures = []
+    for pic in ET.fromstring(z.read(slide)).findall('.//p:pic', ns):
+        cNvPr = pic.find('.//p:cNvPr', ns)
+        desc = (cNvPr.get('descr') or cNvPr.get('name') or '') if cNvPr is not None else ''
+        blip = pic.find('.//a:blip', ns)
+        rid = blip.get(EMBED) if blip is not None else None
+        target = rels.get(rid) if rid else None
+        if not target:
+            continue
+        # targets are relative to ppt/slides/ unless absolute within the package
+        member = target[1:] if target.startswith('/') else posixpath.normpath(posixpath.join('ppt/slides', target))
+        if member in names:
+            pictures.append((rid, member, desc))
+    return slide, pictures
+
+
+def copy_member(job):
+    """Worker: stream one media member to a temporary file in `tmpdir`; returns (member, sha256, path)."""
+    deck, member, tmpdir = job
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=tmpdir, suffix=PurePosixPath(member).suffix)
+    with _archive(deck)[0].open(member) as src, os.fdopen(fd, 'wb') as dst:
+        shutil.copyfileobj(_Hashing(src, digest), dst, 1024 * 1024)
+    return member, digest.hexdigest(), path
+
+
+class _Hashing:
+    """Read-through wrapper feeding everything read into `digest`."""
+
+    def __init__(self, fh, digest):
+        self.fh, self.digest = fh, digest
+
+    def read(self, size=-1):
+        data = self.fh.read(size)
+        self.digest.update(data)
+        return data
+
+
+def _display_path(path):
+    try:
+        return path.relative_to(ROOT).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _run(pool, fn, jobs):
+    return pool.map(fn, jobs, chunksize=max(1, len(jobs) // 64)) if pool else map(fn, jobs)
+
+
+def extract(decks=(PPTX,), outdir=OUTDIR, jobs=None):
+    """Extract every deck into `outdir`; returns the mapping rows (also written to `outdir/mapping.csv`)."""
+    outdir.mkdir(parents=True, exist_ok=True)
+    workers = jobs or os.cpu_count() or 1
+    pool = None
+    if workers > 1:
+        _close_archives()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_forget_archives)
+    rows = []
+    assigned = {}  # output name -> sha256 of the file written under it
+    by_content = {}  # (friendly name, ext, sha256) -> output name
+    try:
+        with tempfile.TemporaryDirectory(dir=outdir, prefix='.extract-') as tmpdir:
+            for deck in decks:
+                deck = str(Path(deck).resolve())
+                slides = list(_run(pool, scan_slide, [(deck, s) for s in slide_names(_member_names(deck, pool))]))
+                members = list(dict.fromkeys(m for _s, pics in slides for _r, m, _d in pics))
+                copied = {m: (sha, path) for m, sha, path in _run(pool, copy_member, [(deck, m, tmpdir) for m in members])}
+                placed = {}  # member -> the output file its temporary copy was moved to
+                for slide, pictures in slides:
+                    for rid, member, desc in pictures:
+                        sha, tmp = copied[member]
+                        friendly, ext = clean_name(desc), PurePosixPath(member).suffix
+                        out_name = by_content.get((friendly, ext, sha))
+                        if out_name is None:
+                            out_name, count = friendly + ext, 1
+                            while out_name in assigned:
+                                out_name = f'{friendly}_{count}{ext}'
+                                count += 1
+                            assigned[out_name] = sha
+                            by_content[(friendly, ext, sha)] = out_name
+                            if member in placed:  # same picture under another name
+                                shutil.copyfile(placed[member], outdir / out_name)
+                            else:
+                                os.replace(tmp, outdir / out_name)
+                                placed[member] = outdir / out_name
+                        rows.append({'slide': slide, 'rId': rid, 'src': member, 'desc': desc,
+                                     'out': _display_path(outdir / out_name), 'deck': Path(deck).name})
+    finally:
+        if pool:
+            pool.shutdown()
+        _close_archives()
+
+    # write CSV
+    with open(outdir / 'mapping.csv', 'w', newline='', encoding='utf-8') as csvf:
+        writer = csv.DictWriter(csvf, fieldnames=MAPPING_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('decks', nargs='*', type=Path, default=[PPTX])
+    parser.add_argument('--out', type=Path, default=OUTDIR)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+    rows = extract(args.decks, args.out.resolve(), args.jobs)
+    files = len({r['out'] for r in rows})
+    print(f'Extracted {len(rows)} pictures ({files} distinct files) from {len(args.decks)} deck(s) '
+          f'to {args.out} and wrote mapping to {args.out / "mapping.csv"}')
+
+
+if __name__ == '__main__':
+    main()
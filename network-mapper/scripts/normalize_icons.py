@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
-from pathlib import Path
-from PIL import Image
+"""
+Normalize the extracted PowerPoint icons into the 64 px library the app uses.
+Usage: python scripts/normalize_icons.py [--sizes 32,64,128] [--webp] [--jobs N] [--force]
+Run from project root after extract_pptx_icons.py. Reads frontend/icons/from-pptx/* and writes
+frontend/icons/standard/<name>.png (64x64, centred on a transparent canvas) plus mapping_normalized.csv.
+
+- Icons are rendered by a process pool (--jobs, default: one per CPU).
+- normalize_manifest.json records each source's SHA-256 and the files rendered from it; a source whose
+  content and options are unchanged is skipped, and outputs of removed sources are deleted.
+- Output names depend only on the source names and contents: when two sources clean to the same name,
+  the first by source name keeps it and the others get _<hash prefix>, whatever the processing order.
+  The first run over a directory without a manifest deletes the numbered copies (<name>_1.png, ...) the
+  old script left behind for names that are rendered again.
+- --sizes adds other sizes under standard/<size>/ (64 is always written to standard/ itself); --webp
+  writes a .webp next to every PNG. Icons are never scaled up, smaller ones are centred.
+"""
 import csv
+import hashlib
+import io
+import json
+import os
 import re
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / 'frontend' / 'icons' / 'from-pptx'
+DST = ROOT / 'frontend' / 'icons' / 'standard'
+BASE_SIZE = 64
+MANIFEST = 'normalize_manifest.json'
+MAPPING = 'mapping_normalized.csv'
+# files in from-pptx that are not icons
+SKIP_SUFFIXES = ('.csv', '.json')
+# collision copies of the unversioned script, which numbered them instead of hashing
+LEGACY_COPY = re.compile(r'^(?P<stem>.+)_\d+\.png$')
+# lossy with an exact alpha channel: ~half the size of the PNG and ~10x faster to encode than lossless
+WEBP_OPTIONS = {'quality': 90, 'alpha_quality': 100, 'method': 4}
 
-SRC = Path(__file__).resolve().parents[0] / '..' / 'frontend' / 'icons' / 'from-pptx'
-DST = Path(__file__).resolve().parents[0] / '..' / 'frontend' / 'icons' / 'standard'
-SRC = SRC.resolve()
-DST = DST.resolve()
-DST.mkdir(parents=True, exist_ok=True)
 
 def clean_name(name):
     # remove duplicate extensions and illegal chars
@@ -21,39 +52,174 @@ def clean_name(name):
         name = name + '.png'
     return name
 
-rows = []
-for p in sorted(SRC.glob('*')):
-    if p.is_file():
-        outname = clean_name(p.name)
-        outpath = DST / outname
-        # avoid collisions
-        base = outpath.stem
-        ext = outpath.suffix
-        i = 1
-        while outpath.exists():
-            outpath = DST / f"{base}_{i}{ext}"
-            i += 1
-        # attempt to open and resize using Pillow; convert to RGBA
-        try:
-            im = Image.open(p).convert('RGBA')
-            im.thumbnail((64,64), Image.LANCZOS)
-            # center into 64x64 canvas
-            canvas = Image.new('RGBA', (64,64), (0,0,0,0))
-            x = (64 - im.width)//2
-            y = (64 - im.height)//2
-            canvas.paste(im, (x,y), im)
-            canvas.save(outpath, format='PNG')
-            rows.append({'src': str(p), 'out': str(outpath)})
-        except Exception as e:
-            # skip non-image or errors
-            print('skip', p, e)
-
-# write mapping csv
-csvp = DST / 'mapping_normalized.csv'
-with open(csvp, 'w', newline='', encoding='utf-8') as f:
-    writer = csv.DictWriter(f, fieldnames=['src','out'])
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def output_names(sources):
+    """{source name: output name} for `[(source name, sha256)]`, independent of list order."""
+    groups = {}
+    for name, sha in sorted(sources):
+        groups.setdefault(clean_name(name), []).append((name, sha))
+    names = {}
+    for out, members in groups.items():
+        stem, ext = os.path.splitext(out)
+        for n, (name, sha) in enumerate(members):
+            names[name] = out if n == 0 else f'{stem}_{sha[:8]}{ext}'
+    return names
+
+
+def output_paths(out_name, sizes, webp):
+    """Paths relative to DST for one icon: standard/<name>.png for 64 px, <size>/<name>.png for the others."""
+    stem = os.path.splitext(out_name)[0]
+    paths = []
+    for size in sizes:
+        folder = '' if size == BASE_SIZE else f'{size}/'
+        paths.append((f'{folder}{stem}.png', size, 'PNG'))
+        if webp:
+            paths.append((f'{folder}{stem}.webp', size, 'WEBP'))
+    return paths
+
+
+def render(job):
+    """Worker: render one source to every `(path, size, format)` target; returns (source, error or None)."""
+    src, targets = job
+    try:
+        with Image.open(src) as im:
+            im = im.convert('RGBA')
+        for path, size, fmt in targets:
+            icon = im.copy()
+            icon.thumbnail((size, size), Image.LANCZOS)
+            canvas = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+            canvas.paste(icon, ((size - icon.width) // 2, (size - icon.height) // 2), icon)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            canvas.save(tmp, format=fmt, **(WEBP_OPTIONS if fmt == 'WEBP' else {}))
+            os.replace(tmp, path)
+        return src, None
+    except Exception as e:
+        return src, str(e)
+
+
+def legacy_copies(dst, current):
+    """Numbered `<name>_<n>.png` files in `dst` left by the old script for a name that is still rendered."""
+    stems = {os.path.splitext(rel)[0] for rel in current if '/' not in rel}
+    for p in sorted(dst.glob('*.png')):
+        m = LEGACY_COPY.match(p.name)
+        if m and m.group('stem') in stems and p.name not in current:
+            yield p
+
+
+def load_manifest(dst):
+    try:
+        return json.loads((dst / MANIFEST).read_text(encoding='utf-8')).get('sources', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def normalize(src=SRC, dst=DST, sizes=(BASE_SIZE,), webp=False, jobs=None, force=False):
+    """Bring `dst` up to date with `src`; returns counts of rendered, skipped, removed and failed icons."""
+    sizes = sorted(set(sizes) | {BASE_SIZE})
+    options = ','.join(map(str, sizes)) + (',webp' if webp else '')
+    dst.mkdir(parents=True, exist_ok=True)
+    legacy = not (dst / MANIFEST).exists()
+    previous = load_manifest(dst)
+
+    sources = {}
+    for p in sorted(src.iterdir()):
+        if p.is_file() and not p.name.lower().endswith(SKIP_SUFFIXES):
+            sources[p.name] = file_sha256(p)
+    names = output_names(sources.items())
+
+    manifest, pending = {}, []
+    for name, sha in sources.items():
+        outputs = output_paths(names[name], sizes, webp)
+        entry = manifest.setdefault(sha, {'sources': [], 'options': options, 'outputs': []})
+        entry['sources'].append(name)
+        entry['outputs'].extend(rel for rel, _size, _fmt in outputs)
+        old = previous.get(sha)
+        if (not force and old and old.get('options') == options and not old.get('failed')
+                and all(rel in old.get('outputs', ()) and (dst / rel).exists() for rel, _s, _f in outputs)):
+            continue
+        pending.append((str(src / name), [(str(dst / rel), size, fmt) for rel, size, fmt in outputs]))
+
+    stats = {'rendered': 0, 'skipped': len(sources) - len(pending), 'removed': 0, 'failed': 0}
+    failed = set()
+    if pending:
+        workers = jobs or os.cpu_count() or 1
+        if workers == 1:
+            results = list(map(render, pending))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(render, pending, chunksize=max(1, len(pending) // (workers * 8))))
+        for path, error in results:
+            if error:
+                # skip non-image or errors
+                print('skip', path, error)
+                failed.add(Path(path).name)
+            else:
+                stats['rendered'] += 1
+    stats['failed'] = len(failed)
+    for name in failed:
+        manifest[sources[name]]['failed'] = True
+
+    # files rendered for sources that are gone (or renamed, or re-rendered in fewer sizes)
+    current = {rel for entry in manifest.values() for rel in entry['outputs']}
+    for entry in previous.values():
+        for rel in entry.get('outputs', ()):
+            if rel not in current and (dst / rel).exists():
+                (dst / rel).unlink()
+                stats['removed'] += 1
+    if legacy:
+        for p in list(legacy_copies(dst, current)):
+            p.unlink()
+            stats['removed'] += 1
+
+    _write_if_changed(dst / MANIFEST, json.dumps({'version': 1, 'sources': manifest}, indent=1, sort_keys=True))
+    # write mapping csv
+    mapping = io.StringIO(newline='')
+    writer = csv.DictWriter(mapping, fieldnames=['src', 'out'])
     writer.writeheader()
-    for r in rows:
-        writer.writerow(r)
+    for name in sources:
+        if name not in failed:
+            writer.writerow({'src': str(src / name), 'out': str(dst / output_paths(names[name], [BASE_SIZE], False)[0][0])})
+    _write_if_changed(dst / MAPPING, mapping.getvalue())
+    return stats
+
+
+def _write_if_changed(path, text):
+    """Leave unchanged files alone, so a no-op run doesn't touch the directory mtime the icon catalog watches."""
+    try:
+        with open(path, newline='', encoding='utf-8') as fh:
+            if fh.read() == text:
+                return
+    except OSError:
+        pass
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', newline='', encoding='utf-8') as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--src', type=Path, default=SRC)
+    parser.add_argument('--dst', type=Path, default=DST)
+    parser.add_argument('--sizes', default=str(BASE_SIZE), help='comma-separated pixel sizes, e.g. 32,64,128')
+    parser.add_argument('--webp', action='store_true', help='also write WebP copies')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='re-render icons that are up to date')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    stats = normalize(args.src.resolve(), args.dst.resolve(), sizes, args.webp, args.jobs, args.force)
+    print(f"Normalized {stats['rendered']} images ({stats['skipped']} unchanged, {stats['removed']} stale files removed, "
+          f"{stats['failed']} failed) to {args.dst} and wrote {args.dst / MAPPING}")
+
 
-print(f'Normalized {len(rows)} images to {DST} and wrote {csvp}')
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,10 @@ if sys.version_info >= (3, 13):
 tmpdir = tempfile.mkdtemp(prefix="nm_test_db_")
 db_path = os.path.join(tmpdir, "test.db")
 os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+os.environ["IMPORT_FOLDER"] = os.path.join(tmpdir, "imports")
+os.environ["UPLOAD_FOLDER"] = os.path.join(tmpdir, "uploads")
+os.environ["TILES_FOLDER"] = os.path.join(tmpdir, "tiles")
+os.environ["PING_CACHE_DIR"] = os.path.join(tmpdir, "ping-cache")
 
 # Import app after setting DATABASE_URL so engine uses test DB
 from backend import app as app_module
@@ -42,3 +46,47 @@ def cleanup():
         shutil.rmtree(tmpdir)
     except Exception:
         pass
+
+
+FAKE_PING = """#!/bin/sh
+# stand-in for ping(8): last argument is the target
+for target; do :; done
+case "$target" in
+  10.254.*) sleep 5; exit 1 ;;
+  10.255.*) echo "Request timeout for icmp_seq 0"; exit 1 ;;
+  *) echo "64 bytes from $target: icmp_seq=0 ttl=64 time=2ms"; exit 0 ;;
+esac
+"""
+
+
+@pytest.fixture
+def fake_ping(tmp_path, monkeypatch):
+    """Point the probe helpers at a shell script instead of the real ping.
+
+    10.255.x.x answers "down" immediately, 10.254.x.x hangs, everything else is up.
+    """
+    from backend import probe
+    path = tmp_path / 'ping'
+    path.write_text(FAKE_PING)
+    path.chmod(0o755)
+    monkeypatch.setattr(probe, 'PING_BINARY', str(path))
+    monkeypatch.setattr(probe, 'PROBE_ENGINE', 'subprocess')
+    return str(path)
+
+
+DEVICE_TYPES = ('switch', 'ap', 'camera', 'printer', 'phone')
+
+
+def generate_devices_csv(rows, buildings=10, prefix='Bench'):
+    """CSV bytes shaped like `sample_devices.csv` (name,ip,type,building)."""
+    out = ['name,ip,type,building']
+    for i in range(rows):
+        dtype = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+        out.append(f'{prefix} {dtype} {i},10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256},{dtype},{prefix} Building {i % buildings}')
+    return ('\n'.join(out) + '\n').encode('utf-8')
+
+
+@pytest.fixture
+def devices_csv():
+    """Factory for large device CSVs: `devices_csv(rows, buildings=10, prefix='Bench')`."""
+    return generate_devices_csv
@@ -0,0 +1,33 @@
+import os
+
+from backend import app as app_module
+from backend import storage
+from backend import tiles
+from backend.models import Building, Floorplan
+from scripts import cleanup_test_artifacts
+
+from test_floorplan_uploads import _png, _upload
+
+
+def test_remove_building_deletes_stored_files_and_tiles(client):
+    shared, own = _png(14, 9), _png(15, 9)
+    kept = _upload(client, shared, 'plan.png', building='Cleanup Keeper')
+    _upload(client, shared, 'plan.png', building='E2E Cleanup Shared')
+    gone = _upload(client, own, 'plan.png', building='E2E Cleanup Own')
+    # a file named like the display label must survive
+    decoy = os.path.join(storage.UPLOAD_FOLDER, 'plan.png')
+    with open(decoy, 'wb') as fh:
+        fh.write(b'unrelated')
+    session = app_module.SessionLocal()
+    try:
+        own_fp = session.get(Floorplan, gone['id'])
+        os.makedirs(tiles.tile_dir(tiles.tile_key(own_fp)), exist_ok=True)
+        for b in session.query(Building).filter(Building.name.like('E2E Cleanup%')):
+            cleanup_test_artifacts.remove_building(session, b)
+        session.commit()
+    finally:
+        session.close()
+    assert os.path.exists(os.path.join(storage.UPLOAD_FOLDER, kept['url'].rsplit('/', 1)[-1]))
+    assert not os.path.exists(os.path.join(storage.UPLOAD_FOLDER, gone['url'].rsplit('/', 1)[-1]))
+    assert not os.path.exists(tiles.tile_dir(gone['hash']))
+    assert os.path.exists(decoy)
@@ -0,0 +1,72 @@
+import multiprocessing
+import threading
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from backend import app as app_module
+from backend import database
+
+
+def test_sqlite_connections_get_the_profile():
+    assert isinstance(app_module.engine.pool, QueuePool)
+    with app_module.engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()  # noqa: E731
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('busy_timeout') == database.SQLITE_BUSY_TIMEOUT_MS
+        assert pragma('cache_size') == database.SQLITE_CACHE_SIZE
+
+
+def test_postgres_urls_get_the_same_pool_settings():
+    assert database.normalize_url('postgres://u:p@db/nm') == 'postgresql://u:p@db/nm'
+    options = database.engine_options(make_url(database.normalize_url('postgres://u:p@db/nm')))
+    assert options['poolclass'] is QueuePool
+    assert (options['pool_size'], options['max_overflow']) == (database.DB_POOL_SIZE, database.DB_MAX_OVERFLOW)
+    assert options['pool_pre_ping'] and options['pool_recycle'] == database.DB_POOL_RECYCLE
+    assert 'connect_args' not in options
+
+def test_writers_wait_for_the_lock_instead_of_failing(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'busy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE t (v INTEGER)'))
+    released = threading.Event()
+
+    def hold_write_lock():
+        with engine.begin() as conn:
+            conn.execute(text('INSERT INTO t VALUES (1)'))
+            released.wait(5)
+            time.sleep(0.3)
+
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    released.set()
+    time.sleep(0.05)
+    with engine.begin() as conn:
+        conn.execute(text('INSERT INTO t VALUES (2)'))
+        # readers are not blocked by the writer under WAL
+    holder.join()
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM t')).scalar() == 2
+    engine.dispose()
+
+
+def _prepare(url, lock):
+    database.prepare_schema(database.make_engine(url), lock)
+
+
+def test_schema_preparation_is_serialized_across_processes(tmp_path):
+    url, lock = f"sqlite:///{tmp_path / 'fresh.db'}", str(tmp_path / 'schema.lock')
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_prepare, args=(url, lock)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert [p.exitcode for p in procs] == [0, 0, 0, 0]
+    engine = database.make_engine(url)
+    assert 'devices' in inspect(engine).get_table_names()
+    assert database.prepare_schema(engine, lock) == []
+    engine.dispose()
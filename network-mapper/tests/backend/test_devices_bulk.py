@@ -0,0 +1,67 @@
+import json
+
+from backend import app as app_module
+from backend.models import Audit
+
+
+def _create(client, **payload):
+    payload.setdefault('device_type', 'ap')
+    r = client.post('/api/devices', data=json.dumps(payload), content_type='application/json')
+    return r.get_json()['id']
+
+
+def _send(client, method, url, body):
+    return client.open(url, method=method, data=json.dumps(body), content_type='application/json')
+
+
+def test_bulk_patch_moves_group_and_returns_prior_state(client):
+    ids = [_create(client, name=f'Bulk AP {i}', x=0.1 * i, y=0.2, floorplan_id=9501) for i in range(3)]
+    r = _send(client, 'PATCH', '/api/devices/bulk', {'changes': [{'id': i, 'x': 0.5, 'y': 0.6} for i in ids]})
+    assert r.status_code == 200
+    j = r.get_json()
+    assert j['count'] == 3
+    assert [p['id'] for p in j['prev']] == ids
+    assert [p['x'] for p in j['prev']] == [0.0, 0.1, 0.2]
+    for i in ids:
+        d = client.get(f'/api/devices/{i}').get_json()
+        assert (d['x'], d['y'], d['name']) == (0.5, 0.6, d['name'])
+
+    # undo is the same call with the returned prior values
+    _send(client, 'PATCH', '/api/devices/bulk', {'changes': [{'id': p['id'], 'x': p['x'], 'y': p['y']} for p in j['prev']]})
+    assert client.get(f'/api/devices/{ids[2]}').get_json()['x'] == 0.2
+
+
+def test_bulk_patch_is_all_or_nothing(client):
+    a = _create(client, name='Bulk Keep', device_type='switch')
+    r = _send(client, 'PATCH', '/api/devices/bulk', {'changes': [{'id': a, 'device_type': 'camera'}, {'id': 99999999, 'device_type': 'camera'}]})
+    assert r.status_code == 404
+    assert r.get_json()['ids'] == [99999999]
+    assert client.get(f'/api/devices/{a}').get_json()['device_type'] == 'switch'
+    assert _send(client, 'PATCH', '/api/devices/bulk', {'changes': []}).status_code == 400
+    assert _send(client, 'PATCH', '/api/devices/bulk', {'changes': [{'x': 1}]}).status_code == 400
+
+
+def test_bulk_delete_then_restore_preserves_ids(client):
+    ids = [_create(client, name=f'Bulk Del {i}', floorplan_id=9502, mac=f'00:00:00:00:95:0{i}') for i in range(3)]
+    r = _send(client, 'DELETE', '/api/devices/bulk', {'ids': ids})
+    assert r.status_code == 200
+    snaps = r.get_json()['snapshots']
+    assert [s['id'] for s in snaps] == ids
+    assert all(client.get(f'/api/devices/{i}').status_code == 404 for i in ids)
+
+    r = _send(client, 'POST', '/api/devices/bulk/restore', {'snapshots': snaps})
+    assert r.status_code == 200
+    restored = r.get_json()['restored']
+    assert [x['id'] for x in restored] == ids
+    assert all(x['preservedId'] for x in restored)
+    assert client.get(f'/api/devices/{ids[1]}').get_json()['mac'] == '00:00:00:00:95:01'
+    session = app_module.SessionLocal()
+    try:
+        assert session.query(Audit).filter(Audit.action == 'restore', Audit.restored_id.in_(ids)).count() == 3
+    finally:
+        session.close()
+
+    # restoring again can't reuse the ids, so new rows are created
+    again = _send(client, 'POST', '/api/devices/bulk/restore', {'snapshots': snaps[:1]}).get_json()['restored'][0]
+    assert again['preservedId'] is False
+    assert again['id'] != ids[0]
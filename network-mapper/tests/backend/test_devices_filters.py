@@ -0,0 +1,38 @@
+import json
+
+
+def _create(client, **payload):
+    payload.setdefault('device_type', 'switch')
+    r = client.post('/api/devices', data=json.dumps(payload), content_type='application/json')
+    return r.get_json()['id']
+
+
+def test_filters_by_floorplan_type_ip_prefix_and_text(client):
+    a = _create(client, name='Filter AP 1', device_type='ap', ip='10.40.1.5', floorplan_id=9401, room='Gym')
+    b = _create(client, name='Filter Switch', device_type='switch', ip='10.40.2.1', floorplan_id=9401)
+    c = _create(client, name='Filter AP 2', device_type='ap', ip='10.41.1.5', floorplan_id=9402)
+
+    ids = lambda r: {d['id'] for d in r.get_json()}
+    assert ids(client.get('/api/devices?floorplan_id=9401')) == {a, b}
+    assert ids(client.get('/api/devices?floorplan_id=9401&device_type=ap')) == {a}
+    assert {a, b} <= ids(client.get('/api/devices?ip=10.40.'))
+    assert c not in ids(client.get('/api/devices?ip=10.40.'))
+    assert ids(client.get('/api/devices?q=gym')) == {a}
+    # LIKE wildcards in user input are matched literally
+    assert ids(client.get('/api/devices?q=Filter%25AP')) == set()
+
+
+def test_keyset_pagination_walks_all_rows(client):
+    created = [_create(client, name=f'Page {i}', floorplan_id=9403) for i in range(5)]
+    seen = []
+    after = None
+    while True:
+        url = '/api/devices?floorplan_id=9403&limit=2' + (f'&after_id={after}' if after else '')
+        r = client.get(url)
+        page = r.get_json()
+        assert len(page) <= 2
+        seen += [d['id'] for d in page]
+        after = r.headers.get('X-Next-After-Id')
+        if not after:
+            break
+    assert seen == created
@@ -0,0 +1,85 @@
+import io
+import json
+
+from sqlalchemy import event
+
+from backend import app as app_module
+
+
+def _post(client, url, payload):
+    return client.post(url, data=json.dumps(payload), content_type='application/json')
+
+
+def test_buildings_etag_revalidates_and_changes_on_write(client):
+    _post(client, '/api/buildings', {'name': 'ETag Hall'})
+    r = client.get('/api/buildings')
+    tag = r.headers['ETag']
+    assert not tag.startswith('W/')
+    assert r.headers['Cache-Control'] == 'no-cache'
+
+    r304 = client.get('/api/buildings', headers={'If-None-Match': tag})
+    assert r304.status_code == 304
+    assert r304.data == b''
+    assert r304.headers['ETag'] == tag
+
+    _post(client, '/api/buildings', {'name': 'ETag Annex'})
+    r2 = client.get('/api/buildings', headers={'If-None-Match': tag})
+    assert r2.status_code == 200
+    assert r2.headers['ETag'] != tag
+    assert any(b['name'] == 'ETag Annex' for b in r2.get_json())
+
+
+def test_not_modified_devices_list_reads_only_the_counter(client):
+    _post(client, '/api/devices', {'name': 'ETag Dev', 'device_type': 'ap', 'floorplan_id': 9601})
+    tag = client.get('/api/devices?floorplan_id=9601').headers['ETag']
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app_module.engine, 'before_cursor_execute', record)
+    try:
+        r = client.get('/api/devices?floorplan_id=9601', headers={'If-None-Match': tag})
+    finally:
+        event.remove(app_module.engine, 'before_cursor_execute', record)
+    assert r.status_code == 304
+    assert statements and all('table_versions' in s for s in statements)
+
+
+def test_devices_etag_moves_on_bulk_and_import_writes(client):
+    dev = _post(client, '/api/devices', {'name': 'ETag Bulk', 'device_type': 'ap'}).get_json()['id']
+    tag1 = client.get('/api/devices').headers['ETag']
+    client.open('/api/devices/bulk', method='PATCH', data=json.dumps({'changes': [{'id': dev, 'x': 0.9}]}),
+                content_type='application/json')
+    tag2 = client.get('/api/devices').headers['ETag']
+    assert tag2 != tag1
+    # Core bulk inserts from the importer count as writes too
+    client.post('/api/devices/import', data={'file': (io.BytesIO(b'name\nETag Imported\n'), 'e.csv'), 'wait': '1'},
+                content_type='multipart/form-data')
+    tag3 = client.get('/api/devices').headers['ETag']
+    assert tag3 != tag2
+    # writes to other tables leave the devices ETag alone
+    _post(client, '/api/buildings', {'name': 'ETag Elsewhere'})
+    assert client.get('/api/devices').headers['ETag'] == tag3
+
+
+def test_rolled_back_write_keeps_etag(client):
+    _post(client, '/api/buildings', {'name': 'ETag Rollback'})
+    tag = client.get('/api/buildings').headers['ETag']
+    session = app_module.SessionLocal()
+    try:
+        from backend.models import Building
+        session.add(Building(name='ETag Never'))
+        session.flush()
+        session.rollback()
+    finally:
+        session.close()
+    assert client.get('/api/buildings', headers={'If-None-Match': tag}).status_code == 304
+
+
+def test_icons_list_etag(client):
+    r = client.get('/api/icons/list')
+    tag = r.headers.get('ETag')
+    if tag is None:  # no icons directory in this checkout
+        return
+    assert client.get('/api/icons/list', headers={'If-None-Match': tag}).status_code == 304
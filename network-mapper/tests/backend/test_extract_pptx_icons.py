@@ -0,0 +1,76 @@
+import csv
+import hashlib
+import os
+import zipfile
+
+from scripts import extract_pptx_icons
+
+PIC = ('<p:pic><p:nvPicPr><p:cNvPr id="{n}" name="Picture {n}" descr="{desc}"/></p:nvPicPr>'
+       '<p:blipFill><a:blip r:embed="{rid}"/></p:blipFill></p:pic>')
+
+
+def _deck(path, slides, media):
+    """Minimal .pptx: `slides` maps slide number -> [(rId, media name, description)]."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in media.items():
+            z.writestr(f'ppt/media/{name}', data)
+        for number, pictures in slides.items():
+            pics = ''.join(PIC.format(n=i, desc=desc, rid=rid) for i, (rid, _m, desc) in enumerate(pictures))
+            z.writestr(f'ppt/slides/slide{number}.xml', (
+                '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+                'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                f'<p:cSld><p:spTree>{pics}</p:spTree></p:cSld></p:sld>'))
+            rels = ''.join(f'<Relationship Id="{rid}" Target="../media/{m}"/>' for rid, m, _d in pictures)
+            z.writestr(f'ppt/slides/_rels/slide{number}.xml.rels',
+                       f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+
+
+def test_extract_merges_decks_and_dedups_media(tmp_path):
+    first, second, out = tmp_path / 'library.pptx', tmp_path / 'extra.pptx', tmp_path / 'from-pptx'
+    _deck(first, {
+        10: [('rId2', 'image2.png', r'C:\Temp\Router_default_64.png')],
+        2: [('rId2', 'image1.png', r'C:\Temp\Router_default_64.png'),
+            ('rId3', 'image3.png', 'Switch Default 64.png'),
+            ('rId4', 'missing.png', 'gone.png')],
+    }, {'image1.png': b'router', 'image2.png': b'router v2', 'image3.png': b'switch'})
+    _deck(second, {1: [('rId2', 'image9.png', 'Router_default_64.png'),  # same picture as deck 1
+                       ('rId3', 'image9.png', 'Router alias.png')]},
+          {'image9.png': b'router'})
+    out.mkdir()
+    (out / 'router_default_64.png.png').write_bytes(b'left over from an earlier run')
+
+    rows = extract_pptx_icons.extract([first, second], out, jobs=2)
+    # slides in numeric order, then the second deck
+    assert [(r['deck'], r['slide'], r['out'].rsplit('/', 1)[-1]) for r in rows] == [
+        ('library.pptx', 'ppt/slides/slide2.xml', 'router_default_64.png.png'),
+        ('library.pptx', 'ppt/slides/slide2.xml', 'switch_default_64.png.png'),
+        ('library.pptx', 'ppt/slides/slide10.xml', 'router_default_64.png_1.png'),
+        ('extra.pptx', 'ppt/slides/slide1.xml', 'router_default_64.png.png'),
+        ('extra.pptx', 'ppt/slides/slide1.xml', 'router_alias.png.png'),
+    ]
+    assert rows[0]['src'] == 'ppt/media/image1.png'
+    assert (out / 'router_default_64.png.png').read_bytes() == b'router'
+    assert (out / 'router_default_64.png_1.png').read_bytes() == b'router v2'
+    assert (out / 'router_alias.png.png').read_bytes() == b'router'
+    assert sorted(p.name for p in out.iterdir()) == [
+        'mapping.csv', 'router_alias.png.png', 'router_default_64.png.png',
+        'router_default_64.png_1.png', 'switch_default_64.png.png']
+
+    with open(out / 'mapping.csv', newline='') as fh:
+        mapping = list(csv.DictReader(fh))
+    assert mapping == rows
+    # a second run gives the same result
+    assert extract_pptx_icons.extract([first, second], out, jobs=1) == rows
+
+
+def test_parallel_workers_read_large_members_intact(tmp_path):
+    # workers must not share the parent's archive handle (and its file offset)
+    deck, out = tmp_path / 'big.pptx', tmp_path / 'from-pptx'
+    media = {f'image{i}.png': os.urandom(64 * 1024) + bytes(64 * 1024) for i in range(120)}
+    _deck(deck, {1: [(f'rId{i}', name, f'icon {i}.png') for i, name in enumerate(media)]}, media)
+    rows = extract_pptx_icons.extract([deck], out, jobs=8)
+    assert len(rows) == len(media)
+    for i, row in enumerate(rows):
+        written = (out / row['out'].rsplit('/', 1)[-1]).read_bytes()
+        assert hashlib.sha256(written).digest() == hashlib.sha256(media[f'image{i}.png']).digest()
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+PIL = pytest.importorskip('PIL.Image')
+
+
+def _png(width, height, color=(200, 30, 30)):
+    buf = io.BytesIO()
+    PIL.new('RGB', (width, height), color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _upload(client, data, filename):
+    r = client.post('/api/floorplans', data={'file': (io.BytesIO(data), filename), 'building': 'Tile Hall'},
+                    content_type='multipart/form-data')
+    assert r.status_code == 200
+    return r.get_json()['id']
+
+
+def _floorplan(client, fp_id):
+    return next(f for f in client.get('/api/floorplans').get_json() if f['id'] == fp_id)
+
+
+def test_upload_builds_pyramid_and_preview(client):
+    fp_id = _upload(client, _png(700, 300), 'tiles_700x300.png')
+    fp = _floorplan(client, fp_id)
+    assert (fp['width'], fp['height']) == (700, 300)
+    # 700px needs levels of 700, 350 and 175 px to get down to one 256px tile
+    assert fp['tiles']['maxZoom'] == 2
+    assert fp['tiles']['tileSize'] == 256
+
+    r = client.get(fp['tiles']['url'].format(z=2, x=2, y=1))
+    assert r.status_code == 200
+    assert 'immutable' in r.headers['Cache-Control']
+    edge = PIL.open(io.BytesIO(r.data))
+    assert edge.size == (700 - 512, 300 - 256)
+    top = PIL.open(io.BytesIO(client.get(fp['tiles']['url'].format(z=0, x=0, y=0)).data))
+    assert top.size == (175, 75)
+    assert client.get(fp['tiles']['url'].format(z=2, x=3, y=0)).status_code == 404
+
+    preview = client.get(fp['tiles']['preview'])
+    assert preview.status_code == 200
+    assert PIL.open(io.BytesIO(preview.data)).size == (700, 300)
+
+
+def test_non_raster_upload_is_stored_untiled(client):
+    fp_id = _upload(client, b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>', 'tiles_plan.svg')
+    assert _floorplan(client, fp_id)['tiles'] is None
+
+
+def test_oversized_plan_is_refused_before_decoding(tmp_path, monkeypatch):
+    from backend import tiles
+    src = tmp_path / 'big.png'
+    src.write_bytes(_png(600, 400))
+    monkeypatch.setattr(tiles, 'MAX_PIXELS', 600 * 400 - 1)
+
+    decoded = []
+    from PIL import ImageFile
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', lambda self: decoded.append(self))
+    assert tiles.build_pyramid(str(src), str(tmp_path / 'tiles' / 'big')) is None
+    assert decoded == []
+
+
+def test_concurrent_builds_of_one_plan(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from backend import tiles
+    src = tmp_path / 'plan.png'
+    src.write_bytes(_png(900, 500))
+    out = tmp_path / 'tiles' / 'plan'
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: tiles.build_pyramid(str(src), str(out)), range(4)))
+    assert results == [{'width': 900, 'height': 500, 'maxZoom': 2}] * 4
+    # one complete pyramid, and no build's temporary directory left behind
+    assert sorted(p.name for p in (tmp_path / 'tiles').iterdir()) == ['plan']
+    assert sorted(p.name for p in (out / '2').iterdir()) == [f'{x}_{y}.png' for x in range(4) for y in range(2)]
@@ -0,0 +1,75 @@
+import hashlib
+import io
+import os
+import struct
+import zlib
+
+from backend import storage
+
+
+def _png(width, height):
+    """Minimal valid greyscale PNG (built by hand so the test doesn't need Pillow)."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    raw = b''.join(b'\x00' + b'\x80' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def _upload(client, data, filename, building='Upload Hall'):
+    r = client.post('/api/floorplans', data={'file': (io.BytesIO(data), filename), 'building': building},
+                    content_type='multipart/form-data')
+    assert r.status_code == 200
+    return r.get_json()
+
+
+def test_upload_is_content_addressed_with_dimensions(client):
+    data = _png(37, 21)
+    digest = hashlib.sha256(data).hexdigest()
+    j = _upload(client, data, '../../plans/Level 1.PNG')
+    assert j['filename'] == 'Level 1.PNG'
+    assert (j['hash'], j['url']) == (digest, f'/uploads/{digest}.png')
+    assert (j['width'], j['height'], j['duplicate']) == (37, 21, False)
+    assert os.path.exists(os.path.join(storage.UPLOAD_FOLDER, f'{digest}.png'))
+
+    listed = next(f for f in client.get('/api/floorplans').get_json() if f['id'] == j['id'])
+    assert (listed['url'], listed['width'], listed['height']) == (j['url'], 37, 21)
+
+    r = client.get(j['url'])
+    assert r.status_code == 200
+    assert r.data == data
+    assert r.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+def test_reupload_is_deduplicated(client):
+    data = _png(12, 8)
+    first = _upload(client, data, 'plan-a.png', building='Dedup Hall')
+    again = _upload(client, data, 'plan-a-copy.png', building='Dedup Hall')
+    assert again['id'] == first['id']
+    assert again['duplicate'] is True
+    # another building gets its own floorplan row but shares the stored file
+    other = _upload(client, data, 'plan-a.png', building='Dedup Annex')
+    assert other['id'] != first['id']
+    assert other['url'] == first['url']
+    stored = [n for n in os.listdir(storage.UPLOAD_FOLDER) if n.startswith(first['hash'])]
+    assert stored == [first['hash'] + '.png']
+
+
+def test_image_size_reads_headers_only(tmp_path):
+    gif = tmp_path / 'plan.gif'
+    gif.write_bytes(b'GIF89a' + struct.pack('<HH', 640, 480) + b'\x00' * 8)
+    jpeg = tmp_path / 'plan.jpg'
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, 1200, 1600, 1) + b'\x01\x11\x00'
+    jpeg.write_bytes(b'\xff\xd8' + app0 + sof0 + b'\xff\xda')  # no image data needed
+    png = tmp_path / 'plan.png'
+    png.write_bytes(_png(3, 2)[:40])  # truncated after IHDR
+    assert storage.image_size(str(gif)) == (640, 480)
+    assert storage.image_size(str(jpeg)) == (1600, 1200)
+    assert storage.image_size(str(png)) == (3, 2)
+    assert storage.image_size(str(tmp_path / 'missing.png')) is None
+
+
+def test_tile_routes_reject_bad_keys(client):
+    assert client.get('/api/tiles/..%2F..%2Fuploads/preview.png').status_code == 404
+    assert client.get('/api/tiles/not-a-key/preview.png').status_code == 404
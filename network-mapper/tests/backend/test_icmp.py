@@ -0,0 +1,34 @@
+import struct
+
+import pytest
+
+from backend import icmp, probe
+
+
+def test_echo_request_checksum_verifies():
+    packet = icmp.build_echo(0x1234, 7)
+    assert icmp.checksum(packet) == 0
+    assert icmp.parse_reply(packet) == (icmp.ICMP_ECHO_REQUEST, 0x1234, 7)
+
+
+def test_parse_reply_strips_ipv4_header():
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 48, 0, 0, 64, 1, 0, b'\x7f\0\0\x01', b'\x7f\0\0\x01')
+    reply = struct.pack('!BBHHH', icmp.ICMP_ECHO_REPLY, 0, 0, 42, 9) + icmp.PAYLOAD
+    assert icmp.parse_reply(ip_header + reply) == (icmp.ICMP_ECHO_REPLY, 42, 9)
+    assert icmp.parse_reply(b'\x00\x01') is None
+
+
+def test_engine_falls_back_to_subprocess(monkeypatch):
+    monkeypatch.setattr(icmp, '_available', False)
+    assert probe.resolve_engine('auto') == 'subprocess'
+    assert probe.resolve_engine('socket') == 'subprocess'
+    assert probe.resolve_engine('subprocess') == 'subprocess'
+
+
+@pytest.mark.skipif(not icmp.available(), reason="ICMP sockets not permitted (see net.ipv4.ping_group_range)")
+def test_socket_engine_pings_loopback():
+    res = probe.probe_target('127.0.0.1', engine='socket')
+    assert res['success'] is True
+    assert isinstance(res['time'], float)
+    results = dict(probe.sweep(((i, '127.0.0.1') for i in range(50)), engine='socket'))
+    assert len(results) == 50 and all(r['success'] for r in results.values())
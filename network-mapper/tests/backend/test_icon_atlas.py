@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+from scripts import build_icon_atlas  # noqa: E402
+
+
+def test_atlas_packs_icons_into_pages_with_offsets(tmp_path):
+    src, dst = tmp_path / 'standard', tmp_path / 'atlas'
+    src.mkdir()
+    colors = {}
+    for i in range(5):
+        name = f'3000{i}_device_access_point_critical_64.png'
+        colors[name] = (40 * i, 10, 200, 255)
+        Image.new('RGBA', (64, 64), colors[name]).save(src / name)
+    Image.new('RGBA', (32, 16), (1, 2, 3, 255)).save(src / 'small.png')
+    (src / 'mapping_normalized.csv').write_text('src,out\n')
+
+    index = build_icon_atlas.build(src, dst, cell=64, columns=2, rows=2)
+    assert [p['url'].split('?v=')[0] for p in index['pages']] == ['/icons/atlas/page-0.png', '/icons/atlas/page-1.png']
+    assert (index['pages'][1]['width'], index['pages'][1]['height']) == (128, 64)
+    assert len(index['icons']) == 6
+    entry = index['icons'][3]
+    assert (entry['page'], entry['x'], entry['y']) == (0, 64, 64)
+    assert entry['tags'] == ['access', 'point', 'critical']
+
+    page = Image.open(dst / 'page-0.png')
+    assert page.getpixel((64 + 10, 64 + 10)) == colors[entry['name']]
+    # smaller icons are centred in their cell
+    small = next(e for e in index['icons'] if e['name'] == 'small.png')
+    page1 = Image.open(dst / 'page-1.png')
+    assert page1.getpixel((small['x'] + 32, small['y'] + 32)) == (1, 2, 3, 255)
+    assert page1.getpixel((small['x'] + 2, small['y'] + 2))[3] == 0
+
+    assert json.loads((dst / 'index.json').read_text())['sourceDigest'] == index['sourceDigest']
+    assert build_icon_atlas.build(src, dst, cell=64, columns=2, rows=2) is None  # unchanged: skipped
@@ -0,0 +1,82 @@
+import os
+import time
+
+from backend import icon_catalog
+
+
+def _library(tmp_path, names, descs=None):
+    icons = tmp_path / 'standard'
+    icons.mkdir()
+    for n in names:
+        (icons / n).write_bytes(b'')
+    mapping = tmp_path / 'mapping.csv'
+    lines = ['slide,rId,src,desc,out']
+    for out, desc in (descs or {}).items():
+        lines.append(f'ppt/slides/slide1.xml,rId2,ppt/media/image1.png,C:\\Temp\\{desc},scripts/../frontend/icons/from-pptx/{out}.png')
+    mapping.write_text('\n'.join(lines) + '\n')
+    return str(icons), str(mapping)
+
+
+def test_search_ranks_exact_then_prefix_then_typos(tmp_path):
+    icons, mapping = _library(tmp_path, [
+        '30010_device_router_default_64.png',
+        '30011_device_router_critical_16.png',
+        '30012_device_routerswitch_default_64.png',
+        '30013_device_reuter_default_64.png',
+        'mcu_default_64.png',
+        'mapping_normalized.csv',
+    ], descs={'mcu_default_64.png': 'media control unit_default_64.png'})
+    catalog = icon_catalog.build_catalog(icons, mapping)
+    assert len(catalog) == 5
+
+    total, items = catalog.search('router')
+    assert total == 4
+    assert [i['name'] for i in items] == [
+        '30010_device_router_default_64.png',    # exact, default state, 64 px
+        '30011_device_router_critical_16.png',   # exact
+        '30012_device_routerswitch_default_64.png',  # prefix
+        '30013_device_reuter_default_64.png',    # one edit away
+    ]
+    assert items[0]['label'] == 'Router'
+    # every term has to match
+    assert catalog.search('router critical')[0] == 1
+    # words only found in the library's description column
+    total, items = catalog.search('media contr')
+    assert (total, items[0]['name']) == (1, 'mcu_default_64.png')
+    assert catalog.search('zzzz') == (0, [])
+
+    total, page = catalog.search('router', offset=1, limit=2)
+    assert total == 4
+    assert [i['name'] for i in page] == ['30011_device_router_critical_16.png', '30012_device_routerswitch_default_64.png']
+    assert catalog.search('', limit=2)[0] == 5
+
+
+def test_catalog_rebuilds_when_library_changes(tmp_path):
+    icons, mapping = _library(tmp_path, ['firewall_default_64.png'])
+    first = icon_catalog.get_catalog(icons, mapping)
+    assert icon_catalog.get_catalog(icons, mapping) is first
+    new_icon = os.path.join(icons, 'gateway_default_64.png')
+    open(new_icon, 'wb').close()
+    st = os.stat(icons)
+    os.utime(icons, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # filesystems with coarse mtimes
+    second = icon_catalog.get_catalog(icons, mapping)
+    assert second is not first
+    assert second.search('gateway')[0] == 1
+
+
+def test_search_endpoint_over_whole_library(client):
+    r = client.get('/api/icons/search?q=access%20point&limit=5')
+    assert r.status_code == 200
+    j = r.get_json()
+    assert j['total'] > 5 and len(j['items']) == 5
+    assert 'access' in j['items'][0]['tags'] and 'point' in j['items'][0]['tags']
+    assert client.get('/api/icons/search?q=access%20point&limit=5',
+                      headers={'If-None-Match': r.headers['ETag']}).status_code == 304
+    assert client.get('/api/icons/search?q=acess%20piont').get_json()['total'] > 0
+
+    catalog = icon_catalog.get_catalog()
+    started = time.perf_counter()
+    for q in ('a', 'switch', 'router critical', 'acces pont', 'media control unit', 'zz'):
+        catalog.search(q, 0, 50)
+    # generous bound for slow CI machines; typically well under 1 ms per query
+    assert (time.perf_counter() - started) / 6 < 0.01
@@ -0,0 +1,120 @@
+import io
+
+from backend import app as app_module
+from backend import importer
+from backend.models import Building, Device
+
+
+def _upload(client, data, name='devices.csv', **form):
+    form.setdefault('wait', '1')
+    return client.post('/api/devices/import', data={'file': (io.BytesIO(data), name), **form},
+                       content_type='multipart/form-data')
+
+
+def test_import_requires_file(client):
+    r = client.post('/api/devices/import', data={}, content_type='multipart/form-data')
+    assert r.status_code == 400
+
+
+def test_import_sample_rows_and_reuses_buildings(client):
+    data = (b'name,ip,type,building\n'
+            b'Imp Switch,10.60.0.1,switch,Import Hall\n'
+            b'Imp AP,10.60.0.2,ap,Import Hall\n'
+            b'Imp Loose,10.60.0.3,,\n')
+    r = _upload(client, data)
+    assert r.status_code == 200
+    j = r.get_json()
+    assert j['status'] == 'done'
+    assert (j['created'], j['updated'], j['unchanged'], j['errorCount'], j['errors']) == (3, 0, 0, 0, [])
+    session = app_module.SessionLocal()
+    try:
+        halls = session.query(Building).filter_by(name='Import Hall').all()
+        assert len(halls) == 1
+        devs = {d.name: d for d in session.query(Device).filter(Device.name.like('Imp %'))}
+        assert devs['Imp AP'].building_id == halls[0].id
+        assert devs['Imp Loose'].building_id is None
+        assert devs['Imp Loose'].device_type == 'unknown'
+    finally:
+        session.close()
+
+
+def test_import_reports_bad_rows_without_aborting(client):
+    data = (b'\xef\xbb\xbfname,ip,type,building\n'
+            b'Row Ok 1,10.61.0.1,switch,\n'
+            b'Row Extra,10.61.0.2,switch,,surplus\n'
+            b'Row \xff\xfe,10.61.0.3,ap,\n'
+            b'"Row\nOk 2",10.61.0.4,ap,\n')
+    j = _upload(client, data).get_json()
+    assert j['created'] == 2
+    assert j['errorCount'] == 2
+    assert j['errors'] == [{'line': 3, 'error': 'too-many-fields'}, {'line': 4, 'error': 'invalid-utf8'}]
+
+
+def test_import_large_csv_in_batches(devices_csv):
+    session = app_module.SessionLocal()
+    try:
+        result = importer.import_csv(session, io.BytesIO(devices_csv(5000, buildings=7, prefix='Batch')), batch_size=333)
+        assert result['created'] == 5000
+        assert session.query(Building).filter(Building.name.like('Batch Building %')).count() == 7
+        assert session.query(Device).filter(Device.name.like('Batch %')).count() == 5000
+    finally:
+        session.close()
+
+
+def test_upsert_by_mac_is_idempotent(client):
+    data = (b'name,ip,type,building,mac\n'
+            b'Ups Core,10.62.0.1,switch,Upsert Hall,00:11:22:33:62:01\n'
+            b'Ups AP,10.62.0.2,ap,Upsert Hall,00:11:22:33:62:02\n')
+    first = _upload(client, data, mode='upsert', key='mac').get_json()
+    assert (first['created'], first['updated'], first['unchanged']) == (2, 0, 0)
+    again = _upload(client, data, mode='upsert', key='mac').get_json()
+    assert (again['created'], again['updated'], again['unchanged']) == (0, 0, 2)
+
+    # different notation of the same MAC matches; only the changed column is written
+    changed = (b'name,ip,type,building,mac\n'
+               b'Ups Core,10.62.0.10,switch,Upsert Hall,00-11-22-33-62-01\n'
+               b'Ups New,10.62.0.3,phone,Upsert Hall,00:11:22:33:62:03\n'
+               b'Ups Dup,10.62.0.4,phone,Upsert Hall,00:11:22:33:62:03\n'
+               b'Ups NoMac,10.62.0.5,phone,Upsert Hall,\n')
+    j = _upload(client, changed, mode='upsert', key='mac').get_json()
+    assert (j['created'], j['updated'], j['unchanged']) == (1, 1, 0)
+    assert j['errors'] == [{'line': 4, 'error': 'duplicate-key'}, {'line': 5, 'error': 'missing-key'}]
+    session = app_module.SessionLocal()
+    try:
+        core = session.query(Device).filter_by(name='Ups Core').all()
+        assert len(core) == 1
+        assert core[0].ip == '10.62.0.10'
+    finally:
+        session.close()
+
+
+def test_upsert_by_ip_building_keeps_columns_missing_from_csv(client):
+    _upload(client, b'name,ip,type,building,room\nIpb One,10.63.0.1,ap,IPB Hall,101\n')
+    j = _upload(client, b'ip,building,type\n10.63.0.1,IPB Hall,camera\n10.63.0.1,Other Hall,camera\n',
+                mode='upsert', key='ip_building').get_json()
+    assert (j['created'], j['updated']) == (1, 1)
+    session = app_module.SessionLocal()
+    try:
+        d = session.query(Device).filter_by(ip='10.63.0.1', name='Ipb One').one()
+        assert (d.device_type, d.room) == ('camera', '101')
+    finally:
+        session.close()
+
+
+def test_upsert_rejects_bad_parameters(client):
+    assert _upload(client, b'name\nx\n', mode='merge').status_code == 400
+    assert _upload(client, b'name\nx\n', mode='upsert', key='serial').status_code == 400
+    r = _upload(client, b'name\nx\n', mode='upsert', key='mac')
+    assert r.status_code == 400
+    assert r.get_json()['error'] == 'missing-key-column'
+
+
+def test_upsert_resync_of_large_csv(devices_csv):
+    data = devices_csv(5000, buildings=5, prefix='Sync')
+    session = app_module.SessionLocal()
+    try:
+        importer.import_csv(session, io.BytesIO(data), mode='upsert', key='name_building')
+        result = importer.import_csv(session, io.BytesIO(data), mode='upsert', key='name_building')
+        assert (result['created'], result['updated'], result['unchanged']) == (0, 0, 5000)
+    finally:
+        session.close()
@@ -0,0 +1,108 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from backend import app as app_module
+from backend import jobs
+from backend.models import Device, ImportJob
+
+
+def _wait_done(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        j = client.get(f'/api/jobs/{job_id}').get_json()
+        if j['status'] in ('done', 'failed'):
+            return j
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still {j["status"]}')
+
+
+def test_import_returns_job_and_reports_progress(client, devices_csv):
+    data = devices_csv(3000, buildings=3, prefix='Job')
+    r = client.post('/api/devices/import', data={'file': (io.BytesIO(data), 'job.csv')},
+                    content_type='multipart/form-data')
+    assert r.status_code == 202
+    job_id = r.get_json()['jobId']
+    assert r.headers['Location'] == f'/api/jobs/{job_id}'
+
+    j = _wait_done(client, job_id)
+    assert j['status'] == 'done'
+    assert (j['rowsProcessed'], j['created'], j['errorCount']) == (3000, 3000, 0)
+    assert j['bytesProcessed'] == j['totalBytes'] == len(data)
+    assert j['filename'] == 'job.csv'
+    assert j['rowsPerSecond'] > 0
+    assert j['etaSeconds'] == 0
+
+
+def test_unknown_job_is_404(client):
+    assert client.get('/api/jobs/987654').status_code == 404
+
+
+def test_abandoned_job_resumes_after_committed_rows(client):
+    data = (b'name,ip,type\n'
+            b'Resume 1,10.64.0.1,ap\n'
+            b'Resume 2,10.64.0.2,ap\n'
+            b'Resume 3,10.64.0.3,ap\n'
+            b'Resume 4,10.64.0.4,ap\n')
+    job_id = jobs.create_job(app_module.SessionLocal, io.BytesIO(data), filename='resume.csv')
+    session = app_module.SessionLocal()
+    try:
+        # state a worker leaves behind after committing the first two rows and dying
+        session.add_all([Device(name='Resume 1', ip='10.64.0.1', device_type='ap'),
+                         Device(name='Resume 2', ip='10.64.0.2', device_type='ap')])
+        job = session.get(ImportJob, job_id)
+        path = job.path
+        job.status = 'running'
+        job.rows_done = 2
+        job.created_rows = 2
+        job.started = job.heartbeat = datetime.utcnow() - timedelta(seconds=jobs.IMPORT_JOB_STALE + 5)
+        session.commit()
+    finally:
+        session.close()
+
+    j = _wait_done(client, job_id)
+    assert (j['status'], j['rowsProcessed'], j['created']) == ('done', 4, 4)
+    assert not os.path.exists(path)
+    session = app_module.SessionLocal()
+    try:
+        names = [d.name for d in session.query(Device).filter(Device.name.like('Resume %'))]
+        assert sorted(names) == ['Resume 1', 'Resume 2', 'Resume 3', 'Resume 4']
+    finally:
+        session.close()
+
+
+def test_running_job_with_fresh_heartbeat_is_not_claimed_twice():
+    job_id = jobs.create_job(app_module.SessionLocal, io.BytesIO(b'name\nx\n'))
+    session = app_module.SessionLocal()
+    try:
+        assert jobs.claim(session, job_id)
+        assert not jobs.claim(session, job_id)
+        assert not jobs.is_abandoned(session.get(ImportJob, job_id))
+    finally:
+        session.close()
+
+
+def test_polling_a_job_queued_behind_another_submits_it_once(client, monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(jobs, '_executor', executor)
+    release = threading.Event()
+    executor.submit(release.wait, 10)  # a long import occupying the only worker
+    job_id = jobs.create_job(app_module.SessionLocal, io.BytesIO(b'name\nQueued Behind\n'))
+    session = app_module.SessionLocal()
+    try:
+        session.get(ImportJob, job_id).created = datetime.utcnow() - timedelta(seconds=jobs.IMPORT_JOB_STALE + 5)
+        session.commit()
+    finally:
+        session.close()
+    try:
+        jobs.submit(app_module.SessionLocal, job_id)
+        for _ in range(5):
+            assert client.get(f'/api/jobs/{job_id}').get_json()['status'] == 'queued'
+        assert executor._work_queue.qsize() == 1
+    finally:
+        release.set()
+    assert _wait_done(client, job_id)['status'] == 'done'
+    executor.shutdown()
@@ -0,0 +1,64 @@
+import datetime
+import json
+import math
+
+import pytest
+from flask import Flask
+
+from backend import app as app_module
+from backend import fastjson
+
+
+def rows_from_columns(body):
+    cols = body['columns']
+    return [{f: cols[f][i] for f in cols} for i in range(body['count'])]
+
+
+def test_device_columns_match_rows(client):
+    b = client.post('/api/buildings', json={'name': 'Columnar Hall', 'lat': 3.5, 'lon': 4.5}).get_json()['id']
+    for i in range(5):
+        client.post('/api/devices', json={'name': f'col-{i}', 'ip': f'10.78.0.{i}', 'device_type': 'ap',
+                                          'building_id': b, 'x': 0.1 * i, 'y': 0.5, 'note': 'ü'})
+    rows = client.get(f'/api/devices?building_id={b}&limit=3')
+    cols = client.get(f'/api/devices?building_id={b}&limit=3&format=columns')
+    assert cols.status_code == 200 and cols.mimetype == 'application/json'
+    assert cols.get_json()['count'] == 3
+    assert rows_from_columns(cols.get_json()) == rows.get_json()
+    assert cols.headers['X-Next-After-Id'] == rows.headers['X-Next-After-Id']
+
+    after = cols.headers['X-Next-After-Id']
+    rest = client.get(f'/api/devices?building_id={b}&after_id={after}&format=columns').get_json()
+    assert rest['count'] == 2 and rest['columns']['name'] == ['col-3', 'col-4']
+
+    empty = client.get('/api/devices?building_id=999999&format=columns').get_json()
+    assert empty == {'count': 0, 'columns': {f: [] for f in app_module.DEVICE_FIELDS}}
+
+
+def test_building_and_floorplan_columns(client):
+    client.post('/api/buildings', json={'name': 'Columnar Annex'})
+    for path in ('/api/buildings', '/api/floorplans'):
+        assert rows_from_columns(client.get(path + '?format=columns').get_json()) == client.get(path).get_json()
+
+
+def test_provider_reports_engine(client):
+    assert client.get('/api/health').get_json()['json'] == app_module.app.json.name
+    assert fastjson.FastJSONProvider(app_module.app, 'stdlib').name == 'stdlib'
+
+
+@pytest.mark.skipif(fastjson.orjson is None, reason='orjson not installed')
+def test_orjson_output_matches_stdlib():
+    app = Flask(__name__)
+    fast, slow = fastjson.FastJSONProvider(app, 'auto'), fastjson.FastJSONProvider(app, 'stdlib')
+    obj = {'b': 1, 'a': [1.5, None, 'ü'], 'when': datetime.datetime(2024, 5, 1, 12, 30)}
+    assert fast.name == 'orjson'
+    assert json.loads(fast.dumps(obj)) == json.loads(slow.dumps(obj))
+    with app.app_context():
+        assert fast.response(obj).get_json() == slow.response(obj).get_json()
+    # wider than 64 bits: orjson refuses, the stdlib encoder takes over
+    assert fast.loads(fast.dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+    assert math.isnan(fast.loads('{"x": NaN}')['x'])
+
+
+def test_bad_json_body_is_rejected(client):
+    r = client.put('/api/devices/1', data='{"name": ', content_type='application/json')
+    assert r.status_code == 400
@@ -0,0 +1,137 @@
+import json
+from collections import Counter
+
+from backend import app as app_module
+from backend import live
+
+
+def make_devices(client, name, count=3):
+    b = client.post('/api/buildings', json={'name': name}).get_json()['id']
+    ips = [f'10.81.{b % 256}.{i + 1}' for i in range(count)]
+    ids = [client.post('/api/devices', json={'name': f'{name} {i}', 'ip': ip, 'device_type': 'ap',
+                                             'building_id': b}).get_json()['id'] for i, ip in enumerate(ips)]
+    return b, dict(zip(ips, ids))
+
+
+class FakeProbe:
+    def __init__(self, ips):
+        self.up = dict.fromkeys(ips, True)
+        self.calls = Counter()
+
+    def __call__(self, target):
+        self.calls[target] += 1
+        if self.up[target]:
+            return {"success": True, "time": "1", "error": None}
+        return {"success": False, "time": None, "error": "no-response"}
+
+
+def take(sub, n):
+    return [sub.get(timeout=5) for _ in range(n)]
+
+
+def test_subscribers_share_one_probe_round_and_get_only_transitions(client, tmp_path):
+    b, devices = make_devices(client, 'Live Hall')
+    fake = FakeProbe(devices)
+    hub = live.Hub(app_module.SessionLocal, probe_fn=fake, interval=3600, lock_dir=str(tmp_path))
+    first, second = hub.subscribe('building', b), hub.subscribe('building', b)
+    try:
+        assert list(hub.watches()) == [('building', b)]
+        for sub in (first, second):
+            events = take(sub, 4)
+            assert events[0] == ('snapshot', [])
+            assert {e[1]['device_id'] for e in events[1:]} == set(devices.values())
+            assert all(e[0] == 'status' and e[1]['up'] for e in events[1:])
+        assert set(fake.calls.values()) == {1}
+
+        down_ip = sorted(devices)[1]
+        fake.up[down_ip] = False
+        watch = hub.watches()[('building', b)]
+        assert [s['device_id'] for s in watch.cycle()] == [devices[down_ip]]
+        for sub in (first, second):
+            name, status = sub.get(timeout=5)
+            assert (name, status['device_id'], status['up']) == ('status', devices[down_ip], False)
+            assert sub.queue.empty()
+        assert set(fake.calls.values()) == {2}
+
+        # nothing changed: probed again, nothing sent
+        assert watch.cycle() == []
+        assert first.queue.empty()
+
+        # a late subscriber starts from the current state
+        late = hub.subscribe('building', b)
+        name, snapshot = late.get(timeout=5)
+        assert name == 'snapshot'
+        assert {s['device_id']: s['up'] for s in snapshot} == {d: ip != down_ip for ip, d in devices.items()}
+        hub.unsubscribe(late)
+    finally:
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+    assert hub.watches() == {}
+
+
+def test_other_processes_follow_the_prober(client, tmp_path):
+    b, devices = make_devices(client, 'Live Annex')
+    probing, following = FakeProbe(devices), FakeProbe(devices)
+    # two hubs stand in for two gunicorn workers: one wins the scope's lock file
+    leader = live.Hub(app_module.SessionLocal, probe_fn=probing, interval=3600, lock_dir=str(tmp_path))
+    follower = live.Hub(app_module.SessionLocal, probe_fn=following, interval=3600, lock_dir=str(tmp_path))
+    a = leader.subscribe('building', b)
+    take(a, 4)
+    z = follower.subscribe('building', b)
+    try:
+        name, snapshot = z.get(timeout=5)
+        assert name == 'snapshot' and {s['device_id'] for s in snapshot} == set(devices.values())
+
+        down_ip = sorted(devices)[0]
+        probing.up[down_ip] = False
+        leader.watches()[('building', b)].cycle()
+        follower.watches()[('building', b)].cycle()
+        name, status = z.get(timeout=5)
+        assert (name, status['device_id'], status['up']) == ('status', devices[down_ip], False)
+        assert not following.calls
+    finally:
+        leader.unsubscribe(a)
+        follower.unsubscribe(z)
+
+
+def test_status_stream_endpoint(client, fake_ping):
+    assert client.get('/api/status/stream').status_code == 400
+    assert client.get('/api/status/stream?floorplan_id=1&building_id=1').status_code == 400
+
+    b, devices = make_devices(client, 'Live Tower', count=2)
+    resp = client.get(f'/api/status/stream?building_id={b}', buffered=False)
+    try:
+        assert resp.status_code == 200
+        assert resp.mimetype == 'text/event-stream'
+        assert resp.headers['Cache-Control'] == 'no-cache'
+        chunks = resp.iter_encoded()
+        assert next(chunks).startswith(b'retry: ')
+        events = []
+        while len(events) < 3:
+            chunk = next(chunks).decode()
+            if chunk.startswith('event: '):
+                name, data = chunk.split('\n')[:2]
+                events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+        assert events[0][0] == 'snapshot'
+        assert {e[1]['device_id']: e[1]['up'] for e in events[1:]} == dict.fromkeys(devices.values(), True)
+    finally:
+        resp.close()
+    # closing the response unsubscribed the client and stopped the scope's watch
+    assert ('building', b) not in app_module.live_hub.watches()
+
+
+def test_stream_cap_answers_503(client, fake_ping, monkeypatch):
+    b, _devices = make_devices(client, 'Capped Tower', count=1)
+    monkeypatch.setattr(app_module.live_hub, 'max_streams', 1)
+    first = client.get(f'/api/status/stream?building_id={b}', buffered=False)
+    try:
+        assert first.status_code == 200
+        second = client.get(f'/api/status/stream?building_id={b}')
+        assert second.status_code == 503 and second.get_json()['error'] == 'too-many-streams'
+        assert second.headers['Retry-After'] == '30'
+    finally:
+        first.close()
+    # the closed stream freed its slot
+    again = client.get(f'/api/status/stream?building_id={b}', buffered=False)
+    assert again.status_code == 200
+    again.close()
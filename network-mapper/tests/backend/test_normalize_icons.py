@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+from scripts import normalize_icons  # noqa: E402
+
+
+def _icon(path, color, size=(128, 96)):
+    Image.new('RGBA', size, color).save(path)
+
+
+def test_normalize_is_incremental_and_deterministic(tmp_path):
+    src, dst = tmp_path / 'from-pptx', tmp_path / 'standard'
+    src.mkdir()
+    _icon(src / 'Router_default_64.png.png', (255, 0, 0, 255))
+    _icon(src / 'router_default_64.png', (0, 255, 0, 255))  # cleans to the same name
+    _icon(src / 'switch_default_64.png', (0, 0, 255, 255), size=(16, 16))
+    (src / 'mapping.csv').write_text('slide,rId,src,desc,out\n')
+
+    stats = normalize_icons.normalize(src, dst, jobs=2)
+    assert stats == {'rendered': 3, 'skipped': 0, 'removed': 0, 'failed': 0}
+    manifest = json.loads((dst / 'normalize_manifest.json').read_text())['sources']
+    sha = normalize_icons.file_sha256(src / 'router_default_64.png')
+    assert manifest[sha]['outputs'] == [f'router_default_64_{sha[:8]}.png']
+    assert (dst / 'router_default_64.png').exists()
+    with Image.open(dst / 'switch_default_64.png') as im:
+        assert im.size == (64, 64)
+        assert im.getpixel((32, 32)) == (0, 0, 255, 255)  # never scaled up, centred
+        assert im.getpixel((2, 2))[3] == 0
+    mapping = (dst / 'mapping_normalized.csv').read_text().splitlines()
+    assert len(mapping) == 4
+
+    # names don't depend on processing order
+    assert normalize_icons.output_names(reversed(list(manifest_pairs(src)))) == normalize_icons.output_names(manifest_pairs(src))
+
+    mtime = (dst / 'mapping_normalized.csv').stat().st_mtime_ns
+    assert normalize_icons.normalize(src, dst, jobs=1) == {'rendered': 0, 'skipped': 3, 'removed': 0, 'failed': 0}
+    assert (dst / 'mapping_normalized.csv').stat().st_mtime_ns == mtime
+
+    _icon(src / 'switch_default_64.png', (9, 9, 9, 255))
+    (src / 'Router_default_64.png.png').unlink()
+    stats = normalize_icons.normalize(src, dst, jobs=1)
+    # the changed icon, and the one that now gets the collision-free name
+    assert (stats['rendered'], stats['skipped']) == (2, 0)
+    assert stats['removed'] == 1
+    assert not (dst / f'router_default_64_{sha[:8]}.png').exists()
+
+
+def manifest_pairs(src):
+    return [(p.name, normalize_icons.file_sha256(p)) for p in sorted(src.glob('*.png'))]
+
+
+def test_extra_sizes_and_webp(tmp_path):
+    src, dst = tmp_path / 'from-pptx', tmp_path / 'standard'
+    src.mkdir()
+    _icon(src / 'ap_default_256.png', (10, 20, 30, 255), size=(256, 256))
+    assert normalize_icons.normalize(src, dst, sizes=[32, 128], webp=True, jobs=1)['rendered'] == 1
+    for rel, size in (('ap_default_256.png', 64), ('32/ap_default_256.png', 32), ('128/ap_default_256.webp', 128)):
+        with Image.open(dst / rel) as im:
+            assert im.size == (size, size)
+    # dropping a size removes its files
+    stats = normalize_icons.normalize(src, dst, sizes=[64], jobs=1)
+    assert stats['removed'] == 5
+    assert not (dst / '32' / 'ap_default_256.png').exists()
+
+
+def test_first_run_removes_numbered_copies_of_the_old_script(tmp_path):
+    src, dst = tmp_path / 'from-pptx', tmp_path / 'standard'
+    src.mkdir()
+    dst.mkdir()
+    _icon(src / 'router.png', (1, 2, 3, 255))
+    _icon(src / 'port_8.png', (4, 5, 6, 255))  # a real icon whose name looks numbered
+    for name in ('router.png', 'router_1.png', 'router_2.png', 'port.png', 'curated_1.png'):
+        _icon(dst / name, (0, 0, 0, 255))
+    stats = normalize_icons.normalize(src, dst, jobs=1)
+    assert (stats['rendered'], stats['removed']) == (2, 2)
+    # port.png and curated_1.png aren't numbered copies of an icon rendered now
+    assert sorted(p.name for p in dst.glob('*.png')) == ['curated_1.png', 'port.png', 'port_8.png', 'router.png']
+    # later runs only go by the manifest
+    _icon(dst / 'router_3.png', (0, 0, 0, 255))
+    assert normalize_icons.normalize(src, dst, jobs=1)['removed'] == 0
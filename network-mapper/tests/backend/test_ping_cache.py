@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import app as app_module
+from backend import pingcache
+from backend import probepool
+from backend import probe
+
+
+class SlowProbe:
+    def __init__(self, delay=0.3, result=None):
+        self.delay = delay
+        self.result = result or {"success": True, "time": "1", "error": None}
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, target, engine=None):
+        self.calls += 1
+        self.release.wait(5)
+        time.sleep(self.delay)
+        return dict(self.result)
+
+
+def test_concurrent_probes_of_one_target_are_coalesced(tmp_path):
+    fake = SlowProbe()
+    cache = pingcache.PingCache(fake, ttl=60, directory=str(tmp_path))
+    with ThreadPoolExecutor(8) as pool:
+        answers = list(pool.map(lambda _: cache.probe('10.3.0.1', 'subprocess'), range(8)))
+    assert fake.calls == 1
+    assert sorted(a['cached'] for a in answers) == [False] + [True] * 7
+    assert all(a['success'] is True and a['time'] == '1' for a in answers)
+
+    # other targets and engines are probed separately
+    cache.probe('10.3.0.2', 'subprocess')
+    cache.probe('10.3.0.1', 'socket')
+    assert fake.calls == 3
+
+
+def test_results_are_reused_until_the_ttl_expires(tmp_path):
+    fake = SlowProbe(delay=0)
+    cache = pingcache.PingCache(fake, ttl=0.3, directory=str(tmp_path))
+    first = cache.probe('10.3.1.1', 'subprocess')
+    second = cache.probe('10.3.1.1', 'subprocess')
+    assert (first['cached'], second['cached'], fake.calls) == (False, True, 1)
+    assert 0 <= second['age'] <= 0.3
+    time.sleep(0.35)
+    assert cache.probe('10.3.1.1', 'subprocess')['cached'] is False
+    assert fake.calls == 2
+
+
+def test_cache_is_shared_between_workers(tmp_path):
+    # two caches over one directory stand in for two gunicorn workers
+    leader, other = SlowProbe(delay=0), SlowProbe(delay=0)
+    leader.release.clear()
+    a = pingcache.PingCache(leader, ttl=60, directory=str(tmp_path))
+    b = pingcache.PingCache(other, ttl=60, directory=str(tmp_path))
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(a.probe, '10.3.2.1', 'subprocess')
+        while not leader.calls:
+            time.sleep(0.01)
+        # b asks while a is still probing: it waits for a's result instead of probing
+        second = pool.submit(b.probe, '10.3.2.1', 'subprocess')
+        time.sleep(0.1)
+        assert not second.done()
+        leader.release.set()
+        assert first.result()['cached'] is False
+        assert second.result()['cached'] is True
+    assert other.calls == 0
+
+
+def test_multi_packet_probe_without_interval(tmp_path):
+    calls = []
+
+    def fake(target, engine=None, count=1, interval=None):
+        calls.append(interval)
+        return {"success": True, "time": 1.0, "error": None}
+
+    cache = pingcache.PingCache(fake, ttl=60, directory=str(tmp_path))
+    assert cache.probe('10.3.4.1', 'subprocess', count=3)['cached'] is False
+    # no interval is the probe's default interval
+    assert cache.probe('10.3.4.1', 'subprocess', count=3, interval=probe.PROBE_INTERVAL)['cached'] is True
+    assert cache.peek('10.3.4.1', 'subprocess', 3) is not None
+    assert calls == [None]
+
+
+def test_disabled_cache_and_failed_probes(tmp_path):
+    fake = SlowProbe(delay=0)
+    off = pingcache.PingCache(fake, ttl=0, directory=str(tmp_path / 'off'))
+    assert [off.probe('10.3.3.1', 'subprocess')['cached'] for _ in range(2)] == [False, False]
+    assert fake.calls == 2
+
+    broken = SlowProbe(delay=0, result={"success": False, "time": None, "error": "exception"})
+    cache = pingcache.PingCache(broken, ttl=60, directory=str(tmp_path / 'on'))
+    cache.probe('10.3.3.2', 'subprocess')
+    assert cache.probe('10.3.3.2', 'subprocess')['cached'] is False
+    assert broken.calls == 2
+
+
+def test_ping_endpoint_reports_cache_state(client, fake_ping, tmp_path, monkeypatch):
+    cache = pingcache.PingCache(probe.probe_target, ttl=60, directory=str(tmp_path))
+    monkeypatch.setattr(app_module, 'probe_pool', probepool.ProbePool(cache=cache))
+    first = client.get('/api/ping?ip=10.3.4.1').get_json()
+    second = client.get('/api/ping?ip=10.3.4.1').get_json()
+    assert first == {"success": True, "time": 2.0, "error": None, "cached": False, "age": first['age']}
+    assert second['cached'] is True and second['age'] >= first['age']
+    assert client.get('/api/ping?ip=10.255.0.9').get_json()['error'] == 'no-response'
+    assert client.get('/api/ping?ip=').status_code == 400
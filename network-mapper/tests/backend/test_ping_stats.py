@@ -0,0 +1,136 @@
+import pytest
+
+from backend import app as app_module
+from backend import icmp
+from backend import pingcache
+from backend import pingstats
+from backend import probe
+from backend import probepool
+
+IPUTILS = """PING 10.0.0.1 (10.0.0.1) 56(84) bytes of data.
+64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.412 ms
+64 bytes from 10.0.0.1: icmp_seq=2 ttl=64 time=0.389 ms
+64 bytes from 10.0.0.1: icmp_seq=3 ttl=64 time=1.20 ms
+64 bytes from 10.0.0.1: icmp_seq=4 ttl=64 time=0.502 ms
+
+--- 10.0.0.1 ping statistics ---
+4 packets transmitted, 4 received, 0% packet loss, time 3004ms
+rtt min/avg/max/mdev = 0.389/0.626/1.200/0.334 ms
+"""
+
+IPUTILS_PARTIAL = """PING 10.0.0.2 (10.0.0.2) 56(84) bytes of data.
+64 bytes from 10.0.0.2: icmp_seq=1 ttl=63 time=12.3 ms
+64 bytes from 10.0.0.2: icmp_seq=3 ttl=63 time=14.1 ms
+64 bytes from 10.0.0.2: icmp_seq=3 ttl=63 time=14.9 ms (DUP!)
+
+--- 10.0.0.2 ping statistics ---
+4 packets transmitted, 2 received, +1 duplicates, 50% packet loss, time 3005ms
+rtt min/avg/max/mdev = 12.300/13.200/14.100/0.900 ms
+"""
+
+IPUTILS_DOWN = """PING 10.0.0.3 (10.0.0.3) 56(84) bytes of data.
+From 10.0.0.254 icmp_seq=1 Destination Host Unreachable
+From 10.0.0.254 icmp_seq=2 Destination Host Unreachable
+
+--- 10.0.0.3 ping statistics ---
+3 packets transmitted, 0 received, +2 errors, 100% packet loss, time 2030ms
+"""
+
+BUSYBOX = """PING 10.0.0.4 (10.0.0.4): 56 data bytes
+64 bytes from 10.0.0.4: seq=0 ttl=64 time=0.080 ms
+64 bytes from 10.0.0.4: seq=1 ttl=64 time=0.120 ms
+
+--- 10.0.0.4 ping statistics ---
+2 packets transmitted, 2 packets received, 0% packet loss
+round-trip min/avg/max = 0.080/0.100/0.120 ms
+"""
+
+MACOS = """PING 10.0.0.5 (10.0.0.5): 56 data bytes
+64 bytes from 10.0.0.5: icmp_seq=0 ttl=64 time=3.104 ms
+Request timeout for icmp_seq 1
+64 bytes from 10.0.0.5: icmp_seq=2 ttl=64 time=2.896 ms
+
+--- 10.0.0.5 ping statistics ---
+3 packets transmitted, 2 packets received, 33.3% packet loss
+round-trip min/avg/max/stddev = 2.896/3.000/3.104/0.104 ms
+"""
+
+WINDOWS = """Pinging 10.0.0.6 with 32 bytes of data:
+Reply from 10.0.0.6: bytes=32 time<1ms TTL=128
+Reply from 10.0.0.6: bytes=32 time=2ms TTL=128
+Reply from 10.0.0.99: Destination host unreachable.
+
+Ping statistics for 10.0.0.6:
+    Packets: Sent = 3, Received = 3, Lost = 0 (0% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 0ms, Maximum = 2ms, Average = 1ms
+"""
+
+
+@pytest.mark.parametrize('text, expected', [
+    (IPUTILS, {"sent": 4, "received": 4, "loss": 0.0, "min": 0.389, "avg": 0.626, "max": 1.2, "mdev": 0.334}),
+    (IPUTILS_PARTIAL, {"sent": 4, "received": 2, "loss": 50.0, "min": 12.3, "avg": 13.2, "max": 14.1, "mdev": 0.9}),
+    (IPUTILS_DOWN, {"sent": 3, "received": 0, "loss": 100.0, "min": None, "avg": None, "max": None, "mdev": None}),
+    (BUSYBOX, {"sent": 2, "received": 2, "loss": 0.0, "min": 0.08, "avg": 0.1, "max": 0.12, "mdev": 0.02}),
+    (MACOS, {"sent": 3, "received": 2, "loss": 33.3, "min": 2.896, "avg": 3.0, "max": 3.104, "mdev": 0.104}),
+    # "host unreachable" counts as received on Windows; only real replies do here
+    (WINDOWS, {"sent": 3, "received": 2, "loss": 33.333, "min": 1.0, "avg": 1.5, "max": 2.0, "mdev": 0.5}),
+])
+def test_parse_output(text, expected):
+    res = pingstats.parse_output(text)
+    assert {k: res[k] for k in expected} == expected
+    assert res['success'] is bool(expected['received'])
+    assert res['time'] == expected['avg']
+    assert res['error'] == (None if expected['received'] else 'no-response')
+
+
+def test_summary_matches_iputils():
+    computed = pingstats.summarize(pingstats.reply_times(IPUTILS))
+    printed = {"min": 0.389, "avg": 0.626, "max": 1.2, "mdev": 0.334}
+    assert all(abs(computed[k] - printed[k]) <= 0.002 for k in printed)
+
+
+def test_sub_millisecond_single_probe(fake_ping, tmp_path, monkeypatch):
+    script = tmp_path / 'ping-fast'
+    script.write_text('#!/bin/sh\necho "64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.412 ms"\n')
+    script.chmod(0o755)
+    monkeypatch.setattr(probe, 'PING_BINARY', str(script))
+    assert probe.ping_once('10.0.0.1') == {"success": True, "time": 0.412, "error": None}
+
+
+def test_ping_multi_passes_count_and_interval(fake_ping, tmp_path, monkeypatch):
+    script = tmp_path / 'ping-multi'
+    script.write_text('#!/bin/sh\necho "$@" > "$0.args"\ncat <<EOF\n' + IPUTILS_PARTIAL + 'EOF\n')
+    script.chmod(0o755)
+    monkeypatch.setattr(probe, 'PING_BINARY', str(script))
+    res = probe.probe_target('10.0.0.2', engine='subprocess', count=4, interval=0.5)
+    assert (res['sent'], res['received'], res['loss'], res['time']) == (4, 2, 50.0, 13.2)
+    assert (tmp_path / 'ping-multi.args').read_text().split() == ['-c', '4', '-i', '0.5', '10.0.0.2']
+
+
+def test_socket_engine_multi_packet_loopback():
+    if not icmp.available():
+        pytest.skip('ICMP sockets not permitted here')
+    res = icmp.get_prober().submit_many('127.0.0.1', 3, 0.2, 2).result()
+    assert (res['success'], res['sent'], res['received'], res['loss']) == (True, 3, 3, 0.0)
+    assert isinstance(res['time'], float) and res['min'] <= res['avg'] <= res['max']
+
+
+def test_ping_endpoint_count(client, fake_ping, tmp_path, monkeypatch):
+    calls = []
+
+    def fake(target, engine=None, count=1, interval=None):
+        calls.append((target, count, interval))
+        return pingstats.result(count, [1.0, 3.0][:count])
+
+    cache = pingcache.PingCache(fake, ttl=60, directory=str(tmp_path))
+    monkeypatch.setattr(app_module, 'probe_pool', probepool.ProbePool(cache=cache))
+    res = client.get('/api/ping?ip=10.9.0.1&count=3&interval=0.05').get_json()
+    assert (res['sent'], res['received'], res['time'], res['mdev']) == (3, 2, 2.0, 1.0)
+    assert round(res['loss'], 1) == 33.3
+    # interval is clamped to what ping(8) allows; count to PROBE_MAX_COUNT
+    client.get('/api/ping?ip=10.9.0.2&count=999&interval=9')
+    assert calls == [('10.9.0.1', 3, probe.PROBE_MIN_INTERVAL), ('10.9.0.2', probe.PROBE_MAX_COUNT, probe.PROBE_MAX_INTERVAL)]
+    # a single probe isn't answered from the multi-packet result
+    assert client.get('/api/ping?ip=10.9.0.1').get_json()['cached'] is False
+    assert calls[-1] == ('10.9.0.1', 1, None)
@@ -0,0 +1,43 @@
+import json
+
+
+def _create(client, **payload):
+    payload.setdefault('device_type', 'switch')
+    r = client.post('/api/devices', data=json.dumps(payload), content_type='application/json')
+    return r.get_json()['id']
+
+
+def _sweep(client, body):
+    r = client.post('/api/ping/sweep', data=json.dumps(body), content_type='application/json')
+    assert r.status_code == 200
+    assert r.mimetype == 'application/x-ndjson'
+    lines = [json.loads(ln) for ln in r.get_data(as_text=True).splitlines() if ln.strip()]
+    return lines[:-1], lines[-1]
+
+
+def test_sweep_reports_each_device(client, fake_ping):
+    up = _create(client, name='SweepUp', ip='10.1.0.1')
+    down = _create(client, name='SweepDown', ip='10.255.0.1')
+    noip = _create(client, name='SweepNoIP')
+    results, summary = _sweep(client, {"device_ids": [up, down, noip]})
+    by_id = {r['id']: r for r in results}
+    assert set(by_id) == {up, down, noip}
+    assert by_id[up]['success'] is True and by_id[up]['time'] == 2.0
+    assert by_id[down]['success'] is False and by_id[down]['error'] == 'no-response'
+    assert by_id[noip]['error'] == 'invalid-target'
+    assert summary == {"done": True, "total": 3, "up": 1, "down": 2}
+
+
+def test_sweep_by_floorplan_respects_deadline(client, fake_ping):
+    fast = _create(client, name='SweepFast', ip='10.1.0.2', floorplan_id=9001)
+    slow = _create(client, name='SweepSlow', ip='10.254.0.1', floorplan_id=9001)
+    results, summary = _sweep(client, {"floorplan_id": 9001, "deadline": 1, "concurrency": 2})
+    by_id = {r['id']: r for r in results}
+    assert by_id[fast]['success'] is True
+    assert by_id[slow]['error'] == 'deadline'
+    assert summary['total'] == 2
+
+
+def test_sweep_requires_selection(client):
+    r = client.post('/api/ping/sweep', data=json.dumps({}), content_type='application/json')
+    assert r.status_code == 400
@@ -0,0 +1,122 @@
+import json
+import threading
+
+from backend import app as app_module
+from backend import poller
+from backend.poller import Poller
+
+
+def _create(client, **payload):
+    payload.setdefault('device_type', 'switch')
+    r = client.post('/api/devices', data=json.dumps(payload), content_type='application/json')
+    return r.get_json()['id']
+
+
+def _fake_probe(target):
+    if target.startswith('10.255.'):
+        return {"success": False, "time": None, "error": "no-response"}
+    return {"success": True, "time": "3", "error": None}
+
+
+def test_poll_all_writes_last_known_status(client):
+    up = _create(client, name='PollUp', ip='10.2.0.1', floorplan_id=9101)
+    down = _create(client, name='PollDown', ip='10.255.2.1', floorplan_id=9101)
+    p = Poller(app_module.SessionLocal, probe_fn=_fake_probe)
+    try:
+        assert p.poll_all() >= 2
+    finally:
+        p.stop()
+
+    r = client.get('/api/status?floorplan_id=9101')
+    assert r.status_code == 200
+    by_id = {s['device_id']: s for s in r.get_json()}
+    assert set(by_id) == {up, down}
+    assert by_id[up]['up'] is True and by_id[up]['rtt_ms'] == 3.0
+    assert by_id[down]['up'] is False and by_id[down]['error'] == 'no-response'
+
+    h = client.get(f'/api/devices/{up}/status-history').get_json()
+    assert len(h) == 1 and h[0]['up'] is True
+
+    only = client.get(f'/api/status?ids={down}').get_json()
+    assert [s['device_id'] for s in only] == [down]
+    both = client.get(f'/api/status?ids={up},{down}&floorplan_id=9101').get_json()
+    assert {s['device_id'] for s in both} == {up, down}
+    assert client.get(f'/api/status?ids={up}&floorplan_id=9102').get_json() == []
+    assert client.get('/api/status?ids=1,x').status_code == 400
+
+
+def test_schedule_spreads_first_probes_and_reschedules_with_jitter(client):
+    _create(client, name='PollSched', ip='10.2.0.9')
+    p = Poller(app_module.SessionLocal, probe_fn=_fake_probe, interval=10, jitter=0.2)
+    try:
+        p.refresh_targets(now=0)
+        assert p._schedule and all(0 <= due < 10 for due, _ in p._schedule)
+        p.submit_due(now=10)
+        assert p._inflight == set(p._targets)
+        while p._inflight:
+            p.drain(timeout=1)
+        assert len(p._schedule) == len(p._targets)
+    finally:
+        p.stop()
+
+
+def test_device_poll_interval_overrides_the_default(client):
+    slow = _create(client, name='PollSlow', ip='10.2.0.10', poll_interval=300)
+    fast = _create(client, name='PollFast', ip='10.2.0.11')
+    assert client.post('/api/devices', json={'name': 'PollBad', 'device_type': 'switch', 'poll_interval': 0.1}).status_code == 400
+    r = client.put(f'/api/devices/{fast}', json={'poll_interval': 'often'})
+    assert r.status_code == 400 and client.get(f'/api/devices/{fast}').get_json()['poll_interval'] is None
+    assert client.get(f'/api/devices/{slow}').get_json()['poll_interval'] == 300
+
+    p = Poller(app_module.SessionLocal, probe_fn=_fake_probe, interval=10, jitter=0)
+    try:
+        p.refresh_targets(now=0)
+        assert (p._targets[slow][2], p._targets[fast][2]) == (300, 10)
+        p.submit_due(now=300)
+        while p._inflight:
+            p.drain(timeout=1)
+        due = {device_id: at for at, device_id in p._schedule}
+        assert 280 < due[slow] - due[fast] < 300
+    finally:
+        p.stop()
+
+
+def test_sweep_updates_last_known_status(client, fake_ping):
+    did = _create(client, name='SweepRecorded', ip='10.255.3.1')
+    r = client.post('/api/ping/sweep', data=json.dumps({"device_ids": [did]}), content_type='application/json')
+    r.get_data()
+    status = client.get('/api/status').get_json()
+    assert any(s['device_id'] == did and s['up'] is False for s in status)
+
+
+def test_busy_pool_answers_are_not_recorded(client, tmp_path):
+    did = _create(client, name='PollPooled', ip='10.2.0.20')
+    calls = []
+
+    def pooled(target, check=None):
+        calls.append(target)
+        return {"success": False, "time": None, "error": "busy"} if target == '10.2.0.21' else _fake_probe(target)
+
+    busy = _create(client, name='PollBusy', ip='10.2.0.21')
+    p = Poller(app_module.SessionLocal, probe_fn=pooled)
+    try:
+        p.poll_all()
+    finally:
+        p.stop()
+    assert {'10.2.0.20', '10.2.0.21'} <= set(calls)
+    # a full pool says nothing about the device: nothing is recorded for it
+    assert client.get(f'/api/devices/{busy}/status-history').get_json() == []
+    assert client.get(f'/api/devices/{did}/status-history').get_json()[0]['up'] is True
+
+
+def test_start_singleton_passes_the_probe_to_the_poller(monkeypatch, tmp_path):
+    seen = threading.Event()
+    probe_fns = []
+
+    def run(self):
+        probe_fns.append(self.probe_fn)
+        seen.set()
+
+    monkeypatch.setattr(Poller, 'run', run)
+    poller.start_singleton(app_module.SessionLocal, lock_path=str(tmp_path / 'poller.lock'), probe_fn=app_module.pooled_probe)
+    assert seen.wait(5) and probe_fns == [app_module.pooled_probe]
@@ -0,0 +1,139 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from backend import app as app_module
+from backend import pingcache
+from backend import probepool
+
+
+class GatedProbe:
+    """Records when each target was probed; probes block until `gate` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = {}
+
+    def __call__(self, target, engine=None):
+        self.started[target] = time.monotonic()
+        self.gate.wait(5)
+        return {"success": True, "time": "1", "error": None}
+
+
+def make_pool(tmp_path, fake, ttl=0, **kwargs):
+    return probepool.ProbePool(cache=pingcache.PingCache(fake, ttl=ttl, directory=str(tmp_path)), **kwargs)
+
+
+def test_subnet_key():
+    assert probepool.subnet_key('10.1.2.3') == '10.1.2.0/24'
+    assert probepool.subnet_key('2001:db8::1') == '2001:db8::/64'
+    assert probepool.subnet_key('Switch.Example') == 'switch.example'
+
+
+def test_per_subnet_rate_limit(tmp_path):
+    fake = GatedProbe()
+    pool = make_pool(tmp_path, fake, rate=10, burst=1, concurrency=8)
+    try:
+        started = time.monotonic()
+        futures = [pool.submit(t, 'subprocess') for t in ('10.5.0.1', '10.5.0.2', '10.5.0.3', '10.6.0.1')]
+        assert all(f.result(timeout=5)['success'] for f in futures)
+    finally:
+        pool.close()
+    same_subnet = sorted(fake.started[t] for t in ('10.5.0.1', '10.5.0.2', '10.5.0.3'))
+    assert all(b - a >= 0.08 for a, b in zip(same_subnet, same_subnet[1:]))
+    # another subnet has its own bucket and isn't stuck behind the limited one
+    assert fake.started['10.6.0.1'] - started < 0.08
+
+
+def test_queue_bound_and_identical_submits(tmp_path):
+    fake = GatedProbe()
+    fake.gate.clear()
+    pool = make_pool(tmp_path, fake, concurrency=1, queue_size=2, rate=0)
+    try:
+        running = pool.submit('10.5.1.1', 'subprocess')
+        while '10.5.1.1' not in fake.started:
+            time.sleep(0.01)
+        queued = [pool.submit(t, 'subprocess') for t in ('10.5.1.2', '10.5.1.3')]
+        assert pool.stats() == {"queued": 2, "running": 1, "subnets": 1}
+        with pytest.raises(probepool.Busy):
+            pool.submit('10.5.1.4', 'subprocess')
+        # an identical request joins the queued probe instead of taking a slot
+        assert pool.submit('10.5.1.2', 'subprocess') is queued[0]
+        assert pool.probe('10.5.1.3', 'subprocess', wait=0.05) is None
+        fake.gate.set()
+        assert [f.result(timeout=5)['success'] for f in [running] + queued] == [True] * 3
+    finally:
+        pool.close()
+
+
+def test_ping_endpoint_queues_and_sheds_load(client, fake_ping, tmp_path, monkeypatch):
+    fake = GatedProbe()
+    fake.gate.clear()
+    pool = make_pool(tmp_path, fake, ttl=60, concurrency=1, queue_size=1, rate=0)
+    monkeypatch.setattr(app_module, 'probe_pool', pool)
+    try:
+        first = client.get('/api/ping?ip=10.7.0.1&wait=0.05')
+        assert first.status_code == 202 and first.headers['Retry-After'] == '1'
+        assert first.get_json()['status'] == 'queued'
+        assert client.get('/api/ping?ip=10.7.0.2&wait=0').status_code == 202
+        shed = client.get('/api/ping?ip=10.7.0.3&wait=0')
+        assert shed.status_code == 429 and shed.get_json()['error'] == 'busy'
+
+        # CRUD requests don't wait behind the stuck probes
+        started = time.monotonic()
+        assert client.get('/api/devices?limit=1').status_code == 200
+        assert time.monotonic() - started < 0.5
+
+        fake.gate.set()
+        while pool.stats()['queued'] or pool.stats()['running']:
+            time.sleep(0.01)
+        # the queued probe's result is waiting in the cache for the retry
+        retry = client.get('/api/ping?ip=10.7.0.1&wait=0')
+        assert retry.status_code == 200 and retry.get_json()['cached'] is True
+    finally:
+        fake.gate.set()
+        pool.close()
+
+
+def test_pool_process_over_socket(fake_ping, tmp_path):
+    # the pool process finds the fake ping on its PATH
+    env = {**os.environ, 'PATH': os.path.dirname(fake_ping) + os.pathsep + os.environ['PATH'], 'PROBE_ENGINE': 'subprocess'}
+    proc, path = probepool.start_server(str(tmp_path / 'probes.sock'), env=env)
+    try:
+        client = probepool.ProbeClient(path)
+        res = client.probe('10.8.0.1', 'subprocess', wait=5)
+        assert (res['success'], res['time'], res['cached']) == (True, 2.0, False)
+        assert client.probe('10.255.0.8', 'subprocess', wait=5)['error'] == 'no-response'
+        # too slow for the caller's budget: None (the pool keeps going)
+        assert client.probe('10.254.0.8', 'subprocess', wait=0.2) is None
+        # a request the pool can't take is answered with a failure, not a dropped connection
+        bad = client.probe('10.8.0.1', 'subprocess', wait=5, check=('http',))
+        assert (bad['success'], bad['error']) == (False, 'exception')
+    finally:
+        proc.terminate()
+        proc.wait(5)
+    # with the pool process gone the client probes in-process
+    assert client.probe('10.8.0.2', 'subprocess', wait=5)['success'] is True
+
+
+def test_client_treats_a_dropped_connection_as_a_failed_probe(tmp_path):
+    path = str(tmp_path / 'drop.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    def drop():
+        conn, _ = listener.accept()
+        conn.recv(4096)
+        conn.close()
+
+    threading.Thread(target=drop, daemon=True).start()
+    try:
+        res = probepool.ProbeClient(path).probe('10.8.0.3', wait=5)
+        assert (res['success'], res['error']) == (False, 'exception')
+    finally:
+        listener.close()
@@ -0,0 +1,73 @@
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, delete, func, text
+from werkzeug.datastructures import MultiDict
+
+from backend import app as app_module
+from backend import migrate
+from backend.models import Device, Audit, Floorplan, StatusHistory
+
+# "SCAN devices" is a full table scan; "SCAN x USING (COVERING) INDEX" and "SEARCH" are fine
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def _plan(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+    return [r[-1] for r in rows]
+
+
+def _device_query(**args):
+    session = app_module.SessionLocal()
+    try:
+        q = app_module.filter_devices(session.query(Device.id), MultiDict(args))
+        return q.order_by(Device.id).statement
+    finally:
+        session.close()
+
+
+HOT_QUERIES = {
+    'devices by floorplan': lambda: _device_query(floorplan_id='1'),
+    'devices by floorplan and type': lambda: _device_query(floorplan_id='1', device_type='ap'),
+    'devices by building': lambda: _device_query(building_id='1'),
+    'devices by ip prefix': lambda: _device_query(ip='10.31.'),
+    'devices by mac': lambda: _device_query(mac='00:11:22:33:44:55'),
+    'devices keyset page': lambda: select(Device.id).where(Device.id > 100).order_by(Device.id).limit(500),
+    'admin cleanup devices by floorplan': lambda: delete(Device).where(Device.floorplan_id == 1),
+    'admin cleanup devices by building': lambda: delete(Device).where(Device.building_id == 1),
+    'admin cleanup floorplans by building': lambda: select(Floorplan.id).where(Floorplan.building_id == 1),
+    'audit cleanup': lambda: delete(Audit).where(Audit.timestamp < datetime(2020, 1, 1)),
+    'status history for device': lambda: select(StatusHistory).where(StatusHistory.device_id == 1).order_by(StatusHistory.id.desc()).limit(100),
+    'latest status per device': lambda: select(StatusHistory.device_id, func.max(StatusHistory.id)).group_by(StatusHistory.device_id),
+}
+
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(name):
+    with app_module.engine.connect() as conn:
+        plan = _plan(conn, HOT_QUERIES[name]())
+    scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not scans, f'{name} falls back to a full table scan: {plan}'
+
+
+def test_upgrade_adds_indexes_to_existing_sqlite_file(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}", future=True)
+    with engine.begin() as conn:
+        # schema as shipped before indexes (and before `room`) existed
+        conn.execute(text(
+            'CREATE TABLE devices (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, ip VARCHAR, '
+            'device_type VARCHAR NOT NULL, building_id INTEGER, floorplan_id INTEGER, x FLOAT, y FLOAT, '
+            'note VARCHAR, mac VARCHAR, created DATETIME)'))
+        conn.execute(text("INSERT INTO devices (name, device_type, mac) VALUES ('old', 'switch', 'AA-BB-CC-DD-EE-FF')"))
+    applied = migrate.upgrade(engine)
+    assert 'ALTER TABLE devices ADD COLUMN room VARCHAR' in applied
+    assert 'CREATE INDEX ix_devices_mac_norm' in applied
+    assert migrate.upgrade(engine) == []
+    with engine.connect() as conn:
+        names = {r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert {'ix_devices_floorplan_id_device_type', 'ix_devices_building_id', 'ix_devices_ip'} <= names
+        assert conn.execute(select(Device.name).where(
+            app_module.normalized_mac(Device.mac) == 'aabbccddeeff')).scalar() == 'old'
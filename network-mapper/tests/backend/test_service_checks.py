@@ -0,0 +1,207 @@
+import json
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend import app as app_module
+from backend import probepool
+from backend import servicecheck
+from backend.poller import Poller
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Stand-in web service: `/` is up, `/health` answers 204, `/nohead` only does GET, `/drop` closes after replying."""
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, body=b''):
+        self.server.connections.add(self.client_address)
+        self.server.methods.append(self.command)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.path == '/nohead':
+            return self._reply(405)
+        self.do_GET()
+
+    def do_GET(self):
+        statuses = {'/': 200, '/health': 204, '/nohead': 200, '/drop': 200}
+        self._reply(statuses.get(self.path, 404), b'ok')
+        if self.path == '/drop':
+            # keep-alive as far as the client can tell, but the connection is gone
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(tls_context=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.connections, server.methods = set(), []
+    if tls_context is not None:
+        server.socket = tls_context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def web():
+    server = serve()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_from_fields():
+    assert servicecheck.from_fields(None) is None
+    assert servicecheck.from_fields('ICMP', 80) is None
+    assert servicecheck.from_fields('https') == ('https', 443, '/', None)
+    assert str(servicecheck.from_fields('http', 8080, '/health', 204)) == 'http:8080/health=204'
+    assert str(servicecheck.from_fields('tcp', '67')) == 'tcp:67'
+    for bad in (('tcp',), ('udp', 53), ('http', 0), ('http', 80, 'health'), ('http', 80, '/', 42), ('tcp', 'x'),
+                ('https', 443.5), ('tcp', 22.0), ('tcp', True), ('http', 80, '/', 200.5), ('tcp', '22.5'),
+                (1,), ('http', 80, 5), (['http'], 80)):
+        with pytest.raises(ValueError):
+            servicecheck.from_fields(*bad)
+
+
+def test_tcp_check():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    res = servicecheck.run('127.0.0.1', servicecheck.from_fields('tcp', port))
+    assert (res['success'], res['error'], res['check']) == (True, None, 'tcp')
+    assert isinstance(res['time'], float)
+    listener.close()
+    assert servicecheck.run('127.0.0.1', servicecheck.from_fields('tcp', port))['error'] == 'refused'
+
+
+def test_http_status_and_connection_reuse(web):
+    pool = servicecheck.ConnectionPool()
+    port = web.server_address[1]
+    check = servicecheck.from_fields('http', port)
+    results = [servicecheck.http_check('127.0.0.1', check, pool=pool) for _ in range(3)]
+    assert all(r['success'] and r['status'] == 200 for r in results)
+    # three checks, one keep-alive connection
+    assert len(web.connections) == 1 and web.methods == ['HEAD'] * 3
+
+    assert servicecheck.http_check('127.0.0.1', servicecheck.from_fields('http', port, '/health', 204), pool=pool)['success']
+    missing = servicecheck.http_check('127.0.0.1', servicecheck.from_fields('http', port, '/missing'), pool=pool)
+    assert (missing['success'], missing['error'], missing['status']) == (False, 'unexpected-status', 404)
+    pool.clear()
+
+
+def test_http_get_fallback_and_dropped_connection(web):
+    pool = servicecheck.ConnectionPool()
+    port = web.server_address[1]
+    res = servicecheck.http_check('127.0.0.1', servicecheck.from_fields('http', port, '/nohead'), pool=pool)
+    assert res['success'] and web.methods == ['HEAD', 'GET']
+
+    # the server closes the connection it let the client keep; the next check reconnects
+    assert servicecheck.http_check('127.0.0.1', servicecheck.from_fields('http', port, '/drop'), pool=pool)['success']
+    assert servicecheck.http_check('127.0.0.1', servicecheck.from_fields('http', port), pool=pool)['success']
+    assert len(web.connections) == 2
+    pool.clear()
+
+
+def test_http_timeout():
+    # accepts connections (backlog) but never answers
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    check = servicecheck.from_fields('http', listener.getsockname()[1])
+    res = servicecheck.http_check('127.0.0.1', check, timeout=0.2, pool=servicecheck.ConnectionPool())
+    assert (res['success'], res['error']) == (False, 'no-response')
+    listener.close()
+
+
+@pytest.mark.skipif(shutil.which('openssl') is None, reason='openssl not installed')
+def test_https_check(tmp_path, monkeypatch):
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                    '-keyout', str(key), '-out', str(cert)], check=True, capture_output=True)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(str(cert), str(key))
+    server = serve(ctx)
+    try:
+        check = servicecheck.from_fields('https', server.server_address[1])
+        # self-signed: rejected while verifying, accepted with SERVICE_CHECK_TLS_VERIFY=0
+        assert servicecheck.http_check('127.0.0.1', check, pool=servicecheck.ConnectionPool())['error'] == 'tls'
+        monkeypatch.setattr(servicecheck, 'SERVICE_CHECK_TLS_VERIFY', False)
+        res = servicecheck.http_check('127.0.0.1', check, pool=servicecheck.ConnectionPool())
+        assert (res['success'], res['check'], res['status']) == (True, 'https', 200)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_check_through_pool_process(web, tmp_path):
+    proc, path = probepool.start_server(str(tmp_path / 'probes.sock'))
+    try:
+        check = servicecheck.from_fields('http', web.server_address[1], '/health', 204)
+        res = probepool.ProbeClient(path).probe('127.0.0.1', wait=5, check=check)
+        assert (res['success'], res['check'], res['status']) == (True, 'http', 204)
+    finally:
+        proc.terminate()
+        proc.wait(5)
+
+
+def _create(client, **payload):
+    payload.setdefault('device_type', 'server')
+    return client.post('/api/devices', data=json.dumps(payload), content_type='application/json')
+
+
+def test_devices_with_checks_in_sweep_and_ping(client, fake_ping, web):
+    port = web.server_address[1]
+    site = _create(client, name='Web', ip='127.0.0.1', check_type='http', check_port=port, check_path='/health',
+                   check_status=204).get_json()['id']
+    pinged = _create(client, name='Pinged', ip='10.1.5.1').get_json()['id']
+    assert _create(client, name='Broken', ip='127.0.0.1', check_type='tcp').status_code == 400
+    assert _create(client, name='Fractional', ip='127.0.0.1', check_type='https', check_port=443.5).status_code == 400
+    assert _create(client, name='Numeric', ip='127.0.0.1', check_type=1).status_code == 400
+    r = client.put(f'/api/devices/{pinged}', data=json.dumps({"check_type": "smtp"}), content_type='application/json')
+    assert r.status_code == 400 and client.get(f'/api/devices/{pinged}').get_json()['check_type'] is None
+    r = client.put(f'/api/devices/{pinged}', data=json.dumps({"check_type": "http", "check_path": 5}), content_type='application/json')
+    assert r.status_code == 400
+    r = client.patch('/api/devices/bulk', json={"changes": [{"id": pinged, "check_type": "http", "check_path": 5}]})
+    assert r.status_code == 400 and r.get_json()['error'] == 'invalid-check'
+    assert client.get(f'/api/devices/{pinged}').get_json()['check_path'] is None
+
+    r = client.post('/api/ping/sweep', data=json.dumps({"device_ids": [site, pinged]}), content_type='application/json')
+    by_id = {line['id']: line for line in map(json.loads, r.get_data(as_text=True).splitlines()) if 'id' in line}
+    assert (by_id[site]['success'], by_id[site]['check'], by_id[site]['status']) == (True, 'http', 204)
+    assert by_id[pinged]['success'] is True and 'check' not in by_id[pinged]
+
+    res = client.get(f'/api/ping?ip=127.0.0.1&check=tcp&port={port}').get_json()
+    assert (res['success'], res['check']) == (True, 'tcp')
+    assert client.get('/api/ping?ip=127.0.0.1&check=http&port=99999').status_code == 400
+    assert client.get('/api/ping?ip=127.0.0.1&check=https&port=443.5').status_code == 400
+
+
+def test_poller_runs_device_checks(client, web):
+    port = web.server_address[1]
+    site = _create(client, name='Polled Web', ip='127.0.0.1', check_type='http', check_port=port).get_json()['id']
+    checks = []
+
+    def record(target, check=None):
+        checks.append(check)
+        return servicecheck.run(target, check) if check else {"success": True, "time": 1.0, "error": None}
+
+    p = Poller(app_module.SessionLocal, probe_fn=record)
+    try:
+        p.poll_all()
+    finally:
+        p.stop()
+    assert servicecheck.from_fields('http', port) in checks
+    status = client.get(f'/api/devices/{site}/status-history').get_json()
+    assert status[0]['up'] is True
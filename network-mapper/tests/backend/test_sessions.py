@@ -0,0 +1,35 @@
+import io
+
+from backend import app as app_module
+
+
+def test_sessions_are_released_on_every_path(client):
+    pool = app_module.engine.pool
+    before = pool.checkedout()
+    # error paths that used to return without closing their session
+    assert client.post('/api/devices/import', data={}, content_type='multipart/form-data').status_code == 400
+    assert client.post('/api/devices/restore', json={}).status_code == 400
+    assert client.get('/api/devices/999999').status_code == 404
+    assert client.patch('/api/devices/bulk', json={'changes': [{'id': 999999, 'x': 0.5}]}).status_code == 404
+    assert client.post('/api/floorplans', data={'building': 'No File Hall'}, content_type='multipart/form-data').status_code == 400
+    r = client.post('/api/devices/import', data={'file': (io.BytesIO(b'name,ip\nx,1.2.3.4\n'), 'd.csv'), 'wait': '1'},
+                    content_type='multipart/form-data')
+    assert r.status_code in (200, 400)
+    assert pool.checkedout() == before
+
+
+def test_list_rows_match_single_device_shape(client):
+    b = client.post('/api/buildings', json={'name': 'Serializer Hall', 'lat': 1.5, 'lon': 2.5}).get_json()['id']
+    ids = [client.post('/api/devices', json={'name': f'ser-{i}', 'ip': f'10.77.0.{i}', 'device_type': 'ap',
+                                             'building_id': b, 'x': 0.1 * i, 'y': 0.2, 'mac': f'02:00:00:00:77:0{i}',
+                                             'room': 'R1'}).get_json()['id'] for i in range(3)]
+    listed = client.get(f'/api/devices?building_id={b}&limit=2').get_json()
+    assert [d['id'] for d in listed] == ids[:2]
+    assert listed[1] == client.get(f'/api/devices/{ids[1]}').get_json()
+    assert set(listed[0]) == {'id', 'name', 'ip', 'device_type', 'building_id', 'floorplan_id', 'x', 'y', 'note', 'mac', 'room',
+                            'check_type', 'check_port', 'check_path', 'check_status', 'poll_interval'}
+    assert {'id': b, 'name': 'Serializer Hall', 'lat': 1.5, 'lon': 2.5} in client.get('/api/buildings').get_json()
+
+    # PUT returns the full prior state, including mac/room, for undo
+    prev = client.put(f'/api/devices/{ids[0]}', json={'room': 'R2'}).get_json()['prev']
+    assert (prev['room'], prev['mac']) == ('R1', '02:00:00:00:77:00')
@@ -0,0 +1,79 @@
+import gzip
+import os
+import re
+
+from backend import app as app_module
+from backend import assets
+
+
+def test_frontend_files_get_strong_etags_and_ranges(client):
+    r = client.get('/js/building.js')
+    assert r.status_code == 200
+    assert r.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in r.headers['Vary']
+    etag = r.headers['ETag']
+    assert not etag.startswith('W/')
+    assert client.get('/js/building.js', headers={'If-None-Match': etag}).status_code == 304
+
+    part = client.get('/js/building.js', headers={'Range': 'bytes=0-9'})
+    assert part.status_code == 206
+    assert part.data == r.data[:10]
+
+
+def test_pages_pin_scripts_and_styles_by_version(client):
+    page = client.get('/building.html')
+    assert page.headers['Cache-Control'] == 'no-cache'
+    html = page.get_data(as_text=True)
+    m = re.search(r'src="/js/building\.js\?v=([0-9a-f]+)"', html)
+    assert m
+    assert m.group(1) == assets.version(os.path.join(app_module.STATIC_FOLDER, 'js', 'building.js'))
+    assert 'href="/style.css?v=' in html
+    # external references are left alone
+    assert 'src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"' in client.get('/master.html').get_data(as_text=True)
+
+    pinned = client.get(f'/js/building.js?v={m.group(1)}')
+    assert pinned.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    stale = client.get('/js/building.js?v=0000000000000000')
+    assert stale.headers['Cache-Control'] == 'no-cache'
+
+    index = client.get('/')
+    assert '/js/app.js?v=' in index.get_data(as_text=True)
+    assert client.get('/', headers={'If-None-Match': index.headers['ETag']}).status_code == 304
+
+
+def test_precompressed_variants_are_preferred_when_fresh(tmp_path):
+    svg = tmp_path / 'plan.svg'
+    svg.write_text('<svg xmlns="http://www.w3.org/2000/svg">' + '<g/>' * 400 + '</svg>')
+    assert assets.compress_tree(str(tmp_path)) >= 1
+    assert assets.compress_tree(str(tmp_path)) == 0  # up to date
+
+    with app_module.app.test_request_context('/plan.svg', headers={'Accept-Encoding': 'gzip, deflate'}):
+        resp = assets.send_asset(str(tmp_path), 'plan.svg')
+        resp.direct_passthrough = False
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.headers['Content-Type'].startswith('image/svg+xml')
+        assert gzip.decompress(resp.get_data()) == svg.read_bytes()
+        assert resp.get_etag()[0].endswith('-gzip')
+    with app_module.app.test_request_context('/plan.svg'):
+        assert 'Content-Encoding' not in assets.send_asset(str(tmp_path), 'plan.svg').headers
+
+    # a variant older than its source is ignored
+    st = svg.stat()
+    os.utime(tmp_path / 'plan.svg.gz', ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+    with app_module.app.test_request_context('/plan.svg', headers={'Accept-Encoding': 'gzip'}):
+        assert 'Content-Encoding' not in assets.send_asset(str(tmp_path), 'plan.svg').headers
+
+
+def test_asset_manifest_versions_icons(client):
+    standard = sorted(os.listdir(os.path.join(app_module.ICONS_FOLDER, 'standard')))[0]
+    r = client.get('/api/assets/manifest', query_string=[
+        ('path', f'icons/standard/{standard}'), ('path', '../backend/app.py'), ('path', 'icons/missing.svg')])
+    assert r.status_code == 200
+    files = r.get_json()['files']
+    assert files['icons/ap.svg'] == assets.version(os.path.join(app_module.ICONS_FOLDER, 'ap.svg'))
+    assert f'icons/standard/{standard}' in files
+    assert not any('app.py' in k or 'missing' in k for k in files)
+    assert client.get('/api/assets/manifest', headers={'If-None-Match': client.get('/api/assets/manifest').headers['ETag']}).status_code == 304
+
+    pinned = client.get(f"/icons/ap.svg?v={files['icons/ap.svg']}")
+    assert pinned.headers['Cache-Control'] == 'public, max-age=31536000, immutable'